@@ -1,33 +1,93 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, status, Query, Form
-from fastapi.responses import JSONResponse
-import yaml
+from fastapi.responses import JSONResponse, Response
 import os
 import logging
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
 from pydantic import BaseModel
 import re
-from croniter import croniter
 from urllib.parse import urlparse
 import time
 import copy
 
-from app.services.cloudflare_speed_test import CloudflareSpeedTestService
+from app.services.cluster import ROLE_AGENT
 from app.services.hosts_manager import HostsManager
-from app.services.scheduler import SchedulerService
-from app.services.torrent_clients import TorrentClientManager
+from app.services.scheduler import SchedulerService, validate_job_specs
 from datetime import datetime
 from app.models import Tracker, HostsSource, CloudflareConfig, TorrentClientConfig, BatchAddDomainsRequest, User, AuthConfig
-from app.utils import notify as notify_module
+from app.utils.log_reader import tail_lines
+from app.utils.log_buffer import get_ring_buffer_handler, parse_level, parse_time
+from app.utils.config_store import config_store
 
 # 从认证模块导入密码处理函数和依赖项
 from app.auth import get_password_hash, verify_password, get_current_user
 
-# 配置相关常量
-CONFIG_PATH = "config/config.yaml"
-DEFAULT_CLOUDFLARE_IP = "104.16.91.215"  # 全局默认Cloudflare IP
+if TYPE_CHECKING:
+    # 下载器模块在首次使用时才导入，这里仅用于类型标注
+    from app.services.torrent_clients import TorrentClientManager
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
+# 任务通知渠道缓存：(配置版本号, 各启用渠道的不可变推送配置)
+_task_notify_cache = (None, [])
+
+
+def _build_task_notify_configs(notify_cfg: Dict[str, Any]) -> list:
+    """将通知配置展开为每个启用渠道的 NotifyConfig（只读取，不修改传入的配置）"""
+    from app.utils import notify as notify_module
+    channels = notify_cfg.get("channels", {}) or {}
+
+    def flatten_channel(ch_conf: Dict[str, Any]) -> Dict[str, Any]:
+        flat: Dict[str, Any] = {}
+        for k, v in ch_conf.items():
+            if k in ("name", "type", "enable"):
+                continue
+            flat[k] = v
+        # 一言策略：优先渠道内配置，否则用全局
+        if "HITOKOTO" in ch_conf:
+            val = ch_conf.get("HITOKOTO")
+            if isinstance(val, bool):
+                flat["HITOKOTO"] = "true" if val else "false"
+            else:
+                flat["HITOKOTO"] = val
+        else:
+            global_hitokoto = notify_cfg.get("hitokoto", True)
+            flat["HITOKOTO"] = "true" if bool(global_hitokoto) else "false"
+        return flat
+
+    # 收集有效渠道
+    payloads: list[Dict[str, Any]] = []
+    if isinstance(channels, dict):
+        for _, ch_conf in channels.items():
+            if isinstance(ch_conf, dict) and ch_conf.get("enable"):
+                payloads.append(flatten_channel(ch_conf))
+
+    minimal_keys_sets = [
+        ("WEBHOOK_URL", "WEBHOOK_METHOD"),
+        ("QYWX_KEY",),
+        ("TG_BOT_TOKEN", "TG_USER_ID"),
+        ("SMTP_SERVER", "SMTP_EMAIL", "SMTP_PASSWORD"),
+        ("BARK_PUSH",),
+        ("WXPUSHER_APP_TOKEN",),
+        ("GOTIFY_URL", "GOTIFY_TOKEN"),
+    ]
+    valid = []
+    for flat in payloads:
+        for keys in minimal_keys_sets:
+            if all(flat.get(k) for k in keys):
+                valid.append(notify_module.build_config(**flat))
+                break
+    return valid
+
+
+def _task_notify_configs() -> list:
+    """按配置版本号缓存任务通知渠道，配置未变化时复用同一组 NotifyConfig（渠道选择结果随之复用）"""
+    global _task_notify_cache
+    version, cfg = config_store.snapshot()
+    if _task_notify_cache[0] != version:
+        _task_notify_cache = (version, _build_task_notify_configs(cfg.get("notify", {}) or {}))
+    return _task_notify_cache[1]
+
+
 # 工具函数：将通知配置展开并按每个启用渠道发送
 def _send_task_notify(title: str, content: str):
     try:
@@ -55,52 +115,20 @@ def _send_task_notify(title: str, content: str):
             f"🕒 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
 
-        cfg = get_config() or {}
-        notify_cfg = copy.deepcopy(cfg.get("notify", {}))
-        channels = notify_cfg.get("channels", {}) or {}
-
-        def flatten_channel(ch_conf: Dict[str, Any]) -> Dict[str, Any]:
-            flat: Dict[str, Any] = {}
-            for k, v in ch_conf.items():
-                if k in ("name", "type", "enable"):
-                    continue
-                flat[k] = v
-            # 一言策略：优先渠道内配置，否则用全局
-            if "HITOKOTO" in ch_conf:
-                val = ch_conf.get("HITOKOTO")
-                if isinstance(val, bool):
-                    flat["HITOKOTO"] = "true" if val else "false"
-                else:
-                    flat["HITOKOTO"] = val
-            else:
-                global_hitokoto = notify_cfg.get("hitokoto", True)
-                flat["HITOKOTO"] = "true" if bool(global_hitokoto) else "false"
-            return flat
-
-        # 收集有效渠道
-        payloads: list[Dict[str, Any]] = []
-        if isinstance(channels, dict):
-            for _, ch_conf in channels.items():
-                if isinstance(ch_conf, dict) and ch_conf.get("enable"):
-                    payloads.append(flatten_channel(ch_conf))
-
-        minimal_keys_sets = [
-            ("WEBHOOK_URL", "WEBHOOK_METHOD"),
-            ("QYWX_KEY",),
-            ("TG_BOT_TOKEN", "TG_USER_ID"),
-            ("SMTP_SERVER", "SMTP_EMAIL", "SMTP_PASSWORD"),
-            ("BARK_PUSH",),
-            ("WXPUSHER_APP_TOKEN",),
-            ("GOTIFY_URL", "GOTIFY_TOKEN"),
-        ]
-        valid = []
-        for flat in payloads:
-            for keys in minimal_keys_sets:
-                if all(flat.get(k) for k in keys):
-                    valid.append(flat)
-                    break
-        for flat in valid:
-            notify_module.send(pretty_title, pretty_content, **flat)
+        valid = _task_notify_configs()
+        if not valid:
+            return
+        # 交给通知聚合与分发服务异步推送，任务完成不等待推送结果
+        dispatcher = get_notify_dispatcher()
+        if dispatcher is not None:
+            dispatcher.aggregator.notify(
+                pretty_title, pretty_content, valid,
+                status_key=text, failed=(status_emoji == "❌")
+            )
+        else:
+            from app.utils import notify as notify_module
+            for notify_config in valid:
+                notify_module.send(pretty_title, pretty_content, config=notify_config)
     except Exception as e:
         logger.error(f"发送任务结果通知失败: {e}", exc_info=True)
 
@@ -108,64 +136,78 @@ def _send_task_notify(title: str, content: str):
 router = APIRouter()
 
 # 获取服务实例的依赖函数
-from app.globals import get_hosts_manager, get_cloudflare_service, get_scheduler_service, get_torrent_client_manager
+from app.globals import get_hosts_manager, get_cloudflare_service, get_scheduler_service, get_torrent_client_manager, get_notify_dispatcher, get_dns_server, get_cluster_service, peek_service
+
 
 
 
+def reject_on_cluster_agent():
+    """集群agent的hosts由hub统一生成，拒绝在本机手动运行优选与hosts更新（结果会被hub快照覆盖）"""
+    cluster_service = get_cluster_service()
+    if cluster_service is not None and cluster_service.role == ROLE_AGENT:
+        raise HTTPException(status_code=409, detail="当前节点为集群agent，hosts由hub统一生成，请在hub上执行该操作")
+
 
 def get_config():
-    """从文件获取最新配置"""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f) or {}
-        except Exception as e:
-            logger.error(f"加载配置文件失败: {e}")
-            return {}
-    return {}
+    """从配置存储获取最新配置（副本，包括尚未落盘的修改）"""
+    try:
+        return config_store.load()
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {e}")
+        return {}
 
-# 获取配置（前端拉取用，每次从文件读取）
+# 获取配置（前端拉取用）
 @router.get("/config")
 async def get_config_api():
-    """每次都从文件读取最新配置，防止内存与文件不同步导致tracker状态异常"""
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        return config
-    else:
-        return {}
+    """从配置存储读取最新配置，防止内存与文件不同步导致tracker状态异常"""
+    return get_config()
 
 # 更新配置（CRON表达式校验）
 @router.post("/config")
 async def update_config(
     config_data: Dict[str, Any],
     hosts_manager: HostsManager = Depends(get_hosts_manager),
-    cloudflare_service: CloudflareSpeedTestService = Depends(get_cloudflare_service),
     scheduler_service: SchedulerService = Depends(get_scheduler_service)
 ):
     """更新配置"""
+    from croniter import croniter
     try:
         # CRON表达式校验
         cron_expr = config_data.get("cloudflare", {}).get("cron", "0 0 * * *")
         if not croniter.is_valid(cron_expr):
             raise HTTPException(status_code=400, detail="CRON表达式无效，请检查格式")
-        
-
+        # 定时任务配置校验（以当前配置为基础），无效配置不落盘
+        try:
+            validate_job_specs({**get_config(), **config_data})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # 保存配置
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config_data, f, default_flow_style=False, allow_unicode=True)
+        # 在配置存储的锁内合并提交的顶层键，未提交的配置保持不变
+        config_data = config_store.merge(config_data)
         
         # 更新服务配置
         hosts_manager.update_config(config_data)
-        cloudflare_service.update_config(config_data)
+        # 测速服务延迟创建，尚未创建时无需更新（创建时读取最新配置）
+        cloudflare_service = peek_service("cloudflare_service")
+        if cloudflare_service:
+            cloudflare_service.update_config(config_data)
         
-        # 重启调度器
-        scheduler_service.stop()
+        # 热更新定时任务
         scheduler_service.update_config(config_data)
-        scheduler_service.start()
+        
+        # 本地DNS服务：启用状态或监听地址变化时重启
+        dns_server = get_dns_server()
+        if dns_server:
+            dns_server.update_config(config_data)
+        
+        # 集群角色或hub地址变化时重启agent同步
+        cluster_service = get_cluster_service()
+        if cluster_service:
+            cluster_service.update_config(config_data)
         
         return {"message": "配置已更新"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"更新配置失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"更新配置失败: {str(e)}")
@@ -233,10 +275,8 @@ async def update_auth_config(
                 request.session.pop("user", None) 
 
     if config_changed:
-        current_config["auth"] = auth_settings
         try:
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                yaml.dump(current_config, f, default_flow_style=False, allow_unicode=True)
+            config_store.merge({"auth": auth_settings})
             
             # 重新加载全局配置，确保认证配置变更立即生效
             from app.auth import reload_global_config
@@ -268,7 +308,7 @@ async def update_auth_config(
     return {"message": "未检测到配置更改"}
 
 # 手动运行CloudflareSpeedTest
-@router.post("/run-cloudflare-test")
+@router.post("/run-cloudflare-test", dependencies=[Depends(reject_on_cluster_agent)])
 async def run_cloudflare_test(
     background_tasks: BackgroundTasks,
     hosts_manager: HostsManager = Depends(get_hosts_manager)
@@ -301,6 +341,85 @@ async def get_scheduler_status(
         "jobs": scheduler_service.get_jobs()
     }
 
+# 获取优选候选IP池
+@router.get("/cfst/pool")
+async def get_ip_pool(
+    hosts_manager: HostsManager = Depends(get_hosts_manager)
+):
+    """获取最近一次优选保留的候选IP池（按排名）"""
+    return hosts_manager.ip_pool.to_dict()
+
+# 获取本地DNS服务状态
+@router.get("/dns/status")
+async def get_dns_status():
+    """获取本地DNS服务的运行状态、域名数量与查询统计"""
+    dns_server = get_dns_server()
+    if not dns_server:
+        raise HTTPException(status_code=503, detail="本地DNS服务未初始化")
+    return dns_server.get_status()
+
+# 集群hub：长轮询获取hosts快照
+@router.get("/cluster/snapshot")
+async def get_cluster_snapshot(
+    request: Request,
+    since: int = Query(0, ge=0),
+    instance: str = Query(""),
+    timeout: float = Query(60, ge=0, le=300),
+):
+    """返回比 since 新的快照（hub重启后instance变化时总是返回）；等待 timeout 秒仍无新版本时返回204"""
+    cluster_service = get_cluster_service()
+    if not cluster_service or cluster_service.role != "hub":
+        raise HTTPException(status_code=404, detail="当前节点不是集群hub")
+    if not cluster_service.check_token(request.headers.get("X-Cluster-Token")):
+        raise HTTPException(status_code=403, detail="集群令牌无效")
+    snapshot = await cluster_service.publisher.wait(since, instance, timeout)
+    if snapshot is None:
+        return Response(status_code=204)
+    return snapshot
+
+# 获取集群状态
+@router.get("/cluster/status")
+async def get_cluster_status():
+    """获取集群角色、快照版本，agent模式下包括同步状态"""
+    cluster_service = get_cluster_service()
+    if not cluster_service:
+        raise HTTPException(status_code=503, detail="集群服务未初始化")
+    return cluster_service.get_status()
+
+# 获取hosts各分区的版本与更新时间
+@router.get("/hosts/sections")
+async def get_hosts_sections(
+    hosts_manager: HostsManager = Depends(get_hosts_manager)
+):
+    """PT站点分区与MergedHosts分区分别更新，各自带独立的版本号与最近更新时间"""
+    return hosts_manager.section_status()
+
+# 获取域名黑名单规则与命中统计
+@router.get("/blacklist/stats")
+async def get_blacklist_stats(
+    hosts_manager: HostsManager = Depends(get_hosts_manager)
+):
+    """获取域名黑名单规则及每条规则的累计命中次数"""
+    return hosts_manager.blacklist.stats()
+
+# 获取优选历史
+@router.get("/cfst/history")
+async def get_cfst_history(
+    days: float = Query(7, gt=0, le=365),
+    limit: int = Query(20, ge=1, le=500),
+    hosts_manager: HostsManager = Depends(get_hosts_manager)
+):
+    """获取最近 days 天的优选记录，以及按IP汇总的延迟/速度中位数"""
+    try:
+        return {
+            "days": days,
+            "runs": hosts_manager.cfst_history.runs(days, limit),
+            "ips": hosts_manager.cfst_history.aggregate(days, limit),
+        }
+    except Exception as e:
+        logger.error(f"获取优选历史失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"获取优选历史失败: {str(e)}")
+
 # 兼容旧版前端，避免404错误
 @router.get("/last-result")
 async def get_last_result_compatibility():
@@ -354,23 +473,54 @@ async def get_task_status(
 # 获取日志
 @router.get("/logs")
 async def get_logs(lines: int = 1000):
-    """获取最近的日志，统一按UTF-8读取并返回字符串，避免分块解码导致的乱码。"""
+    """获取最近的日志：从文件末尾反向按块读取，只解码需要的行，避免整文件扫描。"""
     log_file = "logs/app.log"
     try:
         if not os.path.exists(log_file):
             return {"logs": ""}
 
-        # 使用 UTF-8 严格解码，遇到异常字符以替换符显示，避免抛错
-        from collections import deque
-        dq = deque(maxlen=max(10, lines))
-        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-            for line in f:
-                dq.append(line.rstrip('\n'))
-        return {"logs": "\n".join(list(dq)[-lines:])}
+        # 逐行按UTF-8解码，异常字符以替换符显示，避免抛错
+        # 同时返回内存日志缓冲的最新ID，前端据此通过 /api/logs/query 增量拉取
+        buffer_handler = get_ring_buffer_handler()
+        last_id = buffer_handler.last_id if buffer_handler else None
+        return {"logs": "\n".join(tail_lines(log_file, max(1, lines))), "last_id": last_id}
     except Exception as e:
         logger.error(f"获取日志失败: {str(e)}")
         return {"logs": "日志读取失败，请检查日志文件权限和编码"}
 
+@router.get("/logs/query")
+async def query_logs(
+    level: str = Query(None, description="最低日志级别，如 INFO / WARNING / ERROR"),
+    logger_name: str = Query(None, alias="logger", description="logger名称，包含其子logger，如 notify 或 notify.telegram"),
+    since: str = Query(None, description="开始时间（Unix时间戳或 YYYY-MM-DD HH:MM:SS）"),
+    until: str = Query(None, description="结束时间（Unix时间戳或 YYYY-MM-DD HH:MM:SS）"),
+    q: str = Query(None, description="消息关键字（不区分大小写）"),
+    since_id: int = Query(None, description="只返回ID大于该值的记录，用于增量拉取"),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """从内存环形日志缓冲中结构化查询日志"""
+    buffer_handler = get_ring_buffer_handler()
+    if buffer_handler is None:
+        return {"records": [], "last_id": None, "truncated": False}
+    try:
+        min_level = parse_level(level)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日志级别无效，请使用 DEBUG / INFO / WARNING / ERROR / CRITICAL 或数值")
+    try:
+        since_ts = parse_time(since)
+        until_ts = parse_time(until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="时间格式无效，请使用Unix时间戳或 YYYY-MM-DD HH:MM:SS")
+    return buffer_handler.query(
+        level=min_level,
+        logger_name=logger_name,
+        since=since_ts,
+        until=until_ts,
+        keyword=q,
+        since_id=since_id,
+        limit=limit,
+    )
+
 @router.post("/logs/clear")
 async def clear_logs():
     """清空日志文件内容"""
@@ -381,6 +531,9 @@ async def clear_logs():
         # 以写模式截断文件
         with open(log_file, 'w', encoding='utf-8') as f:
             f.write("")
+        buffer_handler = get_ring_buffer_handler()
+        if buffer_handler:
+            buffer_handler.clear()
         logger.info("日志文件已被清空")
         return {"success": True, "message": "日志已清空"}
     except Exception as e:
@@ -397,12 +550,12 @@ async def get_cloudflare_domains():
 
 @router.post("/cloudflare-domains")
 async def add_cloudflare_domain(background_tasks: BackgroundTasks, domain: str = Query(..., description="要添加的Cloudflare域名")):
-    config = get_config()
-    domains = set(config.get("cloudflare_domains", []))
-    domains.add(domain.strip().lower())
-    config["cloudflare_domains"] = list(domains)
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+    def add_domain(config):
+        domains = set(config.get("cloudflare_domains", []))
+        domains.add(domain.strip().lower())
+        config["cloudflare_domains"] = list(domains)
+    config = config_store.update(add_domain)
+    domains = config["cloudflare_domains"]
     hosts_manager = get_hosts_manager()
     hosts_manager.update_config(config)
     try:
@@ -416,12 +569,12 @@ async def add_cloudflare_domain(background_tasks: BackgroundTasks, domain: str =
 
 @router.delete("/cloudflare-domains")
 async def delete_cloudflare_domain(background_tasks: BackgroundTasks, domain: str = Query(..., description="要删除的Cloudflare域名")):
-    config = get_config()
-    domains = set(config.get("cloudflare_domains", []))
-    domains.discard(domain.strip().lower())
-    config["cloudflare_domains"] = list(domains)
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+    def remove_domain(config):
+        domains = set(config.get("cloudflare_domains", []))
+        domains.discard(domain.strip().lower())
+        config["cloudflare_domains"] = list(domains)
+    config = config_store.update(remove_domain)
+    domains = config["cloudflare_domains"]
     hosts_manager = get_hosts_manager()
     hosts_manager.update_config(config)
     try:
@@ -447,31 +600,21 @@ async def add_tracker(
             domain = re.sub(r"^https?://", "", domain, flags=re.IGNORECASE)
             domain = domain.split("/")[0]
             tracker["domain"] = domain
-        config = get_config()
-        if "trackers" not in config:
-            config["trackers"] = []
-        for existing in config["trackers"]:
-            if existing["domain"] == tracker["domain"]:
-                raise HTTPException(status_code=400, detail="Tracker已存在")
-        ip_set = set()
-        for t in config["trackers"]:
-            if t.get("enable") and t.get("ip"):
-                ip_set.add(t["ip"])
-        if len(ip_set) > 1:
-            raise HTTPException(status_code=400, detail="检测到现有Tracker的IP不一致，请先统一所有Tracker的IP后再添加。")
-        elif len(ip_set) == 1:
-            default_ip = list(ip_set)[0]
-        else:
-            default_ip = hosts_manager.best_cloudflare_ip or "104.16.91.215"
-        tracker["ip"] = default_ip
-        config["trackers"].append(tracker)
-        # 新增：如force_cloudflare为True，自动写入白名单
-        if force_cloudflare:
-            domains = set(config.get("cloudflare_domains", []))
-            domains.add(domain.strip().lower())
-            config["cloudflare_domains"] = list(domains)
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        # 按Tracker优选时各Tracker的IP本就不同，新Tracker使用全局最优IP，下次优选时再单独选择
+        tracker["ip"] = hosts_manager.default_tracker_ip()
+        def add(config):
+            if "trackers" not in config:
+                config["trackers"] = []
+            for existing in config["trackers"]:
+                if existing["domain"] == tracker["domain"]:
+                    raise HTTPException(status_code=400, detail="Tracker已存在")
+            config["trackers"].append(tracker)
+            # 新增：如force_cloudflare为True，自动写入白名单
+            if force_cloudflare:
+                domains = set(config.get("cloudflare_domains", []))
+                domains.add(domain.strip().lower())
+                config["cloudflare_domains"] = list(domains)
+        config = config_store.update(add)
         hosts_manager.update_config(config)
         # 统一异步触发hosts更新，避免接口阻塞
         background_tasks.add_task(hosts_manager.update_hosts)
@@ -496,19 +639,14 @@ async def delete_tracker(
     """删除Tracker"""
     try:
         # 更新配置
-        config = get_config()
-        if "trackers" not in config:
-            raise HTTPException(status_code=404, detail="Tracker不存在")
-        
-        found = False
-        config["trackers"] = [t for t in config["trackers"] if t["domain"] != domain]
+        def remove(config):
+            if "trackers" not in config:
+                raise HTTPException(status_code=404, detail="Tracker不存在")
+            config["trackers"] = [t for t in config["trackers"] if t["domain"] != domain]
+        config = config_store.update(remove)
         # 新增：同步清理历史
         hosts_manager.remove_tracker_domain(domain)
         
-        # 保存配置
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
-        
         # 更新hosts_manager的配置
         hosts_manager.update_config(config)
         
@@ -547,15 +685,14 @@ async def add_hosts_source(
         if not parsed.scheme or not parsed.netloc:
             raise HTTPException(status_code=400, detail="Hosts源URL无效，请检查格式")
         source["url"] = url
-        config = get_config()
-        if "hosts_sources" not in config:
-            config["hosts_sources"] = []
-        for existing in config["hosts_sources"]:
-            if existing["url"] == source["url"]:
-                raise HTTPException(status_code=400, detail="hosts源已存在")
-        config["hosts_sources"].append(source)
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        def add(config):
+            if "hosts_sources" not in config:
+                config["hosts_sources"] = []
+            for existing in config["hosts_sources"]:
+                if existing["url"] == source["url"]:
+                    raise HTTPException(status_code=400, detail="hosts源已存在")
+            config["hosts_sources"].append(source)
+        config = config_store.update(add)
         
         # 更新hosts_manager的配置
         hosts_manager.update_config(config)
@@ -585,12 +722,11 @@ async def delete_hosts_source(
 ):
     """删除hosts源"""
     try:
-        config = get_config()
-        if "hosts_sources" not in config:
-            raise HTTPException(status_code=404, detail="hosts源不存在")
-        config["hosts_sources"] = [s for s in config["hosts_sources"] if s["url"] != url]
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        def remove(config):
+            if "hosts_sources" not in config:
+                raise HTTPException(status_code=404, detail="hosts源不存在")
+            config["hosts_sources"] = [s for s in config["hosts_sources"] if s["url"] != url]
+        config = config_store.update(remove)
             
         # 更新hosts_manager的配置
         hosts_manager.update_config(config)
@@ -613,7 +749,7 @@ async def delete_hosts_source(
         raise HTTPException(status_code=500, detail=f"删除hosts源失败: {str(e)}")
 
 # 手动更新hosts
-@router.post("/update-hosts")
+@router.post("/update-hosts", dependencies=[Depends(reject_on_cluster_agent)])
 async def update_hosts(
     background_tasks: BackgroundTasks,
     hosts_manager: HostsManager = Depends(get_hosts_manager)
@@ -633,6 +769,33 @@ async def update_hosts(
         logger.error(f"更新hosts失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"更新hosts失败: {str(e)}")
 
+# 导出映射（hosts / dnsmasq / adguard / clash / json）
+@router.get("/export/{fmt}")
+async def export_hosts(
+    fmt: str,
+    request: Request,
+    hosts_manager: HostsManager = Depends(get_hosts_manager)
+):
+    """导出最近一次生成的映射：内容已预渲染并缓存，支持ETag（If-None-Match返回304）与gzip"""
+    artifact = hosts_manager.exporter.get(fmt)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail=f"不支持的导出格式: {fmt}")
+    # gzip与原始内容是不同的表示，各自使用不同的ETag；两者对应同一份内容，If-None-Match 匹配任一即为未修改
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": artifact.gzip_etag if use_gzip else artifact.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    client_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if if_none_match.strip() == "*" or artifact.etag in client_tags or artifact.gzip_etag in client_tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=artifact.gzipped, media_type=artifact.media_type, headers=headers)
+    return Response(content=artifact.content, media_type=artifact.media_type, headers=headers)
+
 # 获取当前hosts
 @router.get("/current-hosts")
 async def get_current_hosts(
@@ -684,50 +847,32 @@ async def batch_add_domains(
         if not domains:
             return {"status": "warning", "message": "没有提供有效的域名"}
         
-        # 读取当前配置
-        config = get_config()
-        if "trackers" not in config:
-            config["trackers"] = []
-            
-        # 检查所有tracker的IP是否一致
-        ip_set = set()
-        for t in config["trackers"]:
-            if t.get("enable") and t.get("ip"):
-                ip_set.add(t["ip"])
-                
-        if len(ip_set) > 1:
-            return {"status": "error", "message": "检测到现有Tracker的IP不一致，请先统一所有Tracker的IP后再添加。"}
-        
-        # 获取默认IP
-        if len(ip_set) == 1:
-            default_ip = list(ip_set)[0]
-        else:
-            # 没有tracker时，使用优选IP或默认IP
-            default_ip = hosts_manager.best_cloudflare_ip or "104.16.91.215"
+        # 获取默认IP（允许现有Tracker的IP不一致，例如按Tracker优选时）
+        default_ip = hosts_manager.default_tracker_ip()
             
         # 处理结果统计
         added = []
         skipped = []
         
-        # 批量添加域名
-        for domain in domains:
-            # 检查是否已存在
-            if any(t["domain"] == domain for t in config["trackers"]):
-                skipped.append(domain)
-                continue
-                
-            # 添加新tracker
-            config["trackers"].append({
-                "name": domain,
-                "domain": domain,
-                "ip": default_ip,
-                "enable": True
-            })
-            added.append(domain)
-            
-        # 保存配置
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        # 批量添加域名（在配置存储的锁内基于最新配置修改并保存）
+        def add(config):
+            if "trackers" not in config:
+                config["trackers"] = []
+            for domain in domains:
+                # 检查是否已存在
+                if any(t["domain"] == domain for t in config["trackers"]):
+                    skipped.append(domain)
+                    continue
+                    
+                # 添加新tracker
+                config["trackers"].append({
+                    "name": domain,
+                    "domain": domain,
+                    "ip": default_ip,
+                    "enable": True
+                })
+                added.append(domain)
+        config = config_store.update(add)
             
         # 更新hosts_manager的配置
         hosts_manager.update_config(config)
@@ -760,7 +905,7 @@ async def batch_add_domains(
         return {"status": "error", "message": f"批量添加域名失败: {str(e)}"}
 
 # 运行CloudflareSpeedTest优选脚本
-@router.post("/run-cfst-script")
+@router.post("/run-cfst-script", dependencies=[Depends(reject_on_cluster_agent)])
 async def run_cfst_script(
     background_tasks: BackgroundTasks,
     hosts_manager: HostsManager = Depends(get_hosts_manager)
@@ -781,7 +926,7 @@ async def run_cfst_script(
         raise HTTPException(status_code=500, detail=f"启动组合任务失败: {str(e)}")
 
 # 手动更新所有Tracker为最佳IP
-@router.post("/update-all-trackers")
+@router.post("/update-all-trackers", dependencies=[Depends(reject_on_cluster_agent)])
 async def update_all_trackers(
     ip: str,
     hosts_manager: HostsManager = Depends(get_hosts_manager)
@@ -869,12 +1014,8 @@ async def save_torrent_clients(
         if len(client_ids) != len(set(client_ids)):
             return {"success": False, "message": "客户端ID不能重复"}
         
-        # 更新配置
-        config["torrent_clients"] = clients_config
-        
-        # 保存配置到文件
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        # 更新配置（只替换下载器列表，其余配置以存储中的最新版本为准）
+        config = config_store.merge({"torrent_clients": clients_config})
         
         # 更新 TorrentClientManager
         torrent_client_manager = get_torrent_client_manager()
@@ -891,7 +1032,7 @@ async def save_torrent_clients(
 @router.post("/test-client-connection")
 async def test_client_connection(
     request: Request,
-    torrent_client_manager: TorrentClientManager = Depends(get_torrent_client_manager)
+    torrent_client_manager: "TorrentClientManager" = Depends(get_torrent_client_manager)
 ):
     """测试下载器连接"""
     try:
@@ -955,20 +1096,13 @@ async def delete_torrent_client(
 ):
     """删除指定的下载器客户端"""
     try:
-        clients_config = config.get("torrent_clients", [])
-        
-        # 查找并删除指定客户端
-        updated_clients = [client for client in clients_config if client.get("id") != client_id]
-        
-        if len(updated_clients) == len(clients_config):
+        if not any(client.get("id") == client_id for client in config.get("torrent_clients", [])):
             return {"success": False, "message": f"未找到客户端: {client_id}"}
         
-        # 更新配置
-        config["torrent_clients"] = updated_clients
-        
-        # 保存配置到文件
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        # 查找并删除指定客户端
+        def remove(config):
+            config["torrent_clients"] = [client for client in config.get("torrent_clients", []) if client.get("id") != client_id]
+        config = config_store.update(remove)
         
         # 更新 TorrentClientManager
         torrent_client_manager = get_torrent_client_manager()
@@ -1017,16 +1151,12 @@ async def get_notify_config():
 async def save_notify_config(payload: Dict[str, Any]):
     """保存通知配置到config.yaml，并保持其余配置不变"""
     try:
-        config = get_config()
         new_notify = payload.get("notify", {})
         if not isinstance(new_notify, dict):
             return {"success": False, "message": "无效的通知配置"}
 
         # 更新配置
-        config["notify"] = new_notify
-
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        config = config_store.merge({"notify": new_notify})
 
         # 尝试同步到全局config，便于前端刷新
         try:
@@ -1035,6 +1165,10 @@ async def save_notify_config(payload: Dict[str, Any]):
         except Exception:
             pass
 
+        dispatcher = get_notify_dispatcher()
+        if dispatcher is not None:
+            dispatcher.update_config(config)
+
         logger.info("通知配置已保存")
         return {"success": True, "message": "通知配置已保存"}
     except Exception as e:
@@ -1138,9 +1272,15 @@ async def test_notify(payload: Dict[str, Any]):
             return {"success": True, "message": "标题在跳过列表中，未发送"}
 
         # 分渠道依次发送（每次send只带该渠道相关字段，从而按渠道的HITOKOTO生效）
-        for flat in valid_payloads:
-            # 测试发送时仅使用本渠道配置
-            notify_module.send(title, content, ignore_default_config=True, **flat)
+        # 测试发送时仅使用本渠道配置；交给分发服务异步执行，避免阻塞事件循环
+        dispatcher = get_notify_dispatcher()
+        if dispatcher is not None:
+            if not dispatcher.submit(title, content, valid_payloads, ignore_default_config=True):
+                return {"success": False, "message": "通知队列已满，请稍后重试"}
+        else:
+            from app.utils import notify as notify_module
+            for flat in valid_payloads:
+                notify_module.send(title, content, ignore_default_config=True, **flat)
         return {"success": True, "message": "测试通知请求已发出，请检查渠道接收情况"}
     except Exception as e:
         logger.error(f"测试通知发送失败: {str(e)}", exc_info=True)
@@ -1161,47 +1301,11 @@ async def import_trackers_from_clients_route(
         logger.info(f"导入结果: {result}")
         
         if result.get("status") == "success" and result.get("all_domains"):
-            existing_domains = {tracker['domain'] for tracker in config.get('trackers', [])}
-            new_trackers_added = False
-            cf_domains = []
-            non_cf_domains = []
-            
-            # 临时调整日志级别为DEBUG，以便查看详细的Cloudflare检测日志
-            hosts_manager_logger = logging.getLogger('app.services.hosts_manager')
-            original_level = hosts_manager_logger.level
-            hosts_manager_logger.setLevel(logging.DEBUG)
-            
-            # 域名清洗和Cloudflare检测
-            for domain in result["all_domains"]:
-                # 清洗tracker域名，移除http前缀和路径
-                d = re.sub(r"^https?://", "", domain, flags=re.IGNORECASE)
-                d = d.split("/")[0]
-                domain = d
-                
-                # 提取纯域名（移除端口号）用于Cloudflare检测
-                clean_domain = domain.split(':')[0] if ':' in domain else domain
-                
-                logger.info(f"[Cloudflare检测] 正在检测下载器导入的域名: {clean_domain}")
-                # 检测Cloudflare
-                if hosts_manager.is_cloudflare_domain(clean_domain):
-                    cf_domains.append(domain)
-                    if domain not in existing_domains:
-                        default_ip = DEFAULT_CLOUDFLARE_IP
-                        new_tracker = {
-                            "name": domain,
-                            "domain": domain,
-                            "enable": True,
-                            "ip": default_ip
-                        }
-                        config.setdefault('trackers', []).append(new_tracker)
-                        existing_domains.add(domain)
-                        new_trackers_added = True
-                else:
-                    logger.info(f"[Cloudflare检测] 域名 {clean_domain} 不是Cloudflare域名，已跳过")
-                    non_cf_domains.append(domain)
-            
-            # 恢复原有日志级别
-            hosts_manager_logger.setLevel(original_level)
+            hosts_manager.update_config(config)
+            import_result = hosts_manager.import_tracker_domains(result["all_domains"])
+            cf_domains = import_result["cf_domains"]
+            non_cf_domains = import_result["non_cf_domains"]
+            new_trackers_added = bool(import_result["added"])
             
             # 统一输出检测结果
             if cf_domains:
@@ -1217,13 +1321,9 @@ async def import_trackers_from_clients_route(
             
             # 只有有新的Cloudflare站点时才更新配置文件
             if new_trackers_added:
-                with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                    yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
-                logger.info("已更新配置文件，添加了新的Tracker")
-                hosts_manager.update_config(config)
                 try:
                     import app.main
-                    app.main.config = config
+                    app.main.config = hosts_manager.config
                     logger.info("同步刷新全局config对象，确保前端获取到最新tracker列表")
                 except Exception as e:
                     logger.error(f"刷新全局config对象失败: {str(e)}")
@@ -1260,7 +1360,7 @@ async def import_trackers_from_clients_route(
         logger.error(f"从下载器客户端导入Tracker失败: {str(e)}", exc_info=True)
         return {"status": "error", "message": f"导入过程中发生错误: {str(e)}"}
 
-@router.post("/clear-and-update-hosts")
+@router.post("/clear-and-update-hosts", dependencies=[Depends(reject_on_cluster_agent)])
 async def clear_and_update_hosts(
     background_tasks: BackgroundTasks,
     hosts_manager: HostsManager = Depends(get_hosts_manager)
@@ -1289,10 +1389,7 @@ async def clear_all_trackers(
 ):
     """清空所有tracker并同步更新hosts"""
     try:
-        config = get_config()
-        config["trackers"] = []
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        config = config_store.merge({"trackers": []})
         hosts_manager.update_config(config)
         try:
             import app.main
@@ -1,11 +1,13 @@
 from fastapi import Request, HTTPException, status
 from passlib.context import CryptContext
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadTimeSignature
-import os
-import yaml
 import logging
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from app.models import User
+from app.utils.config_store import config_store
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -16,13 +18,65 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Session 签名器
 session_serializer = None
 
-# 配置路径
-CONFIG_PATH = "config/config.yaml"
+# Session token 有效期（7天）
+SESSION_MAX_AGE = 3600 * 24 * 7
+# 已验证token缓存：容量与单条缓存时间（秒），命中时跳过HMAC校验
+TOKEN_CACHE_SIZE = 256
+TOKEN_CACHE_TTL = 300
+
+# token -> (用户名, 缓存过期时间)
+_token_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+# (配置版本号, 认证配置)
+_auth_settings_cache: Tuple[int, Dict[str, Any]] = (-1, {})
 
 def init_session_serializer(secret_key: str):
     """初始化session签名器"""
     global session_serializer
     session_serializer = URLSafeTimedSerializer(secret_key)
+    # 密钥变化后旧token全部失效
+    clear_token_cache()
+
+def clear_token_cache():
+    """清空已验证token缓存"""
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def get_auth_settings() -> Dict[str, Any]:
+    """按配置版本号缓存的认证配置（只读），配置未变化时不重复读取"""
+    global _auth_settings_cache
+    try:
+        version, config = config_store.snapshot()
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {e}")
+        return {}
+    if _auth_settings_cache[0] != version:
+        _auth_settings_cache = (version, config.get("auth", {}) or {})
+    return _auth_settings_cache[1]
+
+def verify_session_token(token: str) -> Optional[str]:
+    """
+    校验session token并返回用户名。
+
+    校验通过的token缓存在LRU中（过期时间不超过token自身有效期），重复请求无需再次计算HMAC。
+    token无效或过期时抛出 SignatureExpired / BadTimeSignature。
+    """
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            if cached[1] > now:
+                _token_cache.move_to_end(token)
+                return cached[0]
+            del _token_cache[token]
+    username, signed_at = session_serializer.loads(token, max_age=SESSION_MAX_AGE, return_timestamp=True)
+    expires_at = min(now + TOKEN_CACHE_TTL, signed_at.timestamp() + SESSION_MAX_AGE)
+    with _token_cache_lock:
+        _token_cache[token] = (username, expires_at)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return username
 
 def verify_password(plain_password, hashed_password):
     """验证密码"""
@@ -34,11 +88,11 @@ def get_password_hash(password):
 
 async def get_current_user(request: Request) -> Optional[User]:
     """获取当前登录用户"""
-    # 加载当前配置以检查认证是否启用
-    config = load_current_config()
+    # 读取缓存的认证配置以检查认证是否启用
+    auth_settings = get_auth_settings()
     
     # 如果未启用认证，返回游客用户
-    if not config.get("auth", {}).get("enable", False):
+    if not auth_settings.get("enable", False):
         return User(username="guest", is_authenticated=False)
     
     # 检查session中的用户信息
@@ -49,7 +103,7 @@ async def get_current_user(request: Request) -> Optional[User]:
     try:
         # 验证session token  
         if session_serializer and user_data.get("token"):
-            username = session_serializer.loads(user_data.get("token", ""), max_age=3600*24*7)  # 7天有效期
+            username = verify_session_token(user_data.get("token", ""))  # 7天有效期
             if username == user_data.get("username"):
                 return User(username=username, is_authenticated=True)
         elif user_data.get("username"):
@@ -63,32 +117,16 @@ async def get_current_user(request: Request) -> Optional[User]:
     return None
 
 def load_current_config():
-    """加载当前配置文件"""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            # 优先UTF-8，失败回退GBK/GB18030
-            try:
-                with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    config = yaml.safe_load(f) or {}
-                # 确保配置中有auth部分（UTF-8成功路径也需保证）
-                if "auth" not in config:
-                    config["auth"] = {}
-                return config
-            except UnicodeDecodeError:
-                try:
-                    with open(CONFIG_PATH, 'r', encoding='gbk') as f:
-                        config = yaml.safe_load(f) or {}
-                except UnicodeDecodeError:
-                    with open(CONFIG_PATH, 'r', encoding='gb18030') as f:
-                        config = yaml.safe_load(f) or {}
-                # 确保配置中有auth部分
-                if "auth" not in config:
-                    config["auth"] = {}
-                return config
-        except Exception as e:
-            logger.error(f"加载配置文件失败: {e}")
-            return {"auth": {}}
-    return {"auth": {}}
+    """加载当前配置（经由配置存储，UTF-8优先，回退GBK/GB18030）"""
+    try:
+        config = config_store.load()
+    except Exception as e:
+        logger.error(f"加载配置文件失败: {e}")
+        return {"auth": {}}
+    # 确保配置中有auth部分
+    if "auth" not in config:
+        config["auth"] = {}
+    return config
 
 def create_user_session(username: str) -> dict:
     """创建用户session数据"""
@@ -122,4 +160,4 @@ def reload_global_config():
         return True
     except Exception as e:
         logger.error(f"重新加载全局配置失败: {e}")
-        return False 
\ No newline at end of file
+        return False 
\ No newline at end of file
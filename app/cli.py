@@ -0,0 +1,200 @@
+"""
+命令行入口：python -m app.cli <命令> [参数]
+
+不加载Web应用与调度器，只构建当前命令需要的服务，结果以JSON输出到标准输出（日志输出到标准错误），
+适合在精简容器或宿主机crontab中直接运行。
+
+退出码：0 成功；1 任务失败；2 参数或配置错误；130 被中断。
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger("app.cli")
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class CLIError(Exception):
+    """参数或配置错误（退出码2）"""
+
+
+def _load_config() -> Dict[str, Any]:
+    from app.utils.config_store import config_store
+    if not config_store.exists():
+        raise CLIError(f"配置文件不存在: {config_store.path}，请在程序目录下运行，或先启动一次Web服务生成默认配置")
+    config = config_store.load()
+    if not config:
+        raise CLIError(f"配置文件为空或无法解析: {config_store.path}")
+    return config
+
+
+def _hosts_manager(config: Dict[str, Any], dry_run: bool):
+    from app.services.hosts_manager import HostsManager
+    hosts_manager = HostsManager(config)
+    hosts_manager.update_config(config)
+    hosts_manager.dry_run = dry_run
+    return hosts_manager
+
+
+def _sections_result(hosts_manager, dry_run: bool) -> Dict[str, Any]:
+    pt_entries, merged_entries = hosts_manager.published_sections()
+    result: Dict[str, Any] = {"pt_entries": len(pt_entries), "merged_entries": len(merged_entries)}
+    if dry_run:
+        # 演练模式不写hosts文件，直接输出将要写入的条目
+        result["entries"] = {"pt_sites": pt_entries, "hosts": merged_entries}
+    return result
+
+
+def cmd_update_hosts(args, config: Dict[str, Any]) -> Dict[str, Any]:
+    """拉取hosts源、检测IP并重新生成hosts（不运行优选脚本）"""
+    hosts_manager = _hosts_manager(config, args.dry_run)
+    ok = bool(hosts_manager.update_hosts())
+    result = {"ok": ok, "message": hosts_manager.get_task_status().get("message")}
+    result.update(_sections_result(hosts_manager, args.dry_run))
+    return result
+
+
+def cmd_cfst(args, config: Dict[str, Any]) -> Dict[str, Any]:
+    """运行Cloudflare优选脚本，更新Tracker IP并重新生成hosts"""
+    import os
+    hosts_manager = _hosts_manager(config, args.dry_run)
+    script_path = hosts_manager.resolve_cfst_script(args.script)
+    if args.dry_run:
+        # 优选脚本本身会改写hosts文件与nowip_hosts.txt，演练模式下不执行，只报告将要执行的内容
+        trackers = [t["domain"] for t in config.get("trackers", []) or [] if t.get("enable") and t.get("domain")]
+        return {
+            "ok": os.path.exists(script_path),
+            "message": "演练模式：未运行优选脚本",
+            "script": script_path,
+            "script_exists": os.path.exists(script_path),
+            "update_hosts": not args.skip_hosts,
+            "trackers": trackers,
+            "candidates": hosts_manager.ip_pool.ips(),
+        }
+    if args.skip_hosts:
+        ok = hosts_manager.run_cfst(script_path)
+    else:
+        ok = hosts_manager.run_cfst_and_update_hosts(script_path)
+    result = {
+        "ok": bool(ok),
+        "message": hosts_manager.get_task_status().get("message"),
+        "best_ip": hosts_manager.best_cloudflare_ip,
+        "candidates": hosts_manager.ip_pool.ips(),
+    }
+    if not args.skip_hosts:
+        result.update(_sections_result(hosts_manager, False))
+    return result
+
+
+def cmd_import_trackers(args, config: Dict[str, Any]) -> Dict[str, Any]:
+    """从已启用的下载器导入Tracker，检测Cloudflare后将新站点加入配置"""
+    from app.services.torrent_clients import TorrentClientManager
+    fetched = TorrentClientManager(config).import_trackers_from_clients()
+    clients = {
+        client_id: {"name": info.get("name"), "count": info.get("count", 0), "success": info.get("success", False)}
+        for client_id, info in (fetched.get("client_results") or {}).items()
+    }
+    domains = sorted(fetched.get("all_domains") or [])
+    if fetched.get("status") != "success" or not domains:
+        return {"ok": False, "message": fetched.get("message") or "未从下载器获取到Tracker", "clients": clients}
+    hosts_manager = _hosts_manager(config, args.dry_run)
+    imported = hosts_manager.import_tracker_domains(domains)
+    return {
+        "ok": True,
+        "message": f"获取到 {len(domains)} 个Tracker域名，新增 {len(imported['added'])} 个Cloudflare站点",
+        "clients": clients,
+        "added": imported["added"],
+        "cloudflare": imported["cf_domains"],
+        "non_cloudflare": imported["non_cf_domains"],
+    }
+
+
+def cmd_classify(args, config: Dict[str, Any]) -> Dict[str, Any]:
+    """检测域名是否使用Cloudflare（只读，不修改配置）"""
+    from app.utils.public_suffix import registrable_domain
+    domains: List[str] = list(args.domains)
+    if args.trackers:
+        domains += [t["domain"] for t in config.get("trackers", []) or [] if t.get("domain")]
+    if not domains:
+        raise CLIError("请指定要检测的域名，或使用 --trackers 检测配置中的全部Tracker")
+    hosts_manager = _hosts_manager(config, True)
+    results = []
+    for domain in dict.fromkeys(domains):
+        clean_domain = domain.split(":", 1)[0]
+        results.append({
+            "domain": domain,
+            "zone": registrable_domain(clean_domain) or clean_domain,
+            "cloudflare": bool(hosts_manager.is_cloudflare_domain(clean_domain)),
+        })
+    return {
+        "ok": True,
+        "message": f"检测 {len(results)} 个域名，其中 {sum(r['cloudflare'] for r in results)} 个使用Cloudflare",
+        "results": results,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="PT-Accelerator 命令行工具（结果以JSON输出）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出INFO级别日志到标准错误")
+    parser.add_argument("--pretty", action="store_true", help="格式化JSON输出")
+    subparsers = parser.add_subparsers(dest="command", metavar="命令")
+    subparsers.required = True
+
+    def add_command(name: str, func, help_text: str) -> argparse.ArgumentParser:
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument("--dry-run", action="store_true", help="演练：照常计算，但不写hosts文件与配置文件")
+        sub.set_defaults(func=func)
+        return sub
+
+    add_command("update-hosts", cmd_update_hosts, "拉取hosts源并重新生成hosts")
+    cfst = add_command("cfst", cmd_cfst, "运行Cloudflare优选并更新Tracker IP与hosts")
+    cfst.add_argument("--script", help="优选脚本路径（默认按平台自动选择）")
+    cfst.add_argument("--skip-hosts", action="store_true", help="只更新Tracker IP，不重新生成hosts源分区")
+    add_command("import-trackers", cmd_import_trackers, "从下载器导入Cloudflare站点Tracker")
+    classify = add_command("classify", cmd_classify, "检测域名是否使用Cloudflare")
+    classify.add_argument("domains", nargs="*", help="要检测的域名")
+    classify.add_argument("--trackers", action="store_true", help="同时检测配置中的全部Tracker域名")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+    started = time.perf_counter()
+    try:
+        result = args.func(args, _load_config())
+        code = EXIT_OK if result.get("ok") else EXIT_FAILED
+    except CLIError as e:
+        result, code = {"ok": False, "message": str(e)}, EXIT_USAGE
+    except KeyboardInterrupt:
+        result, code = {"ok": False, "message": "已中断"}, EXIT_INTERRUPTED
+    except Exception as e:
+        logger.error(f"执行命令 {args.command} 失败: {e}", exc_info=args.verbose)
+        result, code = {"ok": False, "message": f"执行失败: {e}"}, EXIT_FAILED
+    finally:
+        # 配置写入带防抖，退出前立即落盘
+        config_store = sys.modules.get("app.utils.config_store")
+        if config_store is not None:
+            config_store.config_store.flush()
+    output = {"command": args.command, "dry_run": args.dry_run}
+    output.update(result)
+    output["elapsed"] = round(time.perf_counter() - started, 3)
+    json.dump(output, sys.stdout, ensure_ascii=False, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
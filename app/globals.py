@@ -1,32 +1,83 @@
 # 全局变量文件，用于存储服务实例，避免循环导入
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # 服务实例
 hosts_manager = None
 cloudflare_service = None
 scheduler_service = None
 torrent_client_manager = None
+notify_dispatcher = None
+dns_server = None
+cluster_service = None
 config = None
 
-def init_services(hm, cs, ss, tcm, cfg):
-    """初始化全局服务实例"""
-    global hosts_manager, cloudflare_service, scheduler_service, torrent_client_manager, config
+# 延迟构建的服务：名称 -> 工厂函数，首次通过 get_xxx() 获取时才创建
+_factories = {}
+_factory_lock = threading.RLock()
+# 各服务的构建耗时（秒），供启动报告使用
+init_times = {}
+
+def init_services(hm, cs, ss, tcm, cfg, nd=None, ds=None, cls=None):
+    """初始化全局服务实例（传入None的服务可通过 register_factory 延迟构建）"""
+    global hosts_manager, cloudflare_service, scheduler_service, torrent_client_manager, notify_dispatcher, dns_server, cluster_service, config
     hosts_manager = hm
     cloudflare_service = cs
     scheduler_service = ss
     torrent_client_manager = tcm
+    notify_dispatcher = nd
+    dns_server = ds
+    cluster_service = cls
     config = cfg
 
+def register_factory(name, factory):
+    """注册延迟构建的服务"""
+    _factories[name] = factory
+
+def peek_service(name):
+    """获取已创建的服务实例，尚未创建时返回None（不触发构建）"""
+    return globals().get(name)
+
+def _get_service(name):
+    service = globals().get(name)
+    if service is not None:
+        return service
+    # 在锁内重新读取：其它线程可能刚创建完成并取走了工厂函数
+    with _factory_lock:
+        service = globals().get(name)
+        if service is None and name in _factories:
+            started = time.perf_counter()
+            # 构建成功后才移除工厂函数，构建失败时下次获取会重试
+            service = _factories[name]()
+            init_times[name] = time.perf_counter() - started
+            globals()[name] = service
+            _factories.pop(name, None)
+            logger.info(f"[启动] 首次使用时创建服务 {name}，耗时 {init_times[name] * 1000:.1f}ms")
+    return service
+
 def get_hosts_manager():
-    return hosts_manager
+    return _get_service("hosts_manager")
 
 def get_cloudflare_service():
-    return cloudflare_service
+    return _get_service("cloudflare_service")
 
 def get_scheduler_service():
-    return scheduler_service
+    return _get_service("scheduler_service")
 
 def get_torrent_client_manager():
-    return torrent_client_manager
+    return _get_service("torrent_client_manager")
+
+def get_notify_dispatcher():
+    return _get_service("notify_dispatcher")
+
+def get_dns_server():
+    return _get_service("dns_server")
+
+def get_cluster_service():
+    return _get_service("cluster_service")
 
 def get_config():
-    return config 
\ No newline at end of file
+    return config
@@ -1,36 +1,48 @@
-from fastapi import FastAPI, Request, Depends, Form, status
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from app.utils.startup_profile import startup_profile
+
+with startup_profile.measure("导入Web框架"):
+    from fastapi import FastAPI, Request, Depends, Form, status
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.responses import HTMLResponse, RedirectResponse
+    from starlette.middleware.sessions import SessionMiddleware
 from pathlib import Path
 import os
 import logging
-import yaml
-import uvicorn
+from logging.handlers import RotatingFileHandler
 import secrets
 from typing import Optional
 
-from starlette.middleware.sessions import SessionMiddleware
-
-from app.services.cloudflare_speed_test import CloudflareSpeedTestService
-from app.services.hosts_manager import HostsManager
-from app.services.scheduler import SchedulerService
-from app.services.torrent_clients import TorrentClientManager
-from app.models import User
-from app.auth import init_session_serializer, verify_password, get_password_hash, get_current_user, create_user_session
+# 下载器、Cloudflare测速与通知服务在首次使用时才导入并创建（见 app.globals.register_factory）
+with startup_profile.measure("导入服务模块"):
+    from app.services.hosts_manager import DEFAULT_CLOUDFLARE_IP, HostsManager
+    from app.services.scheduler import SchedulerService
+    from app.services.dns_server import LocalDNSServer
+    from app.services.cluster import ClusterService
+with startup_profile.measure("导入认证模块"):
+    from app.models import User
+    from app.auth import init_session_serializer, verify_password, get_password_hash, get_current_user, create_user_session
+from app.utils.log_buffer import init_ring_buffer_handler
+from app.utils.config_store import config_store
 from version import get_version
 
 # 优先确保目录存在
 os.makedirs("logs", exist_ok=True)
 os.makedirs("config", exist_ok=True)
 
-# 配置日志（文件使用UTF-8编码，避免中文乱码）
+# 日志轮转参数，可通过环境变量调整（单个文件上限默认10MB，保留5个历史文件）
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+# 内存环形日志缓冲条数，供 /api/logs/query 结构化查询
+LOG_BUFFER_SIZE = int(os.environ.get("LOG_BUFFER_SIZE", "5000"))
+
+# 配置日志（文件使用UTF-8编码，避免中文乱码；按大小轮转，防止日志无限增长）
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler("logs/app.log", encoding="utf-8")
+        RotatingFileHandler("logs/app.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"),
+        init_ring_buffer_handler(LOG_BUFFER_SIZE)
     ]
 )
 logger = logging.getLogger(__name__)
@@ -40,8 +52,6 @@ os.makedirs("logs", exist_ok=True)
 os.makedirs("config", exist_ok=True)
 
 # 初始化配置
-CONFIG_PATH = "config/config.yaml"
-DEFAULT_CLOUDFLARE_IP = "104.16.91.215"
 DEFAULT_CONFIG = {
     "cloudflare": {
         "enable": True,
@@ -152,24 +162,14 @@ def create_nowip_file():
 
 # 加载或创建配置文件
 def load_config():
-    if not os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            if not DEFAULT_CONFIG["auth"].get("secret_key"):
-                DEFAULT_CONFIG["auth"]["secret_key"] = secrets.token_hex(32)
-            yaml.dump(DEFAULT_CONFIG, f, default_flow_style=False, allow_unicode=True)
+    if not config_store.exists():
+        if not DEFAULT_CONFIG["auth"].get("secret_key"):
+            DEFAULT_CONFIG["auth"]["secret_key"] = secrets.token_hex(32)
+        config_store.save(DEFAULT_CONFIG, immediate=True)
         current_config = DEFAULT_CONFIG
     else:
-        # 读取配置：UTF-8优先，回退GBK/GB18030
-        try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                current_config = yaml.safe_load(f)
-        except UnicodeDecodeError:
-            try:
-                with open(CONFIG_PATH, 'r', encoding='gbk') as f:
-                    current_config = yaml.safe_load(f)
-            except UnicodeDecodeError:
-                with open(CONFIG_PATH, 'r', encoding='gb18030') as f:
-                    current_config = yaml.safe_load(f)
+        # 读取配置：UTF-8优先，回退GBK/GB18030（由配置存储处理）
+        current_config = config_store.load()
         
         if not current_config:
             current_config = DEFAULT_CONFIG.copy()
@@ -195,8 +195,7 @@ def load_config():
                 need_save_after_load = True
         
         if need_save_after_load:
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                yaml.dump(current_config, f, default_flow_style=False, allow_unicode=True)
+            config_store.save(current_config)
 
     # 初始化认证模块的 session_serializer
     if current_config.get("auth", {}).get("secret_key"):
@@ -209,8 +208,7 @@ def load_config():
         logger.warning("配置文件中未找到 secret_key，已生成临时的 secret_key。请检查配置文件。")
         # 尝试保存回文件
         try:
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                yaml.dump(current_config, f, default_flow_style=False, allow_unicode=True)
+            config_store.save(current_config)
             logger.info("已将生成的临时 secret_key 保存回配置文件。")
         except Exception as e:
             logger.error(f"保存临时 secret_key 到配置文件失败: {e}")
@@ -238,19 +236,53 @@ else:
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
-# 模板
-templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
-hosts_manager = HostsManager(config)
-cloudflare_service = CloudflareSpeedTestService(config, hosts_manager)
-scheduler_service = SchedulerService(config, cloudflare_service, hosts_manager)
-torrent_client_manager = TorrentClientManager(config)
+# 模板（首次渲染页面时才导入Jinja2）
+_templates = None
+
+def get_templates():
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
+    return _templates
+
+with startup_profile.measure("初始化 hosts_manager"):
+    hosts_manager = HostsManager(config)
+with startup_profile.measure("初始化 scheduler_service"):
+    scheduler_service = SchedulerService(config, None, hosts_manager)
+with startup_profile.measure("初始化 dns_server"):
+    dns_server = LocalDNSServer(config, hosts_manager)
+with startup_profile.measure("初始化 cluster_service"):
+    cluster_service = ClusterService(config, hosts_manager)
+
+
+def _create_cloudflare_service():
+    from app.services.cloudflare_speed_test import CloudflareSpeedTestService
+    return CloudflareSpeedTestService(config_store.load(), hosts_manager)
+
+
+def _create_torrent_client_manager():
+    from app.services.torrent_clients import TorrentClientManager
+    return TorrentClientManager(config_store.load())
+
+
+def _create_notify_dispatcher():
+    from app.services.notify_dispatcher import NotifyDispatcher
+    dispatcher = NotifyDispatcher(config_store.load())
+    dispatcher.start()
+    return dispatcher
+
 
 # 初始化全局服务实例
-from app.globals import init_services
-init_services(hosts_manager, cloudflare_service, scheduler_service, torrent_client_manager, config)
+from app.globals import init_services, register_factory, peek_service, init_times
+init_services(hosts_manager, None, scheduler_service, None, config, None, dns_server, cluster_service)
+register_factory("cloudflare_service", _create_cloudflare_service)
+register_factory("torrent_client_manager", _create_torrent_client_manager)
+register_factory("notify_dispatcher", _create_notify_dispatcher)
 
 # 注册路由 - 在服务初始化之后导入
-from app.api.routes import router as api_router
+with startup_profile.measure("导入API路由"):
+    from app.api.routes import router as api_router
 app.include_router(api_router, prefix="/api")
 
 # 认证相关函数已移动到 app.auth 模块
@@ -260,7 +292,7 @@ app.include_router(api_router, prefix="/api")
 async def login_page(request: Request, error_message: Optional[str] = None):
     csrf_token = secrets.token_hex(32)
     request.session["csrf_token"] = csrf_token
-    return templates.TemplateResponse("login.html", {"request": request, "error_message": error_message, "csrf_token": csrf_token})
+    return get_templates().TemplateResponse("login.html", {"request": request, "error_message": error_message, "csrf_token": csrf_token})
 
 
 # 登录处理
@@ -281,7 +313,7 @@ async def login_for_access_token(
         # 生成新的 CSRF token
         new_csrf_token = secrets.token_hex(32)
         request.session["csrf_token"] = new_csrf_token
-        return templates.TemplateResponse("login.html", {
+        return get_templates().TemplateResponse("login.html", {
             "request": request, 
             "error_message": "无效的请求，请刷新页面重试。",
             "csrf_token": new_csrf_token
@@ -295,7 +327,7 @@ async def login_for_access_token(
         # 生成新的 CSRF token
         new_csrf_token = secrets.token_hex(32)
         request.session["csrf_token"] = new_csrf_token
-        return templates.TemplateResponse("login.html", {
+        return get_templates().TemplateResponse("login.html", {
             "request": request, 
             "error_message": "管理员密码尚未设置，请重启容器并查看应用日志获取临时密码。",
             "csrf_token": new_csrf_token
@@ -312,7 +344,7 @@ async def login_for_access_token(
     # 登录失败时生成新的 CSRF token
     new_csrf_token = secrets.token_hex(32)
     request.session["csrf_token"] = new_csrf_token
-    return templates.TemplateResponse("login.html", {
+    return get_templates().TemplateResponse("login.html", {
         "request": request, 
         "error_message": "用户名或密码错误",
         "csrf_token": new_csrf_token
@@ -337,7 +369,7 @@ async def home(request: Request, current_user: Optional[User] = Depends(get_curr
     
     # 如果认证未启用，或者用户已登录，则显示主页
     # 确保传递最新的 config 到模板
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "index.html", 
         {"request": request, "config": current_config, "current_user": current_user, "version": get_version()}
     )
@@ -347,8 +379,14 @@ async def home(request: Request, current_user: Optional[User] = Depends(get_curr
 async def startup_event():
     global config # 确保访问的是最新的 config
     # 启动调度器
-    scheduler_service.start()
+    with startup_profile.measure("启动 scheduler_service"):
+        scheduler_service.start()
     logger.info("应用已启动，调度器已开始运行")
+    # 启动本地DNS服务（未启用时不监听）
+    with startup_profile.measure("启动 dns_server"):
+        dns_server.start()
+    # 集群模式：agent开始从hub拉取快照
+    cluster_service.start()
 
     # 检查并更新配置文件中的auth部分
     current_config = load_config()  # 重新加载最新配置
@@ -389,24 +427,33 @@ async def startup_event():
     # 如果配置有更新，保存到文件并更新全局配置
     if config_updated:
         try:
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-                yaml.dump(current_config, f, default_flow_style=False, allow_unicode=True)
+            config_store.save(current_config)
             # 更新全局配置
             config.update(current_config)
             logger.info("认证配置已更新并保存")
         except Exception as e:
             logger.error(f"保存认证配置失败: {e}")
 
+    # 启动耗时报告（模块导入与各服务初始化）
+    startup_profile.report(init_times)
+
 
 
 # 关闭时停止调度器
 @app.on_event("shutdown")
 async def shutdown_event():
     scheduler_service.stop()
+    notify_dispatcher = peek_service("notify_dispatcher")
+    if notify_dispatcher is not None:
+        notify_dispatcher.stop()
+    dns_server.stop()
+    cluster_service.stop()
+    config_store.flush()
     logger.info("应用已关闭，调度器已停止")
 
 if __name__ == "__main__":
     # 从环境变量中获取端口，如果未设置，则默认为23333
     # 注意：os.environ.get 返回字符串，需要转换为整数
     app_port = int(os.environ.get("APP_PORT", "23333"))
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=app_port, reload=True)
\ No newline at end of file
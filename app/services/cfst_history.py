@@ -0,0 +1,125 @@
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.utils.cfst_result import CfstRecord
+
+logger = logging.getLogger(__name__)
+
+# 优选历史归档路径
+DEFAULT_HISTORY_PATH = os.path.join("config", "cfst_history.db")
+
+
+class CfstHistory:
+    """
+    优选结果历史归档（SQLite，只追加）：每次优选保存排名靠前的结果，
+    用于按多天数据（例如每个IP的延迟中位数）选择IP，而不是只依赖单次测速。
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, keep_top: int = 20):
+        self.path = path
+        self.keep_top = keep_top
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, time REAL NOT NULL, source TEXT, total INTEGER);"
+                "CREATE TABLE IF NOT EXISTS results ("
+                " run_id INTEGER NOT NULL, rank INTEGER, ip TEXT NOT NULL, loss REAL, latency REAL, speed REAL, region TEXT);"
+                "CREATE INDEX IF NOT EXISTS ix_runs_time ON runs (time);"
+                "CREATE INDEX IF NOT EXISTS ix_results_run ON results (run_id);"
+            )
+        return self._conn
+
+    def append(self, records: List[CfstRecord], source: str) -> Optional[int]:
+        """追加一次优选结果（只保存前 keep_top 条），返回运行ID"""
+        if not records:
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    cursor = conn.execute(
+                        "INSERT INTO runs (time, source, total) VALUES (?, ?, ?)",
+                        (time.time(), source, len(records))
+                    )
+                    run_id = cursor.lastrowid
+                    conn.executemany(
+                        "INSERT INTO results (run_id, rank, ip, loss, latency, speed, region) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(run_id, r.rank, r.ip, r.loss, r.latency, r.speed, r.region) for r in records[:self.keep_top]]
+                    )
+            logger.info(f"已归档优选结果（{source}），共 {min(len(records), self.keep_top)} 条")
+            return run_id
+        except Exception as e:
+            logger.warning(f"归档优选结果失败: {e}")
+            return None
+
+    def runs(self, days: float = 7, limit: int = 20) -> List[Dict[str, Any]]:
+        """最近的优选记录（新的在前），每条包含其前几名结果"""
+        since = time.time() - days * 86400
+        with self._lock:
+            conn = self._connect()
+            run_rows = conn.execute(
+                "SELECT id, time, source, total FROM runs WHERE time >= ? ORDER BY time DESC LIMIT ?",
+                (since, limit)
+            ).fetchall()
+            runs = []
+            for run_id, run_time, source, total in run_rows:
+                results = conn.execute(
+                    "SELECT rank, ip, loss, latency, speed, region FROM results WHERE run_id = ? ORDER BY rank",
+                    (run_id,)
+                ).fetchall()
+                runs.append({
+                    "id": run_id,
+                    "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run_time)),
+                    "source": source,
+                    "total": total,
+                    "results": [
+                        {"rank": r[0], "ip": r[1], "loss": r[2], "latency": r[3], "speed": r[4], "region": r[5]}
+                        for r in results
+                    ],
+                })
+        return runs
+
+    def aggregate(self, days: float = 7, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        按IP汇总最近 days 天的结果，按延迟中位数升序排列。
+
+        Returns:
+            每个IP的出现次数、延迟/速度中位数、平均丢包率、最佳排名与最后出现时间
+        """
+        since = time.time() - days * 86400
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT r.ip, r.rank, r.loss, r.latency, r.speed, runs.time FROM results r "
+                "JOIN runs ON runs.id = r.run_id WHERE runs.time >= ?",
+                (since,)
+            ).fetchall()
+        grouped: Dict[str, List[tuple]] = {}
+        for row in rows:
+            grouped.setdefault(row[0], []).append(row)
+        summary = []
+        for ip, items in grouped.items():
+            latencies = [item[3] for item in items if item[3] is not None]
+            speeds = [item[4] for item in items if item[4] is not None]
+            losses = [item[2] for item in items if item[2] is not None]
+            summary.append({
+                "ip": ip,
+                "samples": len(items),
+                "median_latency": statistics.median(latencies) if latencies else None,
+                "median_speed": statistics.median(speeds) if speeds else None,
+                "avg_loss": sum(losses) / len(losses) if losses else None,
+                "best_rank": min(item[1] for item in items),
+                "last_seen": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(max(item[5] for item in items))),
+            })
+        summary.sort(key=lambda s: (s["median_latency"] is None, s["median_latency"] or 0, -s["samples"]))
+        return summary[:limit]
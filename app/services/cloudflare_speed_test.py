@@ -1,12 +1,12 @@
 import logging
 import os
 import subprocess
-import time
 import shutil
 import platform
 from typing import Dict, Any
 
 from app.services.hosts_manager import HostsManager
+from app.utils.cfst_result import parse_result_file, result_file_time
 
 logger = logging.getLogger(__name__)
 
@@ -380,51 +380,31 @@ class CloudflareSpeedTestService:
     def _process_results(self):
         """处理测试结果"""
         try:
-            if not os.path.exists(self.result_file):
-                logger.error("结果文件不存在")
+            records = parse_result_file(self.result_file)
+            if not records:
+                logger.warning("结果文件不存在或没有有效数据")
                 return
             
-            # 读取结果文件
-            with open(self.result_file, 'r') as f:
-                lines = f.readlines()
-            
-            if len(lines) <= 1:  # 只有标题行
-                logger.warning("结果文件中没有有效数据")
-                return
-            
-            # 解析标题行
-            headers = lines[0].strip().split(',')
-            
-            # 获取IP和速度列的索引
-            ip_index = headers.index("IP")
-            speed_index = headers.index("下载速度 (MB/s)")
-            
-            # 获取最快的IP
-            best_ip = None
-            best_speed = 0
-            
-            for i in range(1, len(lines)):
-                data = lines[i].strip().split(',')
-                if len(data) > max(ip_index, speed_index):
-                    ip = data[ip_index]
-                    try:
-                        speed = float(data[speed_index])
-                        if speed > best_speed:
-                            best_speed = speed
-                            best_ip = ip
-                    except ValueError:
-                        continue
+            # 归档本次结果，并保留排名前K的IP作为候选池，供故障切换使用
+            self.hosts_manager.cfst_history.append(records, "cloudflare_service")
+            # 有下载测速结果时按速度排名，否则保持文件中的（延迟）排名
+            if any(r.speed > 0 for r in records):
+                records = sorted(records, key=lambda r: r.speed, reverse=True)
+            self.hosts_manager.update_ip_pool(records)
+            best = records[0]
+            best_ip = best.ip
             
             if best_ip:
-                logger.info(f"找到最优IP: {best_ip}，速度: {best_speed} MB/s")
+                logger.info(f"找到最优IP: {best_ip}，速度: {best.speed} MB/s")
                 
-                # 更新所有启用的Tracker
-                for tracker in self.config.get("trackers", []):
-                    if tracker.get("enable", False):
-                        domain = tracker.get("domain")
-                        if domain:
-                            logger.info(f"为 {domain} 设置新的IP: {best_ip}")
-                            self.hosts_manager.add_cloudflare_ip(domain, best_ip)
+                # 批量更新所有启用的Tracker：只写一次配置，只执行一次hosts合并
+                ips = {
+                    tracker["domain"]: best_ip
+                    for tracker in self.hosts_manager.config.get("trackers", []) or []
+                    if tracker.get("enable", False) and tracker.get("domain")
+                }
+                if ips:
+                    self.hosts_manager.apply_tracker_ips(ips, best_ip=best_ip)
             else:
                 logger.warning("未找到合适的IP")
                 
@@ -434,36 +414,19 @@ class CloudflareSpeedTestService:
     def get_last_result(self) -> Dict[str, Any]:
         """获取最后一次测试结果"""
         try:
-            if not os.path.exists(self.result_file):
+            modified_time_str = result_file_time(self.result_file)
+            if modified_time_str is None:
                 return {"success": False, "message": "尚未执行测试或结果文件不存在"}
             
-            # 获取文件修改时间
-            modified_time = os.path.getmtime(self.result_file)
-            modified_time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(modified_time))
-            
-            # 读取结果文件
-            with open(self.result_file, 'r') as f:
-                lines = f.readlines()
-            
-            if len(lines) <= 1:
+            # 最多返回前10条
+            records = parse_result_file(self.result_file, limit=10)
+            if not records:
                 return {"success": False, "message": "结果文件中没有有效数据", "time": modified_time_str}
             
-            # 解析结果
-            headers = lines[0].strip().split(',')
-            results = []
-            
-            for i in range(1, min(11, len(lines))):  # 最多返回前10条
-                data = lines[i].strip().split(',')
-                if len(data) >= len(headers):
-                    result = {}
-                    for j, header in enumerate(headers):
-                        result[header] = data[j]
-                    results.append(result)
-            
             return {
                 "success": True,
                 "time": modified_time_str,
-                "results": results
+                "results": [r.to_dict() for r in records]
             }
         except Exception as e:
             logger.error(f"获取测试结果出错: {str(e)}")
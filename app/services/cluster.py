@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+ROLE_STANDALONE = "standalone"
+ROLE_HUB = "hub"
+ROLE_AGENT = "agent"
+
+DEFAULT_CLUSTER_SETTINGS = {
+    # standalone（默认）/ hub（执行完整流程并发布快照）/ agent（只从hub拉取快照并写hosts）
+    "role": ROLE_STANDALONE,
+    # agent: hub地址，例如 http://192.168.1.10:23333
+    "hub_url": "",
+    # hub与agent共享的访问令牌，为空时不校验
+    "token": "",
+    # agent: 长轮询等待时间（秒）
+    "poll_timeout": 60,
+    # agent: 在本地重新检测hub候选池中前K个IP的延迟，为PT站点选择本地最快的IP（0为关闭）
+    "recheck_top_k": 0,
+}
+
+
+def load_cluster_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    settings = dict(DEFAULT_CLUSTER_SETTINGS)
+    settings.update(config.get("cluster", {}) or {})
+    role = str(settings.get("role") or ROLE_STANDALONE).lower()
+    settings["role"] = role if role in (ROLE_HUB, ROLE_AGENT) else ROLE_STANDALONE
+    settings["hub_url"] = str(settings.get("hub_url") or "").rstrip("/")
+    settings["poll_timeout"] = max(1, int(settings["poll_timeout"]))
+    settings["recheck_top_k"] = max(0, int(settings["recheck_top_k"]))
+    return settings
+
+
+class SnapshotPublisher:
+    """
+    hub端快照发布：每次生成的PT站点与hosts源条目作为一个带版本号的快照，内容未变化时不递增版本。
+
+    instance 在每次进程启动时随机生成，agent据此识别hub重启（版本号重新计数）。
+    """
+
+    def __init__(self, hosts_manager):
+        self.hosts_manager = hosts_manager
+        self.instance = secrets.token_hex(8)
+        self.version = 0
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._digest: Optional[str] = None
+        self._lock = threading.Lock()
+        # 等待新版本的长轮询请求：(事件循环, asyncio.Event)
+        self._waiters = set()
+        hosts_manager.add_section_listener(self.publish)
+
+    def publish(self, pt_entries: List[str], merged_entries: List[str]):
+        payload = {
+            "pt_entries": list(pt_entries),
+            "merged_entries": list(merged_entries),
+            "candidates": self.hosts_manager.ip_pool.ips(),
+        }
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest == self._digest:
+                return
+            self._digest = digest
+            self.version += 1
+            self.snapshot = dict(payload, instance=self.instance, version=self.version, generated_at=time.time())
+            waiters, self._waiters = self._waiters, set()
+        logger.info(f"[集群] 已发布快照版本 {self.version}（PT站点 {len(pt_entries)} 条，hosts源 {len(merged_entries)} 条）")
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _current(self, since: int, instance: str) -> Optional[Dict[str, Any]]:
+        if self.snapshot is None:
+            self.publish(*self.hosts_manager.published_sections())
+        if self.snapshot is not None and (instance != self.instance or self.version > since):
+            return self.snapshot
+        return None
+
+    async def wait(self, since: int, instance: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """返回比 since 新的快照；没有时最多等待 timeout 秒，期间发布新版本立即返回，超时返回None"""
+        snapshot = self._current(since, instance)
+        if snapshot is not None:
+            return snapshot
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            # 加入等待前可能刚好发布了新版本
+            snapshot = self._current(since, instance)
+            if snapshot is None:
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                snapshot = self._current(since, instance)
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return snapshot
+
+
+class ClusterAgent:
+    """
+    agent端：长轮询hub获取新版本快照，只在本地执行hosts写入，
+    不拉取hosts源、不做IP检测、不运行优选脚本。
+    """
+
+    def __init__(self, hosts_manager):
+        self.hosts_manager = hosts_manager
+        self.settings: Dict[str, Any] = dict(DEFAULT_CLUSTER_SETTINGS)
+        self.instance = ""
+        self.version = 0
+        self.last_sync: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, settings: Dict[str, Any]):
+        self.settings = settings
+        if self.is_running():
+            return
+        if not settings["hub_url"]:
+            logger.error("[集群] agent模式未配置 cluster.hub_url，不启动同步")
+            return
+        # 每次启动使用新的停止事件，避免仍在长轮询中的旧线程在重启后继续运行
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), name="cluster-agent", daemon=True)
+        self._thread.start()
+        logger.info(f"[集群] agent已启动，hub: {settings['hub_url']}")
+
+    def stop(self):
+        if not self.is_running():
+            return
+        self._stop_event.set()
+        self._thread = None
+        logger.info("[集群] agent已停止")
+
+    def _run(self, stop_event: threading.Event):
+        backoff = 5
+        session = requests.Session()
+        while not stop_event.is_set():
+            try:
+                snapshot = self._poll(session)
+                if snapshot is not None and not stop_event.is_set():
+                    self._apply(snapshot)
+                self.last_error = None
+                backoff = 5
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"[集群] 从hub同步失败，{backoff}秒后重试: {e}")
+                if stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, 60)
+
+    def _poll(self, session: requests.Session) -> Optional[Dict[str, Any]]:
+        timeout = self.settings["poll_timeout"]
+        headers = {"X-Cluster-Token": self.settings["token"]} if self.settings.get("token") else {}
+        response = session.get(
+            f"{self.settings['hub_url']}/api/cluster/snapshot",
+            params={"since": self.version, "instance": self.instance, "timeout": timeout},
+            headers=headers,
+            timeout=timeout + 15,
+        )
+        if response.status_code == 204:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _apply(self, snapshot: Dict[str, Any]):
+        pt_entries = snapshot.get("pt_entries", [])
+        merged_entries = snapshot.get("merged_entries", [])
+        top_k = self.settings["recheck_top_k"]
+        candidates = snapshot.get("candidates", [])
+        if top_k and candidates:
+            pt_entries = self._recheck_pt_entries(pt_entries, candidates[:top_k])
+        self.hosts_manager.apply_snapshot(pt_entries, merged_entries)
+        self.instance = snapshot.get("instance", "")
+        self.version = int(snapshot.get("version", 0))
+        self.last_sync = time.time()
+        logger.info(f"[集群] 已应用hub快照版本 {self.version}")
+
+    def _recheck_pt_entries(self, pt_entries: List[str], candidates: List[str]) -> List[str]:
+        """本地检测候选IP延迟，使用hub候选IP的PT站点条目改为本地最快的IP（按地址族分别选择）"""
+        latencies = self.hosts_manager.probe_ips(candidates)
+        best: Dict[bool, str] = {}
+        for ip in candidates:
+            latency = latencies.get(ip)
+            is_v6 = ":" in ip
+            if latency is not None and (is_v6 not in best or latency < latencies[best[is_v6]]):
+                best[is_v6] = ip
+        if not best:
+            return pt_entries
+        rechecked = []
+        for entry in pt_entries:
+            ip, _, domain = entry.partition("\t")
+            if ip in candidates and (":" in ip) in best:
+                ip = best[":" in ip]
+            rechecked.append(f"{ip}\t{domain}")
+        return rechecked
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running(),
+            "hub_url": self.settings.get("hub_url"),
+            "version": self.version,
+            "last_sync": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.last_sync)) if self.last_sync else None,
+            "last_error": self.last_error,
+        }
+
+
+class ClusterService:
+    """集群模式：hub发布快照，agent拉取快照；standalone下只记录快照不对外提供"""
+
+    def __init__(self, config: Dict[str, Any], hosts_manager):
+        self.settings = load_cluster_settings(config)
+        self.publisher = SnapshotPublisher(hosts_manager)
+        self.agent = ClusterAgent(hosts_manager)
+
+    @property
+    def role(self) -> str:
+        return self.settings["role"]
+
+    def update_config(self, config: Dict[str, Any]):
+        settings = load_cluster_settings(config)
+        agent_changed = settings != self.settings
+        self.settings = settings
+        if self.role != ROLE_AGENT:
+            self.agent.stop()
+        elif agent_changed:
+            self.agent.stop()
+            self.agent.start(settings)
+
+    def start(self):
+        if self.role == ROLE_AGENT:
+            self.agent.start(self.settings)
+        elif self.role == ROLE_HUB:
+            logger.info("[集群] 当前为hub模式，agent可通过 /api/cluster/snapshot 拉取快照")
+
+    def stop(self):
+        self.agent.stop()
+
+    def check_token(self, token: Optional[str]) -> bool:
+        expected = self.settings.get("token") or ""
+        return not expected or secrets.compare_digest(str(token or ""), str(expected))
+
+    def get_status(self) -> Dict[str, Any]:
+        status = {"role": self.role, "version": self.publisher.version, "instance": self.publisher.instance}
+        if self.role == ROLE_AGENT:
+            status["agent"] = self.agent.get_status()
+        return status
@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import socket
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QTYPE_A = 1
+QTYPE_AAAA = 28
+QCLASS_IN = 1
+RCODE_SERVFAIL = 2
+RCODE_NOTIMP = 4
+
+DEFAULT_DNS_SETTINGS = {
+    "enable": False,
+    "listen": "0.0.0.0",
+    "port": 53,
+    # hosts源条目的TTL（秒）
+    "ttl": 300,
+    # PT站点条目的TTL（秒），故障切换后客户端能更快拿到新IP
+    "pt_ttl": 60,
+    "upstream": ["223.5.5.5", "119.29.29.29"],
+    "upstream_timeout": 2,
+    "write_hosts": True,
+}
+
+# 域名 -> (TTL, [IPv4...], [IPv6...])
+DNSTable = Dict[str, Tuple[int, List[str], List[str]]]
+
+
+def build_table(pt_entries: List[str], merged_entries: List[str], pt_ttl: int, ttl: int) -> DNSTable:
+    """由hosts条目（"IP\\t域名"）构建查询表；同一域名同时出现在PT分区与hosts源分区时以PT分区为准"""
+    table: DNSTable = {}
+    for entries, entry_ttl in ((pt_entries, pt_ttl), (merged_entries, ttl)):
+        section: DNSTable = {}
+        for entry in entries:
+            parts = entry.split()
+            if len(parts) < 2:
+                continue
+            ip, name = parts[0], parts[1].lower().rstrip(".")
+            if ":" in name and ":" not in ip:
+                # Tracker域名可能带端口
+                name = name.split(":", 1)[0]
+            record = section.setdefault(name, (entry_ttl, [], []))
+            record[2 if ":" in ip else 1].append(ip)
+        for name, record in section.items():
+            table.setdefault(name, record)
+    return table
+
+
+def _parse_question(data: bytes) -> Optional[Tuple[str, int, int, int]]:
+    """解析查询中的第一个问题，返回 (域名, 类型, 类别, 问题段结束位置)"""
+    if len(data) < 12 or struct.unpack("!H", data[4:6])[0] < 1:
+        return None
+    labels = []
+    pos = 12
+    while True:
+        if pos >= len(data):
+            return None
+        length = data[pos]
+        pos += 1
+        if length == 0:
+            break
+        if length & 0xC0 or pos + length > len(data):
+            # 问题段不应出现压缩指针
+            return None
+        labels.append(data[pos:pos + length].decode("ascii", "replace"))
+        pos += length
+    if pos + 4 > len(data):
+        return None
+    qtype, qclass = struct.unpack("!HH", data[pos:pos + 4])
+    return ".".join(labels).lower(), qtype, qclass, pos + 4
+
+
+def _error_response(data: bytes, rcode: int) -> bytes:
+    ident, flags = struct.unpack("!HH", data[:4])
+    flags = 0x8000 | (flags & 0x7900) | 0x0080 | rcode
+    question = _parse_question(data)
+    end = question[3] if question else 12
+    return struct.pack("!HHHHHH", ident, flags, 1 if question else 0, 0, 0, 0) + data[12:end]
+
+
+def _answer(data: bytes, question_end: int, qtype: int, ttl: int, ips: List[str]) -> bytes:
+    ident, flags = struct.unpack("!HH", data[:4])
+    # QR=1，保留Opcode与RD，AA=1，RA=1
+    flags = 0x8000 | (flags & 0x7900) | 0x0400 | 0x0080
+    family = socket.AF_INET6 if qtype == QTYPE_AAAA else socket.AF_INET
+    answers = b""
+    for ip in ips:
+        rdata = socket.inet_pton(family, ip)
+        # 0xC00C：指向问题段中的域名
+        answers += struct.pack("!HHHIH", 0xC00C, qtype, QCLASS_IN, ttl, len(rdata)) + rdata
+    return struct.pack("!HHHHHH", ident, flags, 1, len(ips), 0, 0) + data[12:question_end] + answers
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+class _UDPServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "LocalDNSServer"):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self._respond(data, addr))
+
+    async def _respond(self, data: bytes, addr):
+        response = await self.server.resolve(data)
+        if response and self.transport is not None:
+            self.transport.sendto(response, addr)
+
+
+class LocalDNSServer:
+    """
+    可选的本地DNS服务（UDP/TCP）：直接用内存中的PT站点与合并hosts源条目应答A/AAAA查询，
+    未命中的查询转发到上游DNS。
+
+    hosts条目每次更新后整体替换查询表（一次引用赋值，无文件读写），
+    局域网内的其它设备（下载器、媒体服务器等）可以直接把DNS指向本服务，无需共享hosts文件。
+    """
+
+    def __init__(self, config: Dict[str, Any], hosts_manager):
+        self.hosts_manager = hosts_manager
+        self._table: DNSTable = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.stats = {"queries": 0, "answered": 0, "forwarded": 0, "failed": 0}
+        self.settings: Dict[str, Any] = dict(DEFAULT_DNS_SETTINGS)
+        self._load_settings(config)
+        hosts_manager.add_section_listener(self.update_records)
+
+    def _load_settings(self, config: Dict[str, Any]):
+        settings = dict(DEFAULT_DNS_SETTINGS)
+        settings.update(config.get("dns_server", {}) or {})
+        upstream = settings.get("upstream") or []
+        if isinstance(upstream, str):
+            upstream = [upstream]
+        settings["upstream"] = [self._parse_upstream(u) for u in upstream if u]
+        settings["port"] = int(settings["port"])
+        settings["ttl"] = int(settings["ttl"])
+        settings["pt_ttl"] = int(settings["pt_ttl"])
+        settings["upstream_timeout"] = float(settings["upstream_timeout"])
+        self.settings = settings
+
+    @staticmethod
+    def _parse_upstream(upstream: str) -> Tuple[str, int]:
+        """解析上游地址：1.1.1.1、1.1.1.1:5353、[2606:4700::1111]:53"""
+        upstream = str(upstream).strip()
+        if upstream.startswith("["):
+            host, _, port = upstream[1:].partition("]")
+            return host, int(port.lstrip(":") or 53)
+        if upstream.count(":") == 1:
+            host, port = upstream.split(":")
+            return host, int(port)
+        return upstream, 53
+
+    def update_config(self, config: Dict[str, Any]):
+        """更新配置：TTL与上游立即生效，启用状态或监听地址变化时重启服务"""
+        old = self.settings
+        self._load_settings(config)
+        listen_changed = (old["listen"], old["port"]) != (self.settings["listen"], self.settings["port"])
+        if not self.settings["enable"]:
+            self.stop()
+        elif not self.is_running():
+            self.start()
+        elif listen_changed:
+            self.stop()
+            self.start()
+        else:
+            self.update_records(*self.hosts_manager.published_sections())
+
+    def update_records(self, pt_entries: List[str], merged_entries: List[str]):
+        """用新的hosts条目重建查询表并整体替换"""
+        self._table = build_table(pt_entries, merged_entries, self.settings["pt_ttl"], self.settings["ttl"])
+        logger.debug(f"[本地DNS] 查询表已更新，共 {len(self._table)} 个域名")
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.settings["enable"] or self.is_running():
+            return
+        self.update_records(*self.hosts_manager.published_sections())
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="local-dns", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if not self.is_running():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
+        logger.info("本地DNS服务已停止")
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        asyncio.set_event_loop(loop)
+        listen, port = self.settings["listen"], self.settings["port"]
+        family = socket.AF_INET6 if ":" in listen else socket.AF_INET
+        try:
+            udp_transport, _ = loop.run_until_complete(loop.create_datagram_endpoint(
+                lambda: _UDPServerProtocol(self), local_addr=(listen, port), family=family
+            ))
+            tcp_server = loop.run_until_complete(asyncio.start_server(self._handle_tcp, listen, port, family=family))
+        except OSError as e:
+            logger.error(f"本地DNS服务启动失败（{listen}:{port}）: {e}")
+            self._ready.set()
+            loop.close()
+            return
+        logger.info(f"本地DNS服务已启动: {listen}:{port}（UDP/TCP），当前 {len(self._table)} 个域名")
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            udp_transport.close()
+            tcp_server.close()
+            loop.run_until_complete(tcp_server.wait_closed())
+            loop.close()
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                data = await reader.readexactly(length)
+                response = await self.resolve(data, tcp=True)
+                if not response:
+                    break
+                writer.write(struct.pack("!H", len(response)) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def resolve(self, data: bytes, tcp: bool = False) -> Optional[bytes]:
+        """应答一个查询报文；表中有该域名时直接应答（没有对应地址族的记录时返回空应答），否则转发上游"""
+        if len(data) < 12:
+            return None
+        self.stats["queries"] += 1
+        question = _parse_question(data)
+        if question is None:
+            return _error_response(data, RCODE_NOTIMP)
+        name, qtype, qclass, question_end = question
+        record = self._table.get(name)
+        if record is not None and qclass == QCLASS_IN and qtype in (QTYPE_A, QTYPE_AAAA):
+            ttl, ipv4, ipv6 = record
+            self.stats["answered"] += 1
+            return _answer(data, question_end, qtype, ttl, ipv4 if qtype == QTYPE_A else ipv6)
+        response = await self._forward(data, tcp)
+        if response is None:
+            self.stats["failed"] += 1
+            return _error_response(data, RCODE_SERVFAIL)
+        self.stats["forwarded"] += 1
+        return response
+
+    async def _forward(self, data: bytes, tcp: bool) -> Optional[bytes]:
+        loop = asyncio.get_event_loop()
+        timeout = self.settings["upstream_timeout"]
+        for host, port in self.settings["upstream"]:
+            try:
+                if tcp:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                    try:
+                        writer.write(struct.pack("!H", len(data)) + data)
+                        length = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), timeout))[0]
+                        return await asyncio.wait_for(reader.readexactly(length), timeout)
+                    finally:
+                        writer.close()
+                future = loop.create_future()
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _UpstreamProtocol(future), remote_addr=(host, port)
+                )
+                try:
+                    transport.sendto(data)
+                    return await asyncio.wait_for(future, timeout)
+                finally:
+                    transport.close()
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                logger.debug(f"[本地DNS] 上游 {host}:{port} 查询失败: {e}")
+        return None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enable": self.settings["enable"],
+            "running": self.is_running(),
+            "listen": f"{self.settings['listen']}:{self.settings['port']}",
+            "domains": len(self._table),
+            "stats": dict(self.stats),
+        }
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# 导出格式 -> 媒体类型
+EXPORT_MEDIA_TYPES = {
+    "hosts": "text/plain",
+    "dnsmasq": "text/plain",
+    "adguard": "text/plain",
+    "clash": "text/yaml",
+    "json": "application/json",
+}
+
+# 解析后的记录：[(域名, [IP...], 分区)]，分区为 "pt_sites" 或 "hosts"
+Records = List[Tuple[str, List[str], str]]
+
+
+class ExportArtifact:
+    """单个格式的导出结果：原始内容、预压缩的gzip内容与基于内容哈希的ETag（两种编码各自使用不同的强ETag）"""
+    __slots__ = ("content", "gzipped", "etag", "gzip_etag", "media_type", "generated_at")
+
+    def __init__(self, content: bytes, media_type: str):
+        self.content = content
+        self.gzipped = gzip.compress(content, mtime=0)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+        self.media_type = media_type
+        self.generated_at = time.time()
+
+
+def parse_records(pt_entries: List[str], merged_entries: List[str]) -> Records:
+    """将 "IP\\t域名" 条目整理为按域名分组的记录（去掉端口；同一域名以PT站点分区为准）"""
+    records: Records = []
+    seen: Dict[str, List[str]] = {}
+    for entries, section in ((pt_entries, "pt_sites"), (merged_entries, "hosts")):
+        section_domains = set()
+        for entry in entries:
+            parts = entry.split()
+            if len(parts) < 2:
+                continue
+            ip, domain = parts[0], parts[1].lower().rstrip(".")
+            if ":" in domain:
+                domain = domain.split(":", 1)[0]
+            if domain in seen and domain not in section_domains:
+                continue
+            if domain not in seen:
+                seen[domain] = []
+                section_domains.add(domain)
+                records.append((domain, seen[domain], section))
+            if ip not in seen[domain]:
+                seen[domain].append(ip)
+    return records
+
+
+def _render_hosts(records: Records) -> str:
+    lines = ["# PT-Accelerator hosts export"]
+    lines += [f"{ip}\t{domain}" for domain, ips, _ in records for ip in ips]
+    return "\n".join(lines) + "\n"
+
+
+def _render_dnsmasq(records: Records) -> str:
+    lines = ["# PT-Accelerator dnsmasq export"]
+    lines += [f"address=/{domain}/{ip}" for domain, ips, _ in records for ip in ips]
+    return "\n".join(lines) + "\n"
+
+
+def _render_adguard(records: Records) -> str:
+    """AdGuard Home 自定义过滤规则（dnsrewrite，仅精确匹配该域名）"""
+    lines = ["! PT-Accelerator AdGuard Home rewrites"]
+    for domain, ips, _ in records:
+        for ip in ips:
+            record_type = "AAAA" if ":" in ip else "A"
+            lines.append(f"|{domain}^$dnsrewrite=NOERROR;{record_type};{ip}")
+    return "\n".join(lines) + "\n"
+
+
+def _render_clash(records: Records) -> str:
+    hosts = {domain: ips[0] if len(ips) == 1 else list(ips) for domain, ips, _ in records}
+    return yaml.safe_dump({"hosts": hosts}, allow_unicode=True, default_flow_style=False, sort_keys=False)
+
+
+def _render_json(records: Records) -> str:
+    data: Dict[str, Dict[str, List[str]]] = {"pt_sites": {}, "hosts": {}}
+    for domain, ips, section in records:
+        data[section][domain] = list(ips)
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+_RENDERERS: Dict[str, Callable[[Records], str]] = {
+    "hosts": _render_hosts,
+    "dnsmasq": _render_dnsmasq,
+    "adguard": _render_adguard,
+    "clash": _render_clash,
+    "json": _render_json,
+}
+
+
+class HostsExporter:
+    """
+    多格式导出：每次生成hosts后一次性渲染全部格式并缓存（含gzip与ETag），
+    拉取方请求时直接返回缓存内容，未变化时可以只返回304。
+    """
+
+    def __init__(self, source: Callable[[], Tuple[List[str], List[str]]]):
+        # source 返回当前的 (PT站点条目, 合并hosts源条目)，用于首次请求时渲染
+        self.source = source
+        self._artifacts: Optional[Dict[str, ExportArtifact]] = None
+
+    def update(self, pt_entries: List[str], merged_entries: List[str]):
+        """渲染全部格式并整体替换缓存"""
+        records = parse_records(pt_entries, merged_entries)
+        artifacts = {}
+        for fmt, renderer in _RENDERERS.items():
+            try:
+                artifacts[fmt] = ExportArtifact(renderer(records).encode("utf-8"), EXPORT_MEDIA_TYPES[fmt])
+            except Exception as e:
+                logger.error(f"渲染导出格式 {fmt} 失败: {e}")
+        self._artifacts = artifacts
+        logger.debug(f"已渲染 {len(artifacts)} 种导出格式，共 {len(records)} 个域名")
+
+    def get(self, fmt: str) -> Optional[ExportArtifact]:
+        if fmt not in _RENDERERS:
+            return None
+        if self._artifacts is None:
+            self.update(*self.source())
+        return self._artifacts.get(fmt)
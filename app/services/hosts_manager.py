@@ -9,27 +9,69 @@ from typing import Dict, List, Any, Optional, Tuple
 from python_hosts import Hosts, HostsEntry
 import time
 import hashlib
-import yaml
+import ipaddress
 import re
 import socket
+import sys
 import urllib3
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.cfst_history import CfstHistory
+from app.services.hosts_export import HostsExporter
+from app.services.ip_pool import IPPool
+from app.services.ip_selector import TrackerIPSelector
+from app.utils.cfst_result import CfstRecord, parse_result_file
+from app.utils import icmp
+from app.utils.config_store import config_store
+from app.utils.domain_blacklist import DomainBlacklist
+from app.utils.public_suffix import registrable_domain
 
 
 logger = logging.getLogger(__name__)
 
-# 通用域名黑名单，可随时扩展
-DOMAIN_BLACKLIST = [
-    "docker.com",
-    "docker.io",
-    "quay.io",
-    "gcr.io",
-    "k8s.gcr.io",
-    "ghcr.io"
-]
 
-def is_blacklisted(domain: str) -> bool:
-    return any(bad in domain for bad in DOMAIN_BLACKLIST)
+# hosts分区：PT站点分区与合并后的hosts源（MergedHosts）分区
+SECTION_PT = "pt_sites"
+SECTION_MERGED = "merged_hosts"
+
+# 既没有优选结果也没有已配置Tracker IP时使用的默认Cloudflare IP
+DEFAULT_CLOUDFLARE_IP = "104.16.91.215"
+
+# Cloudflare IP范围（部分），模块加载时解析一次
+CLOUDFLARE_NETWORKS = [ipaddress.ip_network(r) for r in (
+    # IPv4
+    '103.21.244.0/22', '103.22.200.0/22', '103.31.4.0/22', '104.16.0.0/13',
+    '104.24.0.0/14', '108.162.192.0/18', '131.0.72.0/22', '141.101.64.0/18',
+    '162.158.0.0/15', '172.64.0.0/13', '173.245.48.0/20', '188.114.96.0/20',
+    '190.93.240.0/20', '197.234.240.0/22', '198.41.128.0/17',
+    # IPv6
+    '2400:cb00::/32', '2405:8100::/32', '2405:b500::/32', '2606:4700::/32',
+    '2803:f800::/32', '2c0f:f248::/32', '2a06:98c0::/29',
+)]
+
+_system_resolver = None
+
+
+def _get_system_resolver():
+    """系统DNS解析器（超时2秒）：首次使用时才导入dnspython并读取系统DNS配置，之后复用同一个实例"""
+    global _system_resolver
+    if _system_resolver is None:
+        import dns.resolver
+        resolver = dns.resolver.Resolver(configure=True)
+        resolver.timeout = 2.0
+        resolver.lifetime = 2.0
+        _system_resolver = resolver
+    return _system_resolver
+
+
+def _sync_global_config(config: Dict[str, Any]):
+    """同步 app.main 中的全局config对象；仅在Web服务已加载时同步，命令行模式下不会因此导入整个Web应用"""
+    main_module = sys.modules.get("app.main")
+    if main_module is not None:
+        main_module.config = config
+
 
 class HostsManager:
     """Hosts文件管理器，用于管理系统的hosts文件"""
@@ -47,22 +89,52 @@ class HostsManager:
         self.source_end_mark = "# ===== %s结束 (%d 条记录) ===== #"
         # 最新优选的Cloudflare IP
         self.best_cloudflare_ip = None
+        # 最近一次运行优选脚本的时间，供网络看门狗计算冷却
+        self.last_cfst_time = None
+        # 最近一次优选结果中排名靠前的候选IP（持久化，供故障切换使用）
+        self.ip_pool = IPPool()
+        self.cfst_candidates: List[str] = self.ip_pool.ips()
+        # 优选结果历史归档
+        self.cfst_history = CfstHistory()
+        # 按Tracker分别选择最优IP
+        self.ip_selector = TrackerIPSelector(config)
+        # 域名黑名单（在条目进入流程时过滤一次）
+        self.blacklist = DomainBlacklist(config.get("domain_blacklist"))
         # 域名IP历史记录，用于在网络波动时提供兜底IP
         self.domain_ip_history = {}
         # IP检测失败重试次数
         self.ping_retry_count = 3
+        # 批量检测IP时的并发数
+        self.probe_workers = 32
         # 连续失败次数阈值，超过此值才真正剔除域名
         self.max_failure_count = 3
         # 域名连续失败计数器
         self.domain_failure_counter = {}
+        # 最近一次生成的PT站点与合并hosts源条目（内存副本，供本地DNS服务等订阅方使用）
+        self.published_pt_entries: Optional[List[str]] = None
+        self.published_merged_entries: Optional[List[str]] = None
+        self._section_listeners = []
+        # 各分区独立版本号（条目变化时加一）与最近更新时间
+        self.section_versions = {SECTION_PT: 0, SECTION_MERGED: 0}
+        self.section_updated_at: Dict[str, float] = {}
+        self._sections_lock = threading.RLock()
+        # hosts文件读-改-写互斥，PT分区与MergedHosts分区可由不同任务分别更新
+        self._hosts_file_lock = threading.RLock()
+        # 多格式导出（hosts/dnsmasq/AdGuard/Clash/JSON），随分区更新一次性渲染
+        self.exporter = HostsExporter(self.published_sections)
+        self.add_section_listener(self.exporter.update)
         # 任务状态追踪
         self.task_status = {"status": "done", "message": "无任务"}
         self.task_running = False
+        # 演练模式（命令行 --dry-run）：照常计算，但不写hosts文件、配置文件与MergedHosts备份
+        self.dry_run = False
         # 新增：变更合并标记
         self.pending_update = False
         self.cf_domains = set()
         # 添加Cloudflare检测结果缓存
         self.cloudflare_cache = {}
+        # 按可注册域名（站点zone）缓存的检测结果，同一站点的各个子域名共用
+        self.cloudflare_zone_cache = {}
         self.cache_expiry = 3600  # 缓存过期时间（秒）
         # 定义HTTP请求头
         self.headers = {
@@ -78,30 +150,22 @@ class HostsManager:
         # 自动同步Cloudflare白名单集合
         cf_domains_from_config = self.config.get('cloudflare_domains', [])
         self.cf_domains = set(cf_domains_from_config) if isinstance(cf_domains_from_config, list) else set([cf_domains_from_config])
+        self.ip_selector.update_config(config)
+        self.blacklist.update_config(config)
         
     def _merge_write_config(self, partial_update: Dict[str, Any]):
         """将局部更新安全合并写回 config/config.yaml，避免覆盖其它未修改配置"""
-        config_path = os.path.join("config", "config.yaml")
+        if self.dry_run:
+            self.config = {**self.config, **partial_update}
+            logger.info(f"[演练] 跳过写入配置: {', '.join(partial_update)}")
+            return
         try:
-            current = {}
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    try:
-                        current = yaml.safe_load(f) or {}
-                    except Exception:
-                        current = {}
-            # 合并：以 current 为基础，仅覆盖传入的键
-            current.update(partial_update or {})
-            with open(config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(current, f, default_flow_style=False, allow_unicode=True)
+            # 以配置存储中的最新配置为基础，仅覆盖传入的键
+            current = config_store.merge(partial_update)
             # 内存中的 self.config 同步为合并后的结果
             self.config = current
             # 同步全局 config 对象（若存在）
-            try:
-                import app.main
-                app.main.config = current
-            except Exception:
-                pass
+            _sync_global_config(current)
         except Exception as e:
             logger.error(f"安全合并写配置失败: {e}")
 
@@ -119,7 +183,12 @@ class HostsManager:
         """收集PT站点的条目（已优化：不再检测IP连通性，直接写入，但严格过滤非Cloudflare站点）"""
         entries = []
         # 如果有优选的IP，使用该IP，否则使用配置中的IP
-        cloudflare_ip = self.best_cloudflare_ip or "104.16.91.215"  # 默认IP
+        cloudflare_ip = self.default_tracker_ip()
+        # 双栈模式：候选池中每个地址族排名最高的IP，用于补充另一地址族的映射
+        pool_ips = {}
+        if self.dual_stack:
+            for pool_ip in self.ip_pool.ips():
+                pool_ips.setdefault(icmp.address_family(pool_ip), pool_ip)
         # 添加来自配置的Tracker域名，但只添加Cloudflare站点
         if self.config.get("trackers"):
             non_cf_domains = []
@@ -139,6 +208,9 @@ class HostsManager:
                     # 直接写入，不再检测连通性
                     self.domain_ip_history[domain] = ip
                     entries.append(f"{ip}\t{domain}")
+                    other_family = socket.AF_INET if icmp.address_family(ip) == socket.AF_INET6 else socket.AF_INET6
+                    if other_family in pool_ips:
+                        entries.append(f"{pool_ips[other_family]}\t{domain}")
                 else:
                     non_cf_domains.append(domain)
             
@@ -177,7 +249,7 @@ class HostsManager:
                         if len(parts) < 2:
                             continue
                         ip, domain = parts[0], parts[1]
-                        if is_blacklisted(domain):
+                        if self.blacklist.is_blacklisted(domain):
                             continue  # 跳过黑名单域名
                         entries.append((ip, domain))
                     # 拉取成功，写入本地缓存
@@ -207,7 +279,7 @@ class HostsManager:
                     if len(parts) < 2:
                         continue
                     ip, domain = parts[0], parts[1]
-                    if is_blacklisted(domain):
+                    if self.blacklist.is_blacklisted(domain):
                         continue
                     entries.append((ip, domain))
                 return entries
@@ -225,67 +297,146 @@ class HostsManager:
             cache: IP延迟缓存字典，用于避免重复测试同一IP
             domain: 与IP关联的域名，用于记录历史IP和失败计数
         """
-        # 使用缓存避免重复测试
-        if cache is not None and ip in cache:
-            return cache[ip]
-            
-        # 增加多方式检测（socket连接+ICMP ping），并增加重试机制，避免因临时网络波动导致误判
+        if cache is None:
+            cache = {}
+        # 使用缓存避免重复测试（批量预检测后这里通常直接命中）
+        if ip not in cache:
+            self._probe_ips([ip], timeout=timeout, cache=cache)
+        latency = cache[ip]
+        if domain:
+            if latency is not None:
+                self.domain_ip_history[domain] = ip
+                self.domain_failure_counter[domain] = 0
+            else:
+                self.domain_failure_counter[domain] = self.domain_failure_counter.get(domain, 0) + 1
+        return latency
+
+    def probe_ips(self, ips: List[str], timeout: float = 1) -> Dict[str, Optional[float]]:
+        """批量检测IP延迟（毫秒，不可达为None），每次调用重新检测"""
+        return self._probe_ips(ips, timeout=timeout)
+
+    def _probe_ips(self, ips: List[str], timeout: float = 1, cache: Dict[str, float] = None) -> Dict[str, Optional[float]]:
+        """
+        批量检测IP连通性：IPv4与IPv6候选在同一批中并发TCP连接80/443端口，全部失败的IP再通过
+        ICMP套接字（每个地址族一个）批量ping，ping通但端口不通的IP延迟记为999。结果写入cache。
+
+        Returns:
+            IP -> 延迟（毫秒），不可达为None
+        """
+        if cache is None:
+            cache = {}
+        todo = [ip for ip in dict.fromkeys(ips) if ip not in cache]
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.probe_workers, len(todo))) as executor:
+                latencies = list(executor.map(lambda ip: self._tcp_latency(ip, timeout), todo))
+            unreachable = []
+            for ip, latency in zip(todo, latencies):
+                cache[ip] = latency
+                if latency is None:
+                    unreachable.append(ip)
+            if unreachable:
+                for ip, rtt in self._icmp_ping(unreachable, timeout).items():
+                    if rtt is not None:
+                        cache[ip] = 999  # ping通但端口不通，延迟设为较高
+        return {ip: cache[ip] for ip in ips}
+
+    def _tcp_latency(self, ip: str, timeout: float) -> Optional[float]:
+        """TCP连接80/443端口测延迟（按IP字面量选择IPv4/IPv6），带重试，避免因临时网络波动导致误判"""
         ports = [80, 443]
-        last_exception = None
-        # 优先尝试socket连接
         for retry in range(self.ping_retry_count):
             for port in ports:
                 try:
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    s = socket.socket(icmp.address_family(ip), socket.SOCK_STREAM)
                     s.settimeout(timeout)
                     start = time.time()
                     s.connect((ip, port))
                     end = time.time()
                     s.close()
-                    latency = (end - start) * 1000  # 毫秒
-                    if cache is not None:
-                        cache[ip] = latency
-                    if domain:
-                        self.domain_ip_history[domain] = ip
-                        self.domain_failure_counter[domain] = 0
-                    return latency
-                except Exception as e:
-                    last_exception = e
+                    return (end - start) * 1000  # 毫秒
+                except Exception:
                     continue
             # 如果所有端口都连接失败，等待短暂时间后重试
             if retry < self.ping_retry_count - 1:
                 time.sleep(0.5)
-        # socket全部失败后，尝试ICMP ping
-        try:
-            # Windows下ping命令参数不同
-            ping_cmd = ["ping", "-n", "1", "-w", str(timeout * 1000), ip] if os.name == "nt" else ["ping", "-c", "1", "-W", str(timeout), ip]
-            result = subprocess.run(ping_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0:
-                if cache is not None:
-                    cache[ip] = 999  # ping通但端口不通，延迟设为较高
-                if domain:
-                    self.domain_ip_history[domain] = ip
-                    self.domain_failure_counter[domain] = 0
-                return 999
-        except Exception as e:
-            last_exception = e
-        # 所有重试都失败
-        if cache is not None:
-            cache[ip] = None
-        if domain:
-            self.domain_failure_counter[domain] = self.domain_failure_counter.get(domain, 0) + 1
         return None
+
+    def _icmp_ping(self, ips: List[str], timeout: float) -> Dict[str, Optional[float]]:
+        """批量ICMP ping；无法创建ICMP套接字时（如Windows非管理员）退回逐个调用系统ping命令"""
+        results = icmp.ping_many(ips, timeout)
+        if results is not None:
+            return results
+        results = {}
+        for ip in ips:
+            # Windows下ping命令参数不同
+            ping_cmd = ["ping", "-n", "1", "-w", str(int(timeout * 1000)), ip] if os.name == "nt" else ["ping", "-c", "1", "-W", str(max(1, int(timeout))), ip]
+            try:
+                result = subprocess.run(ping_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                results[ip] = 0.0 if result.returncode == 0 else None
+            except Exception:
+                results[ip] = None
+        return results
     
+    def _prefetch_latencies(self, ips, cache: Dict[str, float]):
+        """在逐个域名优选之前批量检测全部候选IP"""
+        probe_start = time.time()
+        results = self._probe_ips(sorted(ips), cache=cache)
+        reachable = sum(1 for latency in results.values() if latency is not None)
+        logger.info(f"批量检测 {len(results)} 个候选IP完成，可达 {reachable} 个，耗时 {time.time() - probe_start:.2f} 秒")
+
+    @property
+    def dual_stack(self) -> bool:
+        """启用 cloudflare.ipv6 时，每个域名同时输出最佳的IPv4（A）与IPv6（AAAA）映射"""
+        return bool((self.config.get("cloudflare") or {}).get("ipv6", False))
+
+    def _select_domain_ips(self, domain: str, ip_set, cache: Dict[str, float]) -> List[Tuple[str, Optional[float]]]:
+        """
+        为域名选择最佳IP：默认在所有候选中选延迟最低的一个；双栈模式下IPv4与IPv6各选一个。
+        某个地址族的IP全部不可达时兜底选用其中第一个。
+
+        Returns:
+            [(IP, 延迟毫秒，兜底时为None)]，IPv4在前
+        """
+        groups: Dict[int, List[str]] = {}
+        for ip in ip_set:
+            family = icmp.address_family(ip) if self.dual_stack else socket.AF_INET
+            groups.setdefault(family, []).append(ip)
+        selected = []
+        for family in sorted(groups, key=lambda f: f != socket.AF_INET):
+            best_ip = None
+            best_latency = None
+            for ip in groups[family]:
+                latency = self._ping_ip(ip, cache=cache, domain=domain)
+                if latency is not None and (best_latency is None or latency < best_latency):
+                    best_ip = ip
+                    best_latency = latency
+            selected.append((best_ip, best_latency) if best_ip else (groups[family][0], None))
+        return selected
+
+    @property
+    def is_cluster_agent(self) -> bool:
+        """集群agent的hosts由hub下发的快照生成，本机不运行拉取、检测与优选流程"""
+        return str((self.config.get("cluster", {}) or {}).get("role", "")).lower() == "agent"
+
+    def _skip_on_cluster_agent(self, task_name: str) -> bool:
+        """集群agent上跳过hosts流程（结果会被hub快照覆盖），返回是否跳过"""
+        if not self.is_cluster_agent:
+            return False
+        message = f"当前节点为集群agent，hosts由hub统一生成，已跳过{task_name}"
+        logger.info(message)
+        self.task_status = {"status": "done", "message": message}
+        return True
+
     def update_hosts(self):
         """更新hosts文件，合并PT站点、订阅源和自定义规则"""
+        if self._skip_on_cluster_agent("hosts更新"):
+            return False
         self.task_running = True
         self.task_status = {"status": "running", "message": "开始更新hosts文件..."}
         logger.info("开始更新hosts文件...")
 
         try:
             logger.info("开始更新hosts文件")
-            ip_latency_cache = {}
-            
+
             # 1. 清理trackers列表，移除非Cloudflare站点（避免历史残留问题）
             if self.config.get("trackers"):
                 original_count = len(self.config["trackers"])
@@ -317,8 +468,7 @@ class HostsManager:
                     
                     # 更新全局配置
                     try:
-                        import app.main
-                        app.main.config = self.config
+                        _sync_global_config(self.config)
                         logger.info("[历史清理] 同步更新全局config对象完成")
                     except Exception as e:
                         logger.error(f"[历史清理] 更新全局config对象失败: {str(e)}")
@@ -334,107 +484,9 @@ class HostsManager:
 
 
 
-            # 3. 订阅源条目
-            source_entries_map: Dict[str, List[str]] = {}
-            tracker_domains = set()
-            disabled_domains = self._get_disabled_tracker_domains()  # 新增：获取所有禁用tracker域名
-            if self.config.get("trackers"):
-                for tracker in self.config["trackers"]:
-                    if tracker.get("enable") and tracker.get("domain"):
-                        tracker_domains.add(tracker["domain"])
-            merged_hosts_backup = self._load_merged_hosts_backup()
-            backup_domains = set(merged_hosts_backup.keys())
-            current_domains = set()
-            abnormal_sources = set()
-            if self.config.get("hosts_sources"):
-                total_sources = len([s for s in self.config["hosts_sources"] if s.get("enable") and s.get("url") and s.get("name")])
-                logger.info(f"开始处理 {total_sources} 个外部hosts源")
-                for i, source in enumerate(self.config["hosts_sources"]):
-                    if source.get("enable") and source.get("url") and source.get("name"):
-                        source_name = source.get("name", "未命名源")
-                        self.task_status = {"status": "running", "message": f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}"}
-                        source_start_time = time.time()
-                        logger.info(f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}")
-                        source_entries = self._fetch_hosts_source(source["url"])
-                        logger.info(f"获取hosts源 {source_name} 完成，返回 {len(source_entries)} 条记录，耗时 {time.time() - source_start_time:.2f} 秒")
-                        if len(source_entries) < 5:
-                            abnormal_sources.add(source_name)
-                        entry_process_start = time.time()
-                        entry_count = 0
-                        for ip, domain in source_entries:
-                            # 新增：跳过禁用tracker域名
-                            if domain in tracker_domains or domain.strip().lower() in disabled_domains:
-                                continue
-                            source_entries_map.setdefault(source_name, []).append(f"{ip}\t{domain}")
-                            current_domains.add(domain)
-                            entry_count += 1
-                        logger.info(f"处理hosts源 {source_name} 的 {entry_count} 条记录完成，耗时 {time.time() - entry_process_start:.2f} 秒")
-            # 4. 处理历史IP记录作为兜底（只收集，不检测）
-            for domain, ip in self.domain_ip_history.items():
-                # 新增：跳过禁用tracker域名
-                if domain in tracker_domains or domain.strip().lower() in disabled_domains:
-                    continue
-                source_entries_map.setdefault("HistoryIPs", []).append(f"{ip}\t{domain}")
-                current_domains.add(domain)
-            # 4.5 智能兜底：对比备份，找出本次丢失的域名
-            lost_domains = backup_domains - current_domains
-            # 获取已禁用的tracker域名
-            disabled_domains = self._get_disabled_tracker_domains()
-            
-            for lost_domain in lost_domains:
-                # 跳过已禁用的域名
-                if lost_domain.strip().lower() in disabled_domains:
-                    logger.info(f"[兜底跳过] 域名 {lost_domain} 已被用户禁用，不参与兜底保留")
-                    continue
-
+            # 3-5. 订阅源、历史IP与兜底域名条目，按域名分组并选择最佳IP
+            merged_entries, merged_dict, log_lines = self._collect_merged_entries()
 
-                
-                lost_ip = merged_hosts_backup[lost_domain]
-                if self._dns_check(lost_domain, lost_ip):
-                    source_entries_map.setdefault("LostHosts", []).append(f"{lost_ip}\t{lost_domain}")
-                    logger.warning(f"[兜底保留] 域名 {lost_domain} 本次未被任何源收录，但DNS检测有效，保留上次IP: {lost_ip}")
-                else:
-                    logger.warning(f"[兜底丢弃] 域名 {lost_domain} 本次未被任何源收录，且DNS检测无效，丢弃上次IP: {lost_ip}")
-            # 5. 按域名分组并选择最佳IP
-            self.task_status = {"status": "running", "message": "正在进行域名IP优选"}
-            domain_ips = {}
-            for source_name, entries in source_entries_map.items():
-                if is_blacklisted(source_name):
-                    continue
-                for entry in entries:
-                    ip, domain = entry.split('\t', 1)
-                    if is_blacklisted(domain):
-                        continue
-                    if domain not in domain_ips:
-                        domain_ips[domain] = []
-                    domain_ips[domain].append((ip, source_name))
-            
-            # 为每个域名选择最佳IP
-            merged_dict = {}
-            log_lines = []
-            
-            for domain, ip_sources in domain_ips.items():
-                best_ip = None
-                best_latency = None
-                ip_set = set()
-                for ip, source in ip_sources:
-                    ip_set.add(ip)
-                
-                for ip in ip_set:
-                    latency = self._ping_ip(ip, cache=ip_latency_cache, domain=domain)
-                    if latency is not None and (best_latency is None or latency < best_latency):
-                        best_ip = ip
-                        best_latency = latency
-                
-                if best_ip:
-                    merged_dict[domain] = best_ip
-                    log_lines.append(f"域名 {domain} 选用IP: {best_ip}，延迟: {best_latency:.2f} ms")
-                else:
-                    # 兜底选择第一个IP
-                    fallback_ip = next(iter(ip_set))
-                    merged_dict[domain] = fallback_ip
-                    log_lines.append(f"域名 {domain} 所有IP不可达，兜底选用: {fallback_ip}")
-            
             # 6. 生成最终hosts条目
             self.task_status = {"status": "running", "message": "正在生成最终hosts条目"}
             logger.info("生成合并后的最终hosts条目")
@@ -444,15 +496,6 @@ class HostsManager:
             if "pt_sites" in all_entries:
                 sections.append((self.pt_start_mark, all_entries["pt_sites"], self.pt_end_mark % len(all_entries["pt_sites"])))
             
-            # 生成合并后的hosts源条目（所有源合并为一个section）
-            merged_entries = []
-            for domain, best_ip in merged_dict.items():
-                if not is_blacklisted(domain):
-                    merged_entries.append(f"{best_ip}\t{domain}")
-            
-            # 按域名排序，保持输出稳定
-            merged_entries.sort(key=lambda x: x.split('\t')[1])
-            
             # 添加合并后的hosts源section（保持与1.1.0版本兼容的名称）
             if merged_entries:
                 sections.append((
@@ -470,9 +513,7 @@ class HostsManager:
             total_entries = sum(len(entries) for _, entries, _ in sections)
             logger.info(f"成功更新hosts文件，添加了{total_entries}条记录，共{len(sections)}个分区")
             # 8. 输出最终检测结果日志
-            logger.info("=== 域名优选IP结果汇总 ===")
-            for line in log_lines:
-                logger.info(line)
+            self._log_selection_summary(log_lines)
             # 9. 合并完成后更新备份
             self._save_merged_hosts_backup(merged_dict)
             self.task_status = {"status": "done", "message": f"已完成hosts更新，添加了{total_entries}条记录"}
@@ -493,6 +534,114 @@ class HostsManager:
                 self.update_hosts()
             return False
     
+    def _collect_merged_entries(self) -> Tuple[List[str], Dict[str, str], List[str]]:
+        """
+        拉取hosts源、合并历史IP与兜底域名并检测延迟，为每个域名选出IP。
+
+        update_hosts 与 run_cfst_and_update_hosts 共用此流程。
+        返回 (按域名排序的MergedHosts条目, 域名->首选IP的备份字典, 优选结果日志)。
+        """
+        ip_latency_cache = {}
+        # 3. 订阅源条目
+        source_entries_map: Dict[str, List[str]] = {}
+        tracker_domains = set()
+        disabled_domains = self._get_disabled_tracker_domains()  # 新增：获取所有禁用tracker域名
+        if self.config.get("trackers"):
+            for tracker in self.config["trackers"]:
+                if tracker.get("enable") and tracker.get("domain"):
+                    tracker_domains.add(tracker["domain"])
+        merged_hosts_backup = self._load_merged_hosts_backup()
+        backup_domains = set(merged_hosts_backup.keys())
+        current_domains = set()
+        abnormal_sources = set()
+        if self.config.get("hosts_sources"):
+            total_sources = len([s for s in self.config["hosts_sources"] if s.get("enable") and s.get("url") and s.get("name")])
+            logger.info(f"开始处理 {total_sources} 个外部hosts源")
+            for i, source in enumerate(self.config["hosts_sources"]):
+                if source.get("enable") and source.get("url") and source.get("name"):
+                    source_name = source.get("name", "未命名源")
+                    self.task_status = {"status": "running", "message": f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}"}
+                    source_start_time = time.time()
+                    logger.info(f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}")
+                    source_entries = self._fetch_hosts_source(source["url"])
+                    logger.info(f"获取hosts源 {source_name} 完成，返回 {len(source_entries)} 条记录，耗时 {time.time() - source_start_time:.2f} 秒")
+                    if len(source_entries) < 5:
+                        abnormal_sources.add(source_name)
+                    entry_process_start = time.time()
+                    entry_count = 0
+                    for ip, domain in source_entries:
+                        # 新增：跳过禁用tracker域名
+                        if domain in tracker_domains or domain.strip().lower() in disabled_domains:
+                            continue
+                        source_entries_map.setdefault(source_name, []).append(f"{ip}\t{domain}")
+                        current_domains.add(domain)
+                        entry_count += 1
+                    logger.info(f"处理hosts源 {source_name} 的 {entry_count} 条记录完成，耗时 {time.time() - entry_process_start:.2f} 秒")
+        # 4. 处理历史IP记录作为兜底（只收集，不检测）
+        for domain, ip in self.domain_ip_history.items():
+            # 新增：跳过禁用tracker域名
+            if domain in tracker_domains or domain.strip().lower() in disabled_domains:
+                continue
+            # 历史记录来自旧规则下的结果，按当前黑名单过滤
+            if self.blacklist.is_blacklisted(domain):
+                continue
+            source_entries_map.setdefault("HistoryIPs", []).append(f"{ip}\t{domain}")
+            current_domains.add(domain)
+        # 4.5 智能兜底：对比备份，找出本次丢失的域名
+        lost_domains = backup_domains - current_domains
+        for lost_domain in lost_domains:
+            # 跳过已禁用的域名
+            if lost_domain.strip().lower() in disabled_domains:
+                logger.info(f"[兜底跳过] 域名 {lost_domain} 已被用户禁用，不参与兜底保留")
+                continue
+            if self.blacklist.is_blacklisted(lost_domain):
+                continue
+            lost_ip = merged_hosts_backup[lost_domain]
+            if self._dns_check(lost_domain, lost_ip):
+                source_entries_map.setdefault("LostHosts", []).append(f"{lost_ip}\t{lost_domain}")
+                logger.warning(f"[兜底保留] 域名 {lost_domain} 本次未被任何源收录，但DNS检测有效，保留上次IP: {lost_ip}")
+            else:
+                logger.warning(f"[兜底丢弃] 域名 {lost_domain} 本次未被任何源收录，且DNS检测无效，丢弃上次IP: {lost_ip}")
+        # 5. 按域名分组并选择最佳IP
+        self.task_status = {"status": "running", "message": "正在进行域名IP优选"}
+        domain_ips = {}
+        for source_name, entries in source_entries_map.items():
+            for entry in entries:
+                ip, domain = entry.split('\t', 1)
+                if domain not in domain_ips:
+                    domain_ips[domain] = []
+                domain_ips[domain].append((ip, source_name))
+        
+        # 为每个域名选择最佳IP（先批量检测所有候选IP）
+        self._prefetch_latencies({ip for ip_sources in domain_ips.values() for ip, _ in ip_sources}, ip_latency_cache)
+        merged_dict = {}
+        merged_entries = []
+        log_lines = []
+        
+        for domain, ip_sources in domain_ips.items():
+            ip_set = set()
+            for ip, source in ip_sources:
+                ip_set.add(ip)
+            
+            selected = self._select_domain_ips(domain, ip_set, ip_latency_cache)
+            # 备份中只保存首选（IPv4优先）IP
+            merged_dict[domain] = selected[0][0]
+            for best_ip, best_latency in selected:
+                merged_entries.append(f"{best_ip}\t{domain}")
+                if best_latency is not None:
+                    log_lines.append(f"域名 {domain} 选用IP: {best_ip}，延迟: {best_latency:.2f} ms")
+                else:
+                    # 兜底选择第一个IP
+                    log_lines.append(f"域名 {domain} 所有IP不可达，兜底选用: {best_ip}")
+        # 按域名排序，保持输出稳定
+        merged_entries.sort(key=lambda x: x.split('\t')[1])
+        return merged_entries, merged_dict, log_lines
+
+    def _log_selection_summary(self, log_lines: List[str]):
+        logger.info("=== 域名优选IP结果汇总 ===")
+        for line in log_lines:
+            logger.info(line)
+
     def _get_hosts_path(self) -> str:
         """获取hosts文件路径，优先读取配置中的自定义路径 hosts_path"""
         try:
@@ -508,44 +657,159 @@ class HostsManager:
         else:  # Linux or macOS
             return "/etc/hosts"
     
-    def _update_system_hosts_with_sections(self, sections: List[Tuple[str, List[str], str]]):
-        """更新系统hosts文件，保持分段格式，彻底移除所有PT-Accelerator分区，防止分区重复"""
-        hosts_path = self._get_hosts_path()
-        # 读取当前hosts文件
-        with open(hosts_path, 'r') as f:
-            content = f.read()
-        # 循环移除所有PT-Accelerator分区，防止历史残留
-        while self.start_mark in content and self.end_mark in content:
-            start_pos = content.find(self.start_mark)
-            end_pos = content.find(self.end_mark) + len(self.end_mark)
-            content = content[:start_pos] + content[end_pos:]
-        # 添加新的条目，保持分段格式
-        new_content = content.rstrip() + "\n\n" + self.start_mark + "\n"
-        for start_mark, entries, end_mark in sections:
-            new_content += start_mark + "\n"
-            for entry in entries:
-                new_content += entry + "\n"
-            new_content += end_mark + "\n"
-        new_content += self.end_mark + "\n"
-        # 写入hosts文件
-        with open(hosts_path, 'w') as f:
-            f.write(new_content)
+    def add_section_listener(self, listener):
+        """注册条目变更回调 listener(pt_entries, merged_entries)，每次生成或替换分区后调用"""
+        self._section_listeners.append(listener)
 
-    def clear_project_sections(self) -> None:
-        """仅移除本项目写入的分区，保留系统原有hosts内容不变"""
+    def published_sections(self) -> Tuple[List[str], List[str]]:
+        """返回当前的 (PT站点条目, 合并hosts源条目)；本次运行尚未生成过时从hosts文件中读取"""
+        if self.published_pt_entries is None or self.published_merged_entries is None:
+            pt_entries, merged_entries = self._read_project_sections()
+            if self.published_pt_entries is None:
+                self.published_pt_entries = pt_entries
+            if self.published_merged_entries is None:
+                self.published_merged_entries = merged_entries
+        return self.published_pt_entries, self.published_merged_entries
+
+    def _read_project_sections(self) -> Tuple[List[str], List[str]]:
+        """从hosts文件的项目分区中读取PT站点条目与其余（hosts源）条目"""
+        pt_entries: List[str] = []
+        merged_entries: List[str] = []
+        try:
+            with open(self._get_hosts_path(), 'r') as f:
+                lines = f.read().splitlines()
+        except Exception as e:
+            logger.warning(f"读取hosts文件失败: {e}")
+            return pt_entries, merged_entries
+        in_project = False
+        in_pt = False
+        for line in lines:
+            line = line.strip()
+            if line == self.start_mark:
+                in_project = True
+            elif line == self.end_mark:
+                in_project = False
+            elif not in_project or not line:
+                continue
+            elif line == self.pt_start_mark:
+                in_pt = True
+            elif line.startswith("#"):
+                if line.startswith(self.pt_end_mark.split("(")[0]):
+                    in_pt = False
+            else:
+                parts = line.split()
+                if len(parts) >= 2:
+                    (pt_entries if in_pt else merged_entries).append(f"{parts[0]}\t{parts[1]}")
+        return pt_entries, merged_entries
+
+    def _publish_sections(self, pt_entries: Optional[List[str]] = None, merged_entries: Optional[List[str]] = None):
+        """更新内存中的分区条目并通知订阅方（None表示该分区不变）；条目有变化的分区版本号加一"""
+        with self._sections_lock:
+            for section, entries in ((SECTION_PT, pt_entries), (SECTION_MERGED, merged_entries)):
+                if entries is None:
+                    continue
+                entries = list(entries)
+                attr = "published_pt_entries" if section == SECTION_PT else "published_merged_entries"
+                if entries != getattr(self, attr):
+                    self.section_versions[section] += 1
+                    self.section_updated_at[section] = time.time()
+                setattr(self, attr, entries)
+            pt, merged = self.published_sections()
+        for listener in self._section_listeners:
+            try:
+                listener(pt, merged)
+            except Exception as e:
+                logger.error(f"分区变更回调失败: {e}", exc_info=True)
+
+    def section_status(self) -> Dict[str, Dict[str, Any]]:
+        """各分区的版本号、最近更新时间与条目数"""
+        pt, merged = self.published_sections()
+        status = {}
+        for section, entries in ((SECTION_PT, pt), (SECTION_MERGED, merged)):
+            updated_at = self.section_updated_at.get(section)
+            status[section] = {
+                "version": self.section_versions[section],
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(updated_at)) if updated_at else None,
+                "entries": len(entries),
+            }
+        return status
+
+    def _write_hosts_file(self, content: str):
+        """
+        写入hosts文件：先写同目录临时文件再原子替换，读取方不会看到写了一半的文件；
+        hosts文件为bind mount（如Docker挂载的 /etc/hosts）无法替换时，退回为一次性覆盖写入。
+        """
         hosts_path = self._get_hosts_path()
+        tmp_path = f"{hosts_path}.pt-accelerator.tmp"
         try:
-            with open(hosts_path, 'r') as f:
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            try:
+                os.chmod(tmp_path, os.stat(hosts_path).st_mode & 0o7777)
+            except OSError:
+                pass
+            os.replace(tmp_path, hosts_path)
+            return
+        except OSError as e:
+            logger.debug(f"原子替换hosts文件失败，改为直接写入: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        with open(hosts_path, 'w') as f:
+            f.write(content)
+
+    def _hosts_file_enabled(self) -> bool:
+        """演练模式，或本地DNS服务启用且配置 dns_server.write_hosts 为false时，只更新内存条目，不写hosts文件"""
+        if self.dry_run:
+            return False
+        dns_config = self.config.get("dns_server", {}) or {}
+        return not (dns_config.get("enable") and dns_config.get("write_hosts", True) is False)
+
+    def _update_system_hosts_with_sections(self, sections: List[Tuple[str, List[str], str]]):
+        """更新系统hosts文件，保持分段格式，彻底移除所有PT-Accelerator分区，防止分区重复"""
+        pt_entries: List[str] = []
+        merged_entries: List[str] = []
+        for start_mark, entries, _ in sections:
+            (pt_entries if start_mark == self.pt_start_mark else merged_entries).extend(entries)
+        self._publish_sections(pt_entries, merged_entries)
+        if not self._hosts_file_enabled():
+            return
+        with self._hosts_file_lock:
+            # 读取当前hosts文件
+            with open(self._get_hosts_path(), 'r') as f:
                 content = f.read()
-            changed = False
+            # 循环移除所有PT-Accelerator分区，防止历史残留
             while self.start_mark in content and self.end_mark in content:
                 start_pos = content.find(self.start_mark)
                 end_pos = content.find(self.end_mark) + len(self.end_mark)
                 content = content[:start_pos] + content[end_pos:]
-                changed = True
+            # 添加新的条目，保持分段格式
+            new_content = content.rstrip() + "\n\n" + self.start_mark + "\n"
+            for start_mark, entries, end_mark in sections:
+                new_content += start_mark + "\n"
+                for entry in entries:
+                    new_content += entry + "\n"
+                new_content += end_mark + "\n"
+            new_content += self.end_mark + "\n"
+            self._write_hosts_file(new_content)
+
+    def clear_project_sections(self) -> None:
+        """仅移除本项目写入的分区，保留系统原有hosts内容不变"""
+        self._publish_sections([], [])
+        try:
+            with self._hosts_file_lock:
+                with open(self._get_hosts_path(), 'r') as f:
+                    content = f.read()
+                changed = False
+                while self.start_mark in content and self.end_mark in content:
+                    start_pos = content.find(self.start_mark)
+                    end_pos = content.find(self.end_mark) + len(self.end_mark)
+                    content = content[:start_pos] + content[end_pos:]
+                    changed = True
+                if changed:
+                    self._write_hosts_file(content.rstrip() + "\n")
             if changed:
-                with open(hosts_path, 'w') as f:
-                    f.write(content.rstrip() + "\n")
                 logger.info("已清理PT-Accelerator分区，保留系统原有hosts内容")
             else:
                 logger.info("未发现需要清理的PT-Accelerator分区")
@@ -553,245 +817,345 @@ class HostsManager:
             logger.error(f"清理PT-Accelerator分区失败: {str(e)}")
     
     def add_cloudflare_ip(self, domain: str, ip: str):
-        """添加Cloudflare优选IP到配置"""
+        """添加Cloudflare优选IP到配置（设置为最优IP，并将所有启用的Tracker更新为该IP）"""
         logger.info(f"为域名 {domain} 设置Cloudflare优选IP: {ip}")
-        
-        # 设置最佳IP
-        self.best_cloudflare_ip = ip
-        logger.info(f"设置最佳Cloudflare IP: {ip}")
-        
-        # 更新配置中的IP
+        ips = {t["domain"]: ip for t in self.config.get("trackers", []) or [] if t.get("enable") and t.get("domain")}
+        ips[domain] = ip
+        self.apply_tracker_ips(ips, best_ip=ip, add_missing=True)
+
+    def apply_tracker_ips(self, ips: Dict[str, str], best_ip: str = None, add_missing: bool = False, refresh_hosts: bool = True) -> int:
+        """
+        批量设置Tracker的IP：先在内存中修改全部Tracker，只写一次配置，最多执行一次hosts合并。
+
+        Args:
+            ips: {Tracker域名: IP}
+            best_ip: 同时设置为当前最优Cloudflare IP
+            add_missing: 域名不存在时新增Tracker
+            refresh_hosts: 写入配置后执行一次 update_hosts
+
+        Returns:
+            IP发生变化（或新增）的Tracker数量
+        """
+        if best_ip:
+            self.best_cloudflare_ip = best_ip
+            logger.info(f"设置最佳Cloudflare IP: {best_ip}")
         if not self.config.get("trackers"):
             self.config["trackers"] = []
-        
-        # 查找是否已存在该域名
-        for tracker in self.config["trackers"]:
-            if tracker["domain"] == domain:
+        trackers = self.config["trackers"]
+        by_domain = {t.get("domain"): t for t in trackers}
+        changed = 0
+        for domain, ip in ips.items():
+            tracker = by_domain.get(domain)
+            if tracker is None:
+                if not add_missing:
+                    continue
+                tracker = {"name": domain, "domain": domain, "ip": ip, "enable": True}
+                trackers.append(tracker)
+                by_domain[domain] = tracker
+                changed += 1
+            elif tracker.get("ip") != ip:
                 tracker["ip"] = ip
-                break
+                changed += 1
+        logger.info(f"批量更新Tracker IP：{changed}/{len(ips)} 个Tracker发生变化")
+
+        # 只写一次配置（同时同步全局config对象）
+        self._merge_write_config({"trackers": trackers})
+        self.update_config(self.config)
+
+        if refresh_hosts:
+            self.update_hosts()
+        return changed
+
+    def _update_all_trackers_ip(self, ip: str):
+        """更新所有tracker的IP为最优IP（不刷新hosts）"""
+        if not self.config.get("trackers"):
+            return
+        ips = {t["domain"]: ip for t in self.config["trackers"] if t.get("enable") and t.get("domain")}
+        self.apply_tracker_ips(ips, refresh_hosts=False)
+
+    @staticmethod
+    def resolve_cfst_script(script_path: str = None) -> str:
+        """优选脚本路径：未显式传入时按平台架构自动选择"""
+        if script_path:
+            return script_path
+        machine = platform.machine().lower()
+        if machine in ("aarch64", "arm64"):
+            return "cfst_linux_arm64/cfst_hosts.sh"
+        return "cfst_linux_amd64/cfst_hosts.sh"
+
+    def _run_cfst_script(self, script_path: str = None) -> Optional[str]:
+        """运行Cloudflare优选脚本并从输出中提取最优IP，失败时设置任务状态并返回None"""
+        script_path = self.resolve_cfst_script(script_path)
+        best_ip = None
+        if os.path.exists(script_path):
+            self.last_cfst_time = time.time()
+            self.task_status = {"status": "running", "message": "正在运行Cloudflare优选脚本"}
+            result = subprocess.run(["bash", script_path], capture_output=True, text=True)
+            if result.returncode == 0:
+                logger.info(f"脚本执行成功: {result.stdout}")
+                for line in result.stdout.splitlines():
+                    if "找到最优IP" in line or "新 IP 为" in line:
+                        if "新 IP 为" in line:
+                            parts = line.split("新 IP 为")
+                            if len(parts) > 1:
+                                best_ip = parts[1].strip()
+                                break
+                        else:
+                            parts = line.split()
+                            for i, part in enumerate(parts):
+                                if part == "最优IP:" or part == "IP:":
+                                    best_ip = parts[i+1].strip().rstrip(',')
+                                    break
         else:
-            # 不存在则添加
-            self.config["trackers"].append({
-                "name": domain,
-                "domain": domain,
-                "ip": ip,
-                "enable": True
-            })
-        
-        # 保存配置（仅写入 trackers 变更）
+            logger.error(f"脚本文件不存在: {script_path}")
+            self.task_status = {"status": "done", "message": f"优选失败: 脚本文件不存在: {script_path}"}
+            return None
+        if not best_ip:
+            logger.error("未能从脚本输出中提取到最优IP，流程中止")
+            self.task_status = {"status": "done", "message": "优选失败: 未能提取到最优IP"}
+            return None
+        self.cfst_candidates = self._read_cfst_candidates(script_path, best_ip)
+        return best_ip
+
+    def _read_cfst_candidates(self, script_path: str, best_ip: str) -> List[str]:
+        """解析脚本目录下的 result_hosts.txt：归档本次结果，并将排名前K的IP写入候选池（最优IP始终在第一位）"""
+        result_path = os.path.join(os.path.dirname(script_path), "result_hosts.txt")
+        try:
+            records = parse_result_file(result_path)
+        except Exception as e:
+            logger.warning(f"读取优选结果文件失败，仅使用最优IP: {str(e)}")
+            records = []
+        self.cfst_history.append(records, "cfst_script")
+        self.update_ip_pool(records, best_ip)
+        return self.ip_pool.ips()
+
+    def update_ip_pool(self, records: List[CfstRecord], best_ip: str = None):
+        """使用优选结果更新候选池（最优IP排在第一位）"""
+        entries = [{"ip": r.ip, "latency": r.latency, "speed": r.speed} for r in records]
+        if best_ip:
+            best = next((e for e in entries if e["ip"] == best_ip), {"ip": best_ip})
+            entries = [best] + [e for e in entries if e["ip"] != best_ip]
+        if entries:
+            self.ip_pool.update(entries[:self.ip_selector.top_k])
+
+    def default_tracker_ip(self) -> str:
+        """新增Tracker使用的默认IP：最新优选IP，其次为现有Tracker中最常用的IP"""
+        if self.best_cloudflare_ip:
+            return self.best_cloudflare_ip
+        ips = Counter(t["ip"] for t in self.config.get("trackers", []) or [] if t.get("enable") and t.get("ip"))
+        return ips.most_common(1)[0][0] if ips else DEFAULT_CLOUDFLARE_IP
+
+    def _apply_best_ip(self, best_ip: str) -> List[Dict[str, Any]]:
+        """将最优IP写入所有Cloudflare站点Tracker并合并写回配置，返回保留的Tracker列表"""
+        self.best_cloudflare_ip = best_ip
+        logger.info(f"串行流程提取到最优IP: {best_ip}")
+        filtered_trackers = []  # 确保后续统计时变量已定义
+        if self.config.get("trackers"):
+            original_count = len(self.config["trackers"])
+            non_cf_domains = []
+            for tracker in self.config["trackers"]:
+                if not tracker.get("domain"):
+                    continue
+                domain = tracker["domain"]
+                clean_domain = domain.split(':')[0] if ':' in domain else domain
+                if self.is_cloudflare_domain(clean_domain):
+                    tracker["ip"] = best_ip
+                    filtered_trackers.append(tracker)
+                else:
+                    non_cf_domains.append(domain)
+            if len(filtered_trackers) < original_count:
+                self.config["trackers"] = filtered_trackers
+                logger.info(f"[IP优选] 过滤了 {original_count - len(filtered_trackers)} 个非Cloudflare站点: {', '.join(non_cf_domains)}")
+            logger.info(f"已将 {len(filtered_trackers)} 个Cloudflare站点Tracker的IP更新为 {best_ip}")
+            if self.ip_selector.enable and len(self.cfst_candidates) > 1:
+                self._assign_per_tracker_ips(filtered_trackers)
+        # 仅合并写 trackers（以及可能的 cloudflare_domains 后续有需要可一并传入）
         self._merge_write_config({"trackers": self.config.get("trackers", [])})
-            
-        # 同步更新全局config对象，确保前端API获取到最新数据
+        self.update_config(self.config)
         try:
-            import app.main
-            app.main.config = self.config
+            _sync_global_config(self.config)
             logger.info("已同步更新全局config对象，确保前端获取到最新数据")
         except Exception as e:
             logger.error(f"更新全局config对象失败: {str(e)}")
-        
-        # 更新所有tracker的IP
-        self._update_all_trackers_ip(ip)
-        
-        # 更新hosts
-        self.update_hosts()
-    
-    def _update_all_trackers_ip(self, ip: str):
-        """更新所有tracker的IP为最优IP"""
-        if not self.config.get("trackers"):
+        return filtered_trackers
+
+    def _assign_per_tracker_ips(self, trackers: List[Dict[str, Any]]):
+        """在候选IP中为每个启用的Tracker分别选择最优IP（探测全部失败的Tracker保持全局最优IP）"""
+        domains = [t["domain"] for t in trackers if t.get("enable") and t.get("domain")]
+        best = self.ip_selector.select(domains, self.cfst_candidates)
+        changed = 0
+        for tracker in trackers:
+            result = best.get(tracker.get("domain"))
+            if result:
+                tracker["ip"] = result[0]
+                if result[0] != self.best_cloudflare_ip:
+                    changed += 1
+                logger.info(f"[按Tracker优选] {tracker['domain']} -> {result[0]} ({result[1]:.0f}ms)")
+        logger.info(f"[按Tracker优选] {changed} 个Tracker使用了不同于全局最优IP的IP")
+
+    def replace_tracker_ips(self, mapping: Dict[str, str]) -> bool:
+        """
+        故障切换：将使用旧IP的Tracker切换到新IP，只写一次配置并只重写PT站点分区，
+        不重新获取hosts源。
+
+        Args:
+            mapping: {旧IP: 新IP}
+        """
+        if self.task_running:
+            logger.warning("已有hosts更新任务在运行，跳过本次IP切换")
+            return False
+        self.task_running = True
+        try:
+            changed = 0
+            for tracker in self.config.get("trackers", []) or []:
+                new_ip = mapping.get(tracker.get("ip"))
+                if new_ip:
+                    tracker["ip"] = new_ip
+                    changed += 1
+            if self.best_cloudflare_ip in mapping:
+                self.best_cloudflare_ip = mapping[self.best_cloudflare_ip]
+            self._merge_write_config({"trackers": self.config.get("trackers", [])})
+            self.update_config(self.config)
+            self._replace_pt_section(self._collect_pt_entries())
+            logger.info(f"[IP故障切换] {', '.join(f'{old} -> {new}' for old, new in mapping.items())}，更新 {changed} 个Tracker")
+            return True
+        except Exception as e:
+            logger.error(f"IP故障切换失败: {str(e)}", exc_info=True)
+            return False
+        finally:
+            self.task_running = False
+
+    def _section_marks(self, section: str, count: int) -> Tuple[str, str]:
+        if section == SECTION_PT:
+            return self.pt_start_mark, self.pt_end_mark % count
+        return self.source_start_mark % "MergedHosts", self.source_end_mark % ("MergedHosts", count)
+
+    def _replace_pt_section(self, pt_entries: List[str]):
+        """只替换hosts文件中的PT站点分区，其他分区保持不变"""
+        self._replace_section(SECTION_PT, pt_entries)
+
+    def _replace_merged_section(self, merged_entries: List[str]):
+        """只替换hosts文件中的MergedHosts分区，PT站点分区保持不变"""
+        self._replace_section(SECTION_MERGED, merged_entries)
+
+    def _replace_section(self, section: str, entries: List[str]):
+        """
+        只替换一个分区，其他分区保持不变：PT站点分区不存在时插入到项目分区开头，
+        MergedHosts分区不存在时追加到项目分区末尾（条目为空时移除该分区）；
+        hosts文件中没有项目分区时按内存中的各分区整体写入。
+        """
+        if section == SECTION_PT:
+            self._publish_sections(pt_entries=entries)
+        else:
+            self._publish_sections(merged_entries=entries)
+        if not self._hosts_file_enabled():
             return
-        
-        for tracker in self.config["trackers"]:
-            if tracker.get("enable"):
-                tracker["ip"] = ip
-                logger.info(f"更新tracker {tracker.get('domain')} 的IP为 {ip}")
-        
-        # 保存配置
-        with open("config/config.yaml", 'w', encoding='utf-8') as f:
-            yaml.dump(self.config, f, default_flow_style=False, allow_unicode=True)
-            
-        # 同步更新全局config对象，确保前端API获取到最新数据
+        start_mark, end_mark = self._section_marks(section, len(entries))
+        end_prefix = end_mark.split("(")[0]
+        new_section = ""
+        if entries or section == SECTION_PT:
+            new_section = start_mark + "\n" + "".join(entry + "\n" for entry in entries) + end_mark + "\n"
+        with self._hosts_file_lock:
+            with open(self._get_hosts_path(), 'r') as f:
+                content = f.read()
+            start_pos = content.find(start_mark)
+            end_pos = content.find(end_prefix, start_pos) if start_pos != -1 else -1
+            if start_pos != -1 and end_pos != -1:
+                line_end = content.find("\n", end_pos)
+                line_end = len(content) if line_end == -1 else line_end + 1
+                content = content[:start_pos] + new_section + content[line_end:]
+            elif self.start_mark in content and self.end_mark in content:
+                if section == SECTION_PT:
+                    insert_pos = content.find(self.start_mark) + len(self.start_mark) + 1
+                else:
+                    insert_pos = content.find(self.end_mark)
+                content = content[:insert_pos] + new_section + content[insert_pos:]
+            else:
+                # hosts文件中没有项目分区时整体写入，另一分区沿用内存中的最新结果
+                pt_entries, merged_entries = self.published_sections()
+                sections = [(self.pt_start_mark, pt_entries, self.pt_end_mark % len(pt_entries))]
+                if merged_entries:
+                    merged_start, merged_end = self._section_marks(SECTION_MERGED, len(merged_entries))
+                    sections.append((merged_start, merged_entries, merged_end))
+                self._update_system_hosts_with_sections(sections)
+                return
+            self._write_hosts_file(content)
+
+    def apply_snapshot(self, pt_entries: List[str], merged_entries: List[str]):
+        """集群agent：直接写入hub下发的条目，不拉取hosts源、不检测IP"""
+        sections = [(self.pt_start_mark, pt_entries, self.pt_end_mark % len(pt_entries))]
+        if merged_entries:
+            sections.append((self.source_start_mark % "MergedHosts", merged_entries, self.source_end_mark % ("MergedHosts", len(merged_entries))))
+        self._update_system_hosts_with_sections(sections)
+        logger.info(f"已应用集群快照：PT站点 {len(pt_entries)} 条，hosts源 {len(merged_entries)} 条")
+
+    def _apply_pt_phase(self) -> List[str]:
+        """第一阶段：最优IP确定后立即生成并写入PT站点分区（只替换该分区，不等待hosts源）"""
+        start_time = time.time()
+        self.task_status = {"status": "running", "message": "正在更新PT站点分区"}
+        pt_entries = self._collect_pt_entries()
+        self._replace_pt_section(pt_entries)
+        logger.info(f"PT站点分区已更新，共 {len(pt_entries)} 条，耗时 {time.time() - start_time:.3f} 秒")
+        return pt_entries
+
+    def _apply_merged_phase(self) -> List[str]:
+        """第二阶段：拉取hosts源并检测IP，只替换MergedHosts分区（PT站点分区已在第一阶段写入）"""
+        merged_entries, merged_dict, log_lines = self._collect_merged_entries()
+        self.task_status = {"status": "running", "message": "正在更新MergedHosts分区"}
+        logger.info("开始更新MergedHosts分区")
+        update_start = time.time()
+        self._replace_merged_section(merged_entries)
+        logger.info(f"更新MergedHosts分区完成，耗时 {time.time() - update_start:.2f} 秒")
+        self._log_selection_summary(log_lines)
+        self._save_merged_hosts_backup(merged_dict)
+        return merged_entries
+
+    def run_cfst(self, script_path: str = None) -> bool:
+        """执行Cloudflare优选，更新Tracker IP并立即写入PT站点分区；不刷新hosts源（由调度器的依赖任务负责刷新MergedHosts分区）"""
+        if self._skip_on_cluster_agent("Cloudflare优选"):
+            return False
+        if self.task_running:
+            logger.warning("已有hosts更新任务在运行，阻止Cloudflare优选任务执行，避免冲突")
+            return False
+        self.task_running = True
+        self.task_status = {"status": "running", "message": "正在执行Cloudflare优选IP任务"}
         try:
-            import app.main
-            app.main.config = self.config
-            logger.info("已同步更新全局config对象，确保前端获取到最新数据")
+            best_ip = self._run_cfst_script(script_path)
+            if not best_ip:
+                return False
+            filtered_trackers = self._apply_best_ip(best_ip)
+            self._apply_pt_phase()
+            self.task_status = {"status": "done", "message": f"Cloudflare优选完成！IP: {best_ip}，已更新 {len(filtered_trackers)} 个Tracker"}
+            return True
         except Exception as e:
-            logger.error(f"更新全局config对象失败: {str(e)}")
-    
+            error_msg = f"Cloudflare优选失败: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            self.task_status = {"status": "done", "message": error_msg}
+            return False
+        finally:
+            self.task_running = False
+
     def run_cfst_and_update_hosts(self, script_path: str = None):
+        if self._skip_on_cluster_agent("Cloudflare优选与hosts更新"):
+            return False
         if self.task_running:
             logger.warning("已有hosts更新任务在运行，阻止Cloudflare优选任务执行，避免冲突")
             return False
         self.task_running = True
         self.task_status = {"status": "running", "message": "正在执行Cloudflare优选IP任务"}
         try:
-            # 架构自适应：未显式传入时按平台自动选择脚本
-            if not script_path:
-                machine = platform.machine().lower()
-                if machine in ("aarch64", "arm64"):
-                    script_path = "cfst_linux_arm64/cfst_hosts.sh"
-                else:
-                    script_path = "cfst_linux_amd64/cfst_hosts.sh"
             logger.info("开始执行严格串行的优选IP+更新tracker+更新hosts流程")
-            best_ip = None
-            if os.path.exists(script_path):
-                self.task_status = {"status": "running", "message": "正在运行Cloudflare优选脚本"}
-                result = subprocess.run(["bash", script_path], capture_output=True, text=True)
-                if result.returncode == 0:
-                    logger.info(f"脚本执行成功: {result.stdout}")
-                    for line in result.stdout.splitlines():
-                        if "找到最优IP" in line or "新 IP 为" in line:
-                            if "新 IP 为" in line:
-                                parts = line.split("新 IP 为")
-                                if len(parts) > 1:
-                                    best_ip = parts[1].strip()
-                                    break
-                            else:
-                                parts = line.split()
-                                for i, part in enumerate(parts):
-                                    if part == "最优IP:" or part == "IP:":
-                                        best_ip = parts[i+1].strip().rstrip(',')
-                                        break
-            else:
-                logger.error(f"脚本文件不存在: {script_path}")
-                self.task_status = {"status": "done", "message": f"优选失败: 脚本文件不存在: {script_path}"}
-                self.task_running = False
-                return False
+            best_ip = self._run_cfst_script(script_path)
             if not best_ip:
-                logger.error("未能从脚本输出中提取到最优IP，流程中止")
-                self.task_status = {"status": "done", "message": "优选失败: 未能提取到最优IP"}
                 self.task_running = False
                 return False
-            self.best_cloudflare_ip = best_ip
-            logger.info(f"串行流程提取到最优IP: {best_ip}")
-            filtered_trackers = []  # 确保后续统计时变量已定义
-            if self.config.get("trackers"):
-                original_count = len(self.config["trackers"])
-                non_cf_domains = []
-                for tracker in self.config["trackers"]:
-                    if not tracker.get("domain"):
-                        continue
-                    domain = tracker["domain"]
-                    clean_domain = domain.split(':')[0] if ':' in domain else domain
-                    if self.is_cloudflare_domain(clean_domain):
-                        tracker["ip"] = best_ip
-                        filtered_trackers.append(tracker)
-                    else:
-                        non_cf_domains.append(domain)
-                if len(filtered_trackers) < original_count:
-                    self.config["trackers"] = filtered_trackers
-                    logger.info(f"[IP优选] 过滤了 {original_count - len(filtered_trackers)} 个非Cloudflare站点: {', '.join(non_cf_domains)}")
-                logger.info(f"已将 {len(filtered_trackers)} 个Cloudflare站点Tracker的IP更新为 {best_ip}")
-            config_path = "config/config.yaml"
-            # 仅合并写 trackers（以及可能的 cloudflare_domains 后续有需要可一并传入）
-            self._merge_write_config({"trackers": self.config.get("trackers", [])})
-            self.update_config(self.config)
-            try:
-                import app.main
-                app.main.config = self.config
-                logger.info("已同步更新全局config对象，确保前端获取到最新数据")
-            except Exception as e:
-                logger.error(f"更新全局config对象失败: {str(e)}")
-            # 严格串行流程下的合并与兜底
-            ip_latency_cache = {}
-            start_time = time.time()
-            logger.info("开始处理PT站点条目")
-            self.task_status = {"status": "running", "message": "正在处理PT站点条目"}
-            pt_entries = self._collect_pt_entries()
-            logger.info(f"处理PT站点条目完成，共 {len(pt_entries)} 条，耗时 {time.time() - start_time:.2f} 秒")
-            sections = []
-            if pt_entries:
-                sections.append((self.pt_start_mark, pt_entries, self.pt_end_mark % len(pt_entries)))
-            domain_ip_candidates = {}
-            tracker_domains = set()
-            disabled_domains = self._get_disabled_tracker_domains()  # 新增：获取所有禁用tracker域名
-            if self.config.get("trackers"):
-                for tracker in self.config["trackers"]:
-                    if tracker.get("enable") and tracker.get("domain"):
-                        tracker_domains.add(tracker["domain"])
-            merged_hosts_backup = self._load_merged_hosts_backup()
-            backup_domains = set(merged_hosts_backup.keys())
-            current_domains = set()
-            abnormal_sources = set()
-            if self.config.get("hosts_sources"):
-                total_sources = len([s for s in self.config["hosts_sources"] if s.get("enable") and s.get("url") and s.get("name")])
-                logger.info(f"开始处理 {total_sources} 个外部hosts源")
-                for i, source in enumerate(self.config["hosts_sources"]):
-                    if source.get("enable") and source.get("url") and source.get("name"):
-                        source_name = source.get("name", "未命名源")
-                        self.task_status = {"status": "running", "message": f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}"}
-                        source_start_time = time.time()
-                        logger.info(f"正在处理hosts源 ({i+1}/{total_sources}): {source_name}")
-                        source_entries = self._fetch_hosts_source(source["url"])
-                        logger.info(f"获取hosts源 {source_name} 完成，返回 {len(source_entries)} 条记录，耗时 {time.time() - source_start_time:.2f} 秒")
-                        if len(source_entries) < 5:
-                            abnormal_sources.add(source_name)
-                        entry_process_start = time.time()
-                        entry_count = 0
-                        for ip, domain in source_entries:
-                            # 新增：跳过禁用tracker域名
-                            if domain in tracker_domains or domain.strip().lower() in disabled_domains:
-                                continue
-                            domain_ip_candidates.setdefault(domain, set()).add(ip)
-                            current_domains.add(domain)
-                            entry_count += 1
-                        logger.info(f"处理hosts源 {source_name} 的 {entry_count} 条记录完成，耗时 {time.time() - entry_process_start:.2f} 秒")
-                for domain, ip in self.domain_ip_history.items():
-                    # 新增：跳过禁用tracker域名
-                    if domain in tracker_domains or domain.strip().lower() in disabled_domains:
-                        continue
-                    domain_ip_candidates.setdefault(domain, set()).add(ip)
-                    current_domains.add(domain)
-            lost_domains = backup_domains - current_domains
-            for lost_domain in lost_domains:
-                lost_ip = merged_hosts_backup[lost_domain]
-                if self._dns_check(lost_domain, lost_ip):
-                    domain_ip_candidates.setdefault(lost_domain, set()).add(lost_ip)
-                    logger.warning(f"[兜底保留] 域名 {lost_domain} 本次未被任何源收录，但DNS检测有效，保留上次IP: {lost_ip}")
-                else:
-                    logger.warning(f"[兜底丢弃] 域名 {lost_domain} 本次未被任何源收录，且DNS检测无效，丢弃上次IP: {lost_ip}")
-            domain_ip_latency = {}
-            log_lines = []
-            merged_dict = {}
-            for domain, ip_set in domain_ip_candidates.items():
-                if is_blacklisted(domain):
-                    continue
-                best_ip = None
-                best_latency = None
-                ip_results = []
-                for ip in ip_set:
-                    latency = self._ping_ip(ip, cache=ip_latency_cache, domain=domain)
-                    ip_results.append((ip, latency))
-                    if latency is not None and (best_latency is None or latency < best_latency):
-                        best_ip = ip
-                        best_latency = latency
-                if best_ip:
-                    domain_ip_latency[domain] = (best_ip, best_latency)
-                    merged_dict[domain] = best_ip
-                    log_lines.append(f"域名 {domain} 选用IP: {best_ip}，延迟: {best_latency:.2f} ms")
-                else:
-                    ip = next(iter(ip_set))
-                    domain_ip_latency[domain] = (ip, 999.0)
-                    merged_dict[domain] = ip
-                    log_lines.append(f"域名 {domain} 所有IP不可达，兜底选用: {ip}")
-                
-            # 批量处理完所有域名后，一次性生成最终hosts条目
-            self.task_status = {"status": "running", "message": "正在生成最终hosts条目"}
-            logger.info("生成合并后的最终hosts条目")
-            merged_entries = [f"{ip}\t{domain}" for domain, (ip, _) in domain_ip_latency.items()]
-            if merged_entries:
-                sections.append((self.source_start_mark % "MergedHosts", merged_entries, self.source_end_mark % ("MergedHosts", len(merged_entries))))
-                
-            self.task_status = {"status": "running", "message": "正在更新系统hosts文件"}
-            logger.info("开始更新系统hosts文件")
-            update_start = time.time()
-            self._update_system_hosts_with_sections(sections)
-            logger.info(f"更新系统hosts文件完成，耗时 {time.time() - update_start:.2f} 秒")
-            total_entries = sum(len(entries) for _, entries, _ in sections)
-            logger.info(f"成功更新hosts文件，添加了{total_entries}条记录，共{len(sections)}个分区")
-            logger.info("=== 域名优选IP结果汇总 ===")
-            for line in log_lines:
-                logger.info(line)
-            self._save_merged_hosts_backup(merged_dict)
+            filtered_trackers = self._apply_best_ip(best_ip)
+            # 第一阶段：新IP立即写入PT站点分区，Tracker无需等待hosts源拉取与IP检测
+            pt_entries = self._apply_pt_phase()
+            # 第二阶段：拉取hosts源、检测IP，只刷新MergedHosts分区
+            merged_entries = self._apply_merged_phase()
+            total_entries = len(pt_entries) + len(merged_entries)
+            logger.info(f"成功更新hosts文件，PT站点 {len(pt_entries)} 条，MergedHosts {len(merged_entries)} 条")
             self.task_status = {"status": "done", "message": f"Cloudflare优选完成！IP: {best_ip}，已更新 {len(filtered_trackers) if isinstance(filtered_trackers, list) else 0} 个Tracker和 {total_entries} 条hosts记录"}
             self.task_running = False
             logger.info("已完成hosts文件更新")
@@ -807,6 +1171,55 @@ class HostsManager:
             self.task_running = False
             return False
 
+    def import_tracker_domains(self, domains: List[str]) -> Dict[str, Any]:
+        """
+        导入下载器中的Tracker域名：清洗、检测Cloudflare，仅将新的Cloudflare站点加入配置并合并写回。
+
+        Returns:
+            cf_domains: 检测为Cloudflare的域名
+            non_cf_domains: 非Cloudflare域名（已过滤）
+            added: 本次新增的Tracker域名
+        """
+        existing_domains = {tracker['domain'] for tracker in self.config.get('trackers', []) if tracker.get('domain')}
+        default_ip = self.default_tracker_ip()
+        cf_domains = []
+        non_cf_domains = []
+        added = []
+
+        # 临时调整日志级别为DEBUG，以便查看详细的Cloudflare检测日志
+        original_level = logger.level
+        logger.setLevel(logging.DEBUG)
+        try:
+            for domain in domains:
+                # 清洗tracker域名，移除http前缀和路径
+                domain = re.sub(r"^https?://", "", domain, flags=re.IGNORECASE).split("/")[0]
+                # 提取纯域名（移除端口号）用于Cloudflare检测
+                clean_domain = domain.split(':')[0] if ':' in domain else domain
+
+                logger.info(f"[Cloudflare检测] 正在检测下载器导入的域名: {clean_domain}")
+                if self.is_cloudflare_domain(clean_domain):
+                    cf_domains.append(domain)
+                    if domain not in existing_domains:
+                        self.config.setdefault('trackers', []).append({
+                            "name": domain,
+                            "domain": domain,
+                            "enable": True,
+                            "ip": default_ip
+                        })
+                        existing_domains.add(domain)
+                        added.append(domain)
+                else:
+                    logger.info(f"[Cloudflare检测] 域名 {clean_domain} 不是Cloudflare域名，已跳过")
+                    non_cf_domains.append(domain)
+        finally:
+            # 恢复原有日志级别
+            logger.setLevel(original_level)
+
+        if added:
+            self._merge_write_config({"trackers": self.config.get("trackers", [])})
+            logger.info(f"已更新配置文件，添加了 {len(added)} 个新的Tracker")
+        return {"cf_domains": cf_domains, "non_cf_domains": non_cf_domains, "added": added}
+
     def get_task_status(self):
         """获取当前任务状态"""
         return self.task_status
@@ -823,7 +1236,7 @@ class HostsManager:
         domain = re.sub(r'/.*$', '', domain)  # 移除路径
         domain = re.sub(r':\d+$', '', domain)  # 移除端口号
         
-        # 检查缓存中是否已有结果
+        # 检查缓存中是否已有结果（先查域名本身，再查所属站点zone）
         current_time = time.time()
         if domain in self.cloudflare_cache:
             cache_time, is_cf = self.cloudflare_cache[domain]
@@ -831,6 +1244,12 @@ class HostsManager:
             if current_time - cache_time < self.cache_expiry:
                 logger.debug(f"[Cloudflare检测] 域名 {domain} 使用缓存结果: {is_cf}")
                 return is_cf
+        main_domain = self._get_main_domain(domain)
+        if main_domain in self.cloudflare_zone_cache:
+            cache_time, is_cf = self.cloudflare_zone_cache[main_domain]
+            if current_time - cache_time < self.cache_expiry:
+                logger.debug(f"[Cloudflare检测] 域名 {domain} 使用站点 {main_domain} 的缓存结果: {is_cf}")
+                return is_cf
         
         logger.info(f"[Cloudflare检测] 开始检测域名: {domain}")
         
@@ -848,7 +1267,6 @@ class HostsManager:
             return True
         
         # 2. 检查主域名
-        main_domain = self._get_main_domain(domain)
         if main_domain in self.cf_domains:
             logger.info(f"[Cloudflare检测] 域名 {domain} 的主域名 {main_domain} 在Cloudflare域名白名单中")
             self._cache_cloudflare_result(domain, True)
@@ -918,44 +1336,39 @@ class HostsManager:
         return False
     
     def _cache_cloudflare_result(self, domain, is_cloudflare):
-        """缓存Cloudflare检测结果"""
-        self.cloudflare_cache[domain] = (time.time(), is_cloudflare)
+        """
+        缓存Cloudflare检测结果。只有确认使用Cloudflare的结果记录到所属站点zone供其它子域名复用：
+        站点内个别子域名（如CNAME到其它服务的静态资源域名）不走Cloudflare时，不影响同站点其它子域名的检测。
+        """
+        now = time.time()
+        self.cloudflare_cache[domain] = (now, is_cloudflare)
+        if is_cloudflare:
+            self.cloudflare_zone_cache[self._get_main_domain(domain)] = (now, True)
         # 清理过期缓存
-        if len(self.cloudflare_cache) > 1000:  # 防止缓存过大
+        if len(self.cloudflare_cache) > 1000 or len(self.cloudflare_zone_cache) > 1000:  # 防止缓存过大
             self._clean_expired_cache()
     
     def _clean_expired_cache(self):
         """清理过期的缓存项"""
         current_time = time.time()
-        expired_keys = [
-            k for k, (timestamp, _) in self.cloudflare_cache.items() 
-            if current_time - timestamp > self.cache_expiry
-        ]
-        for key in expired_keys:
-            del self.cloudflare_cache[key]
+        for cache in (self.cloudflare_cache, self.cloudflare_zone_cache):
+            expired_keys = [
+                k for k, (timestamp, _) in cache.items() 
+                if current_time - timestamp > self.cache_expiry
+            ]
+            for key in expired_keys:
+                del cache[key]
     
     def _get_main_domain(self, domain: str) -> str:
-        """获取域名的主域名部分"""
-        parts = domain.split('.')
-        if len(parts) <= 2:
-            return domain
-        
-        # 检查是否为国家/地区代码域名（如 .co.uk, .com.cn）
-        country_tlds = {'uk', 'au', 'jp', 'cn', 'br', 'mx', 'ru', 'eu', 'de', 'fr', 'it', 'nl', 'sg', 'kr'}
-        if len(parts) >= 3 and parts[-2] in country_tlds:
-            return '.'.join(parts[-3:])
-        
-        return '.'.join(parts[-2:])
+        """获取域名的可注册域名（按公共后缀列表计算，如 tracker.example.co.jp -> example.co.jp）"""
+        return registrable_domain(domain) or domain
     
     def _check_cloudflare_by_cname(self, domain: str) -> bool:
         """通过CNAME记录检查是否使用Cloudflare"""
         try:
             import dns.resolver
             try:
-                # 配置解析器
-                resolver = dns.resolver.Resolver(configure=True)
-                resolver.timeout = 2.0
-                resolver.lifetime = 2.0
+                resolver = _get_system_resolver()
                 
                 # 查询CNAME记录
                 answers = resolver.resolve(domain, 'CNAME')
@@ -1080,58 +1493,13 @@ class HostsManager:
             return False
             
         try:
-            # 检查常见的Cloudflare IP范围
-            cf_ip_ranges = [
-                # IPv4范围 (部分)
-                '103.21.244.0/22', '103.22.200.0/22', '103.31.4.0/22', '104.16.0.0/13', 
-                '104.24.0.0/14', '108.162.192.0/18', '131.0.72.0/22', '141.101.64.0/18', 
-                '162.158.0.0/15', '172.64.0.0/13', '173.245.48.0/20', '188.114.96.0/20', 
-                '190.93.240.0/20', '197.234.240.0/22', '198.41.128.0/17',
-                
-                # IPv6范围 (部分)
-                '2400:cb00::/32', '2405:8100::/32', '2405:b500::/32', '2606:4700::/32', 
-                '2803:f800::/32', '2c0f:f248::/32', '2a06:98c0::/29'
-            ]
-            
-            # 获取版本信息
-            family = socket.AF_INET if '.' in ip else socket.AF_INET6
-            
-            # 转换IP为网络字节序
-            ip_packed = socket.inet_pton(family, ip)
-            
-            try:
-                import ipaddress
-                ip_obj = ipaddress.ip_address(ip)
-                
-                for ip_range in cf_ip_ranges:
-                    try:
-                        if ip_obj in ipaddress.ip_network(ip_range):
-                            logger.debug(f"[Cloudflare检测] IP {ip} 属于Cloudflare IP范围 {ip_range}")
-                            return True
-                    except ValueError as e:
-                        logger.debug(f"[Cloudflare检测] 检查IP范围出错: {ip_range}, 错误: {str(e)}")
-                        continue
-                
-                # 未匹配到任何范围
-                logger.debug(f"[Cloudflare检测] IP {ip} 不在任何已知的Cloudflare IP范围内")
-                
-            except ImportError:
-                logger.debug("[Cloudflare检测] ipaddress模块不可用，使用基本检查")
-                
-                # 如果ipaddress模块不可用，至少检查一些常见的范围
-                cf_prefixes = [
-                    '104.16.', '104.17.', '104.18.', '104.19.', '104.20.', '104.21.', '104.22.', '104.23.',
-                    '172.64.', '172.65.', '172.66.', '172.67.', '172.68.', '172.69.', '172.70.',
-                    '162.158.', '198.41.', '103.21.244.', '103.22.200.'
-                ]
-                
-                for prefix in cf_prefixes:
-                    if ip.startswith(prefix):
-                        logger.debug(f"[Cloudflare检测] IP {ip} 匹配Cloudflare前缀 {prefix}")
-                        return True
-                
-                logger.debug(f"[Cloudflare检测] IP {ip} 不匹配任何已知的Cloudflare前缀")
-                
+            ip_obj = ipaddress.ip_address(ip)
+            for network in CLOUDFLARE_NETWORKS:
+                if ip_obj in network:
+                    logger.debug(f"[Cloudflare检测] IP {ip} 属于Cloudflare IP范围 {network}")
+                    return True
+            # 未匹配到任何范围
+            logger.debug(f"[Cloudflare检测] IP {ip} 不在任何已知的Cloudflare IP范围内")
         except Exception as e:
             logger.debug(f"[Cloudflare检测] IP检查异常: {str(e)}")
         
@@ -1241,9 +1609,7 @@ class HostsManager:
             # 如果有dns.resolver模块，尝试使用它获取更完整的结果
             try:
                 import dns.resolver
-                resolver = dns.resolver.Resolver(configure=True)
-                resolver.timeout = 2.0
-                resolver.lifetime = 2.0
+                resolver = _get_system_resolver()
                 answers = resolver.resolve(domain, 'A')
                 for rdata in answers:
                     ip = str(rdata)
@@ -1279,9 +1645,7 @@ class HostsManager:
             # 检查域名NS记录是否指向Cloudflare
             try:
                 import dns.resolver
-                resolver = dns.resolver.Resolver(configure=True)
-                resolver.timeout = 2.0
-                resolver.lifetime = 2.0
+                resolver = _get_system_resolver()
                 
                 # 先检查顶级域名的NS记录
                 try:
@@ -1438,6 +1802,8 @@ class HostsManager:
         return {}
 
     def _save_merged_hosts_backup(self, merged_dict):
+        if self.dry_run:
+            return
         backup_path = os.path.join("config", "merged_hosts_backup.json")
         try:
             with open(backup_path, "w", encoding="utf-8") as f:
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from app.utils.job_settings import coerce_settings
+
+logger = logging.getLogger(__name__)
+
+# 候选IP池持久化路径
+DEFAULT_POOL_PATH = os.path.join("config", "ip_pool.json")
+# 健康检查默认参数，可通过 scheduler.jobs.ip_failover 覆盖
+DEFAULT_HEALTH_CHECK_SETTINGS = {
+    "port": 443,        # 检查端口
+    "timeout": 2.0,     # 单次TCP连接超时（秒）
+    "attempts": 3,      # 每次检查的连接次数，任意一次成功即视为健康
+    "consecutive": 2,   # 连续失败次数达到该值才切换
+}
+
+
+class IPPool:
+    """
+    优选候选IP池：保存最近一次优选结果中排名前K的IP（按排名顺序），持久化到磁盘，
+    当前IP失效时可直接切换到下一个健康的IP，无需重新测速。
+    """
+
+    def __init__(self, path: str = DEFAULT_POOL_PATH):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self.updated_at: Optional[float] = None
+        # IP -> 最近一次健康检查失败的时间
+        self.failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data.get("entries", [])
+            self.updated_at = data.get("updated_at")
+            self.failed = data.get("failed", {})
+            logger.info(f"已加载候选IP池，共 {len(self.entries)} 个IP")
+        except Exception as e:
+            logger.warning(f"读取候选IP池失败: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries, "updated_at": self.updated_at, "failed": self.failed}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"写入候选IP池失败: {e}")
+
+    def update(self, entries: List[Dict[str, Any]]):
+        """
+        使用新的优选结果替换候选池。
+
+        Args:
+            entries: 按排名排序的结果，每项至少包含 ip，可选 latency（毫秒）与 speed（MB/s）
+        """
+        with self._lock:
+            seen = set()
+            self.entries = []
+            for entry in entries:
+                if entry.get("ip") and entry["ip"] not in seen:
+                    seen.add(entry["ip"])
+                    self.entries.append(dict(entry))
+            self.updated_at = time.time()
+            self.failed = {}
+            self.save()
+        logger.info(f"候选IP池已更新: {', '.join(self.ips())}")
+
+    def ips(self) -> List[str]:
+        return [entry["ip"] for entry in self.entries]
+
+    def mark_failed(self, ip: str):
+        with self._lock:
+            self.failed[ip] = time.time()
+            self.save()
+
+    def candidates(self, exclude: List[str] = None) -> List[str]:
+        """按排名返回可切换的IP：未失败的优先，其次为失败时间最早的"""
+        exclude = set(exclude or [])
+        ips = [ip for ip in self.ips() if ip not in exclude]
+        return sorted(ips, key=lambda ip: (ip in self.failed, self.failed.get(ip, 0)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"entries": self.entries, "updated_at": self.updated_at, "failed": self.failed}
+
+
+class PoolHealthChecker:
+    """
+    轻量健康检查：对Tracker当前使用的IP做TCP连接检查，连续失败时
+    将这些Tracker切换到候选池中下一个健康的IP，只重写PT站点分区。
+    """
+
+    def __init__(self, hosts_manager, pool: IPPool):
+        self.hosts_manager = hosts_manager
+        self.pool = pool
+        self.load_settings({})
+        # IP -> 连续失败次数
+        self.failure_count: Dict[str, int] = {}
+
+    def load_settings(self, spec: Dict[str, Any]):
+        """从任务配置中读取健康检查参数，无效取值回退默认值"""
+        settings = coerce_settings(spec, DEFAULT_HEALTH_CHECK_SETTINGS, "ip_failover")
+        self.port = settings["port"]
+        self.timeout = settings["timeout"]
+        self.attempts = max(1, settings["attempts"])
+        self.consecutive = max(1, settings["consecutive"])
+
+    def is_healthy(self, ip: str) -> bool:
+        """任意一次TCP连接成功即视为健康"""
+        for _ in range(self.attempts):
+            try:
+                with socket.create_connection((ip, self.port), timeout=self.timeout):
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def check(self) -> Dict[str, Any]:
+        """
+        检查Tracker当前使用的IP，必要时切换。
+
+        Returns:
+            rotated: {旧IP: 新IP}
+            unhealthy: 失败但未达到连续次数、或没有可用替换IP的IP列表
+        """
+        current_ips = []
+        for tracker in self.hosts_manager.config.get("trackers", []) or []:
+            ip = tracker.get("ip")
+            if tracker.get("enable") and ip and ip not in current_ips:
+                current_ips.append(ip)
+
+        rotated: Dict[str, str] = {}
+        unhealthy: List[str] = []
+        for ip in current_ips:
+            if self.is_healthy(ip):
+                self.failure_count.pop(ip, None)
+                continue
+            self.failure_count[ip] = self.failure_count.get(ip, 0) + 1
+            unhealthy.append(ip)
+            if self.failure_count[ip] < self.consecutive:
+                continue
+            self.pool.mark_failed(ip)
+            replacement = next((c for c in self.pool.candidates(exclude=[ip]) if self.is_healthy(c)), None)
+            if not replacement:
+                logger.warning(f"[IP故障切换] {ip} 不可用，但候选池中没有健康的IP")
+                continue
+            self.failure_count.pop(ip, None)
+            rotated[ip] = replacement
+            unhealthy.remove(ip)
+
+        if rotated:
+            self.hosts_manager.replace_tracker_ips(rotated)
+        return {"rotated": rotated, "unhealthy": unhealthy}
@@ -0,0 +1,71 @@
+import logging
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TrackerIPSelector:
+    """
+    按Tracker分别选择最优IP：对优选结果中的前K个IP，
+    以Tracker域名作为SNI完成TLS握手并发送HEAD请求，取耗时最短的IP。
+
+    不同PT站点可能使用不同的Cloudflare套餐与节点，同一个IP并不一定对所有站点都最快。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.update_config(config)
+
+    def update_config(self, config: Dict[str, Any]):
+        cloudflare_config = config.get("cloudflare", {}) or {}
+        self.enable = bool(cloudflare_config.get("per_tracker_ip", False))
+        self.top_k = max(1, int(cloudflare_config.get("top_k", 5)))
+        self.timeout = float(cloudflare_config.get("probe_timeout", 3))
+        self.workers = max(1, int(cloudflare_config.get("probe_workers", 16)))
+
+    def probe(self, domain: str, ip: str) -> Optional[float]:
+        """
+        通过指定IP访问域名：TCP连接 + TLS握手（SNI与证书校验使用域名）+ HEAD请求。
+
+        Returns:
+            总耗时（毫秒），失败（连接失败、证书不匹配、无HTTP响应）返回None
+        """
+        host, _, port = domain.partition(":")
+        port = int(port) if port.isdigit() else 443
+        context = ssl.create_default_context()
+        start = time.perf_counter()
+        try:
+            with socket.create_connection((ip, port), timeout=self.timeout) as sock:
+                with context.wrap_socket(sock, server_hostname=host) as tls:
+                    tls.sendall(
+                        f"HEAD / HTTP/1.1\r\nHost: {host}\r\nUser-Agent: PT-Accelerator\r\nConnection: close\r\n\r\n".encode()
+                    )
+                    if not tls.recv(16).startswith(b"HTTP/"):
+                        return None
+            return (time.perf_counter() - start) * 1000
+        except (OSError, ssl.SSLError):
+            return None
+
+    def select(self, domains: List[str], candidates: List[str]) -> Dict[str, Tuple[str, float]]:
+        """
+        并发探测所有 域名×候选IP 组合。
+
+        Returns:
+            域名 -> (最优IP, 耗时毫秒)，所有候选IP都不可用的域名不包含在结果中
+        """
+        candidates = candidates[:self.top_k]
+        pairs = [(domain, ip) for domain in domains for ip in candidates]
+        if not pairs:
+            return {}
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(pairs))) as executor:
+            latencies = list(executor.map(lambda pair: self.probe(*pair), pairs))
+        best: Dict[str, Tuple[str, float]] = {}
+        for (domain, ip), latency in zip(pairs, latencies):
+            if latency is not None and (domain not in best or latency < best[domain][1]):
+                best[domain] = (ip, latency)
+        logger.info(f"[按Tracker优选] 探测 {len(domains)} 个域名 × {len(candidates)} 个IP，成功 {len(best)} 个域名，耗时 {time.time() - start:.2f} 秒")
+        return best
@@ -0,0 +1,263 @@
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.utils import notify as notify_module
+
+logger = logging.getLogger(__name__)
+
+
+def _as_notify_config(payload, ignore_default_config: bool = False) -> notify_module.NotifyConfig:
+    """已构建的 NotifyConfig 直接复用（渠道选择与配置摘要只计算一次），其余按 payload 构建"""
+    if isinstance(payload, notify_module.NotifyConfig):
+        return payload
+    return notify_module.build_config(ignore_default_config, **payload)
+
+
+class NotifyDispatcher:
+    """异步通知分发服务：有界队列 + 工作线程池，任务完成时只入队，不等待推送结果"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self._queue: Optional[queue.Queue] = None
+        self._workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._load_settings()
+        # 任务通知聚合：重复抑制、摘要窗口与渠道限速
+        self.aggregator = NotifyAggregator(self)
+
+    def _load_settings(self):
+        """从 notify.dispatcher 读取分发参数"""
+        dispatcher_config = (self.config.get("notify", {}) or {}).get("dispatcher", {}) or {}
+        self.queue_size = int(dispatcher_config.get("queue_size", 100))
+        self.worker_count = max(1, int(dispatcher_config.get("workers", 2)))
+        self.channel_timeout = float(dispatcher_config.get("timeout", 20))
+        self.max_retries = max(0, int(dispatcher_config.get("retries", 2)))
+        self.retry_backoff = float(dispatcher_config.get("backoff", 2))
+
+    def update_config(self, config: Dict[str, Any]):
+        """更新配置（队列容量与工作线程数在下次 start 时生效）"""
+        self.config = config
+        self._load_settings()
+        self.aggregator.load_settings()
+
+    def start(self):
+        """启动工作线程"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._workers = []
+        for i in range(self.worker_count):
+            t = threading.Thread(target=self._worker_loop, name=f"notify-dispatcher-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+        logger.info(f"通知分发服务已启动，工作线程: {self.worker_count}，队列容量: {self.queue_size}")
+
+    def stop(self):
+        """停止工作线程（不等待队列中剩余的推送）"""
+        if not self.is_running():
+            return
+        self._stop_event.set()
+        self.aggregator.cancel()
+        for _ in self._workers:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        self._workers = []
+        logger.info("通知分发服务已停止")
+
+    def is_running(self) -> bool:
+        return any(t.is_alive() for t in self._workers)
+
+    def submit(self, title: str, content: str, payloads: List[Dict[str, Any]], ignore_default_config: bool = False) -> bool:
+        """
+        提交通知到队列，立即返回。每个渠道作为独立任务入队，由工作线程并行推送。
+
+        Args:
+            payloads: 每个渠道展开后的推送配置，或已构建好的 NotifyConfig（直接使用）
+            ignore_default_config: 仅使用 payload 中的配置（测试发送时使用）
+
+        Returns:
+            是否全部入队；队列已满时丢弃剩余渠道并返回False
+        """
+        if not payloads:
+            return False
+        if not self.is_running():
+            self.start()
+        for payload in payloads:
+            # 入队前构建不可变配置，工作线程之间互不影响
+            notify_config = _as_notify_config(payload, ignore_default_config)
+            try:
+                self._queue.put_nowait((title, content, notify_config))
+            except queue.Full:
+                logger.warning(f"通知队列已满（{self.queue_size}），丢弃通知: {title}")
+                return False
+        return True
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            job = self._queue.get()
+            try:
+                if job is None:
+                    break
+                self._deliver(*job)
+            except Exception as e:
+                logger.error(f"通知分发异常: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, title: str, content: str, notify_config: notify_module.NotifyConfig):
+        for attempt in range(self.max_retries + 1):
+            failed = notify_module.send(title, content, timeout=self.channel_timeout, config=notify_config)
+            if not failed:
+                return
+            if attempt < self.max_retries:
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"渠道 {', '.join(failed)} 推送失败，{delay:.0f}秒后重试（{attempt + 1}/{self.max_retries}）")
+                if self._stop_event.wait(delay):
+                    return
+            else:
+                logger.error(f"渠道 {', '.join(failed)} 推送失败，已达最大重试次数")
+
+
+# 默认渠道最小发送间隔（秒），这些渠道对频繁推送会限流甚至封禁
+DEFAULT_RATE_LIMITS = {
+    "telegram_bot": 30,
+    "wecom_bot": 30,
+    "wecom_app": 30,
+    "serverJ": 300,
+}
+
+
+class NotifyAggregator:
+    """
+    任务通知聚合器，位于分发服务之前：
+    - 同一任务的状态与上次相同时不再推送
+    - 非失败通知在摘要窗口内合并为一条发送
+    - 按渠道限制最小发送间隔，受限的通知并入该渠道下一条摘要
+    - 失败通知始终立即发送
+    """
+
+    def __init__(self, dispatcher: NotifyDispatcher):
+        self.dispatcher = dispatcher
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        # 任务标题 -> 上次状态
+        self.last_status: Dict[str, str] = {}
+        # 渠道名称 -> 上次发送时间
+        self.last_sent: Dict[str, float] = {}
+        # 配置版本 -> 待发送摘要 {"payload", "channels", "first_time", "entries"}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.load_settings()
+
+    def load_settings(self):
+        """从 notify.aggregate 读取聚合参数"""
+        aggregate_config = (self.dispatcher.config.get("notify", {}) or {}).get("aggregate", {}) or {}
+        self.enable = bool(aggregate_config.get("enable", True))
+        self.suppress_repeats = bool(aggregate_config.get("suppress_repeats", True))
+        self.digest_window = float(aggregate_config.get("digest_window", 0))
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(aggregate_config.get("rate_limits", {}) or {})
+
+    def notify(self, title: str, content: str, payloads: List[Dict[str, Any]], status_key: str = None, failed: bool = False):
+        """
+        提交一条任务结果通知。
+
+        Args:
+            status_key: 用于判断重复的状态文本（不含时间戳等易变内容），默认使用 content
+            failed: 是否为失败通知，失败通知跳过抑制、摘要与限速，立即发送
+        """
+        if not self.enable:
+            self.dispatcher.submit(title, content, payloads)
+            return
+        status_key = content if status_key is None else status_key
+        with self._lock:
+            if self.suppress_repeats and not failed and self.last_status.get(title) == status_key:
+                logger.info(f"[通知聚合] {title} 状态未变化，跳过推送")
+                return
+            self.last_status[title] = status_key
+
+            now = time.time()
+            immediate = []
+            for payload in payloads:
+                key, channels = self._channel_key(payload)
+                if failed or (self.digest_window <= 0 and key not in self.pending and self._wait_time(channels, now) <= 0):
+                    self._mark_sent(channels, now)
+                    immediate.append(payload)
+                    continue
+                entry = self.pending.setdefault(key, {
+                    "payload": payload, "channels": channels, "first_time": now, "entries": []
+                })
+                entry["payload"] = payload
+                entry["entries"].append((title, content))
+            self._schedule(now)
+
+        if immediate:
+            self.dispatcher.submit(title, content, immediate)
+
+    def cancel(self):
+        """取消待执行的摘要定时器"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _channel_key(self, payload: Dict[str, Any]) -> Tuple[str, List[str]]:
+        notify_config = _as_notify_config(payload)
+        channels = [func.__name__ for func in notify_module.add_notify_function(notify_config)]
+        return notify_config.version, channels
+
+    def _wait_time(self, channels: List[str], now: float) -> float:
+        """渠道距离下次允许发送的剩余秒数"""
+        wait = 0.0
+        for name in channels:
+            interval = float(self.rate_limits.get(name, 0) or 0)
+            last = self.last_sent.get(name)
+            if interval > 0 and last is not None:
+                wait = max(wait, last + interval - now)
+        return wait
+
+    def _mark_sent(self, channels: List[str], now: float):
+        for name in channels:
+            self.last_sent[name] = now
+
+    def _due_time(self, entry: Dict[str, Any], now: float) -> float:
+        return max(entry["first_time"] + self.digest_window, now + self._wait_time(entry["channels"], now))
+
+    def _schedule(self, now: float):
+        """按最早到期的摘要重新设置定时器（需持有锁）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return
+        delay = max(0.0, min(self._due_time(entry, now) for entry in self.pending.values()) - now)
+        self._timer = threading.Timer(delay, self._flush_due)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_due(self):
+        ready = []
+        with self._lock:
+            self._timer = None
+            now = time.time()
+            for key in list(self.pending.keys()):
+                entry = self.pending[key]
+                if self._due_time(entry, now) <= now:
+                    self._mark_sent(entry["channels"], now)
+                    ready.append(self.pending.pop(key))
+            self._schedule(now)
+        for entry in ready:
+            title, content = self._build_digest(entry["entries"])
+            self.dispatcher.submit(title, content, [entry["payload"]])
+
+    def _build_digest(self, entries: List[Tuple[str, str]]) -> Tuple[str, str]:
+        if len(entries) == 1:
+            return entries[0]
+        title = f"📋 任务通知汇总（{len(entries)}条）"
+        content = "\n\n".join(f"{t}\n{c}" for t, c in entries)
+        return title, content
@@ -1,25 +1,203 @@
 import logging
-from typing import Dict, Any
+import threading
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from app.services.cloudflare_speed_test import CloudflareSpeedTestService
-from app.services.hosts_manager import HostsManager
+from app.services.hosts_manager import HostsManager, _sync_global_config
+from app.services.ip_pool import DEFAULT_HEALTH_CHECK_SETTINGS, PoolHealthChecker
+from app.services.watchdog import DEFAULT_WATCHDOG_SETTINGS, NetworkWatchdog
+from app.utils.job_settings import coerce_settings
+from app.utils.sqlite_jobstore import SQLiteJobStore
+
+if TYPE_CHECKING:
+    # 测速服务在首次使用时才导入，这里仅用于类型标注
+    from app.services.cloudflare_speed_test import CloudflareSpeedTestService
 
 logger = logging.getLogger(__name__)
 
+# 默认的持久化任务存储路径（位于挂载的config目录，重启后保留下次执行时间）
+DEFAULT_JOB_STORE = "config/scheduler_jobs.db"
+
+# 各定时任务的默认配置，可通过 config.yaml 中 scheduler.jobs.<任务ID> 覆盖
+# - cron / interval_minutes: 触发方式（二选一，cron 优先）
+# - jitter: 随机延迟秒数，避免多实例同时请求相同资源
+# - misfire_grace_time: 错过触发时间后仍允许补执行的秒数（正整数；null 表示不限）
+# - after: 依赖规则，列出的任务执行成功后自动执行本任务（与本任务自身的定时是否启用无关）
+# - notify: 任务链结束后是否发送通知
+# - quiet: 仅在任务实际执行了操作（返回成功）时发送通知
+DEFAULT_JOBS = {
+    "cfst": {
+        "name": "Cloudflare优选IP",
+        "title": "IP优选与Hosts更新",
+        "enable": True,
+        "cron": "0 0 * * *",
+        "jitter": 0,
+        "misfire_grace_time": 3600,
+        "after": [],
+        "notify": True,
+    },
+    "hosts": {
+        "name": "Hosts源刷新",
+        "title": "仅更新Hosts",
+        "enable": False,
+        "interval_minutes": 30,
+        "jitter": 60,
+        "misfire_grace_time": 600,
+        "after": ["cfst", "tracker_import"],
+        "notify": False,
+    },
+    "tracker_import": {
+        "name": "下载器Tracker导入",
+        "title": "导入下载器Tracker",
+        "enable": False,
+        "cron": "0 */6 * * *",
+        "jitter": 60,
+        "misfire_grace_time": 3600,
+        "after": [],
+        "notify": False,
+    },
+    "watchdog": {
+        "name": "网络质量看门狗",
+        "title": "网络质量劣化自动优选",
+        "enable": False,
+        "interval_minutes": 10,
+        "jitter": 30,
+        "misfire_grace_time": 60,
+        "after": [],
+        # 仅在触发优选时发送通知
+        "notify": True,
+        "quiet": True,
+    },
+    "ip_failover": {
+        "name": "优选IP故障切换",
+        "title": "优选IP故障切换",
+        "enable": False,
+        "interval_minutes": 5,
+        "jitter": 15,
+        "misfire_grace_time": 60,
+        "after": [],
+        # 仅在发生切换时发送通知
+        "notify": True,
+        "quiet": True,
+    },
+}
+
+
+def build_job_specs(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """合并默认值与配置，生成各定时任务的最终配置"""
+    cloudflare_config = config.get("cloudflare", {}) or {}
+    jobs_config = (config.get("scheduler", {}) or {}).get("jobs", {}) or {}
+    # 集群agent只应用hub下发的快照，不在本机运行拉取、检测与优选任务
+    is_agent = str((config.get("cluster", {}) or {}).get("role", "")).lower() == "agent"
+    specs = {}
+    for job_id, defaults in DEFAULT_JOBS.items():
+        spec = dict(defaults)
+        if job_id == "cfst":
+            # 兼容原有配置：优选任务沿用 cloudflare.enable / cloudflare.cron
+            spec["enable"] = cloudflare_config.get("enable", True)
+            spec["cron"] = cloudflare_config.get("cron", spec["cron"])
+        override = jobs_config.get(job_id, {}) or {}
+        if "interval_minutes" in override and "cron" not in override:
+            spec.pop("cron", None)
+        spec.update(override)
+        after = spec.get("after") or []
+        spec["after"] = [after] if isinstance(after, str) else list(after)
+        if is_agent:
+            spec["enable"] = False
+        specs[job_id] = spec
+    return specs
+
+
+def run_scheduled_job(job_id: str):
+    """调度器入口（顶层函数，便于持久化任务存储按模块路径引用）"""
+    from app.globals import get_scheduler_service
+    scheduler_service = get_scheduler_service()
+    if scheduler_service is None:
+        logger.error(f"调度器服务未初始化，无法执行定时任务 {job_id}")
+        return
+    scheduler_service.run_job(job_id)
+
+
+def _misfire_grace_time(job_id: str, spec: Dict[str, Any]) -> Optional[int]:
+    """校验 misfire_grace_time：None 表示不限，正整数原样使用，其余取值报错"""
+    value = spec.get("misfire_grace_time")
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"任务 {job_id} 的 misfire_grace_time 必须为正整数或 null，当前为 {value!r}")
+    return value
+
+
+def _number(job_id: str, spec: Dict[str, Any], key: str, allow_zero: bool) -> float:
+    """读取数值型任务参数（允许数字字符串），非数字或超出范围时报错"""
+    value = spec.get(key)
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or number < 0 or (number == 0 and not allow_zero):
+        expected = "非负数" if allow_zero else "正数"
+        raise ValueError(f"任务 {job_id} 的 {key} 必须为{expected}，当前为 {value!r}")
+    return number
+
+
+def _build_trigger(job_id: str, spec: Dict[str, Any]):
+    """根据任务配置创建触发器（cron优先，其次interval_minutes），取值无效时报错"""
+    jitter = int(_number(job_id, spec, "jitter", allow_zero=True)) or None if spec.get("jitter") else None
+    if spec.get("cron"):
+        try:
+            trigger = CronTrigger.from_crontab(str(spec["cron"]))
+        except ValueError as e:
+            raise ValueError(f"任务 {job_id} 的CRON表达式无效: {e}")
+        trigger.jitter = jitter
+        return trigger
+    if spec.get("interval_minutes"):
+        return IntervalTrigger(minutes=_number(job_id, spec, "interval_minutes", allow_zero=False), jitter=jitter)
+    raise ValueError(f"任务 {job_id} 未配置 cron 或 interval_minutes")
+
+
+def validate_job_specs(config: Dict[str, Any]):
+    """
+    校验定时任务配置（包括未启用的任务），取值无效时抛出 ValueError。
+
+    在保存配置前调用，避免无效配置落盘后导致重启时调度器无法创建。
+    """
+    specs = build_job_specs(config)
+    for job_id, spec in specs.items():
+        _build_trigger(job_id, spec)
+        _misfire_grace_time(job_id, spec)
+    coerce_settings(specs["watchdog"], DEFAULT_WATCHDOG_SETTINGS, "watchdog", strict=True)
+    coerce_settings(specs["ip_failover"], DEFAULT_HEALTH_CHECK_SETTINGS, "ip_failover", strict=True)
+
+
+def _trigger_signature(trigger) -> tuple:
+    """触发器特征，用于判断任务是否需要重新调度"""
+    return type(trigger).__name__, str(trigger), getattr(trigger, "jitter", None)
+
+
 class SchedulerService:
     """调度器服务，用于定时执行任务"""
-    
-    def __init__(self, config: Dict[str, Any], cloudflare_service: CloudflareSpeedTestService, hosts_manager: HostsManager):
+
+    def __init__(self, config: Dict[str, Any], cloudflare_service: Optional["CloudflareSpeedTestService"], hosts_manager: HostsManager, torrent_client_manager=None):
         self.config = config
         self.cloudflare_service = cloudflare_service
         self.hosts_manager = hosts_manager
+        self.torrent_client_manager = torrent_client_manager
+        self.job_specs = build_job_specs(config)
+        self.watchdog = NetworkWatchdog(hosts_manager)
+        self.watchdog.load_settings(self.job_specs["watchdog"])
+        self.health_checker = PoolHealthChecker(hosts_manager, hosts_manager.ip_pool)
+        self.health_checker.load_settings(self.job_specs["ip_failover"])
+        # hosts相关任务共享同一条流水线，串行执行避免相互覆盖
+        self._pipeline_lock = threading.Lock()
         self.scheduler = None  # 初始化为None，在start时创建
-        self._create_scheduler()  # 创建新的调度器
         # 添加任务状态追踪
         self.task_status = {"status": "done", "message": "无任务"}
-    
+
     def _create_scheduler(self):
         """创建一个新的调度器实例"""
         # 防止残留
@@ -29,136 +207,229 @@ class SchedulerService:
             except Exception:
                 pass
             self.scheduler = None
-        self.scheduler = BackgroundScheduler()
-        self._setup_jobs()
-        logger.info("已创建新的调度器实例")
-    
+        job_store_path = (self.config.get("scheduler", {}) or {}).get("job_store", DEFAULT_JOB_STORE)
+        jobstores = {"default": SQLiteJobStore(job_store_path)} if job_store_path else {}
+        self.scheduler = BackgroundScheduler(
+            jobstores=jobstores,
+            job_defaults={"coalesce": True, "max_instances": 1}
+        )
+        logger.info(f"已创建新的调度器实例，任务存储: {job_store_path or '内存'}")
+
     def update_config(self, config: Dict[str, Any]):
-        """更新配置"""
+        """更新配置，通过 reschedule_job/modify_job 热更新任务，不重建调度器"""
         logger.info("更新调度器配置")
-        old_config = self.config
+        old_specs = self.job_specs
         self.config = config
-        
-        # 检查CRON是否变更
-        old_cron = old_config.get("cloudflare", {}).get("cron", "0 0 * * *")
-        new_cron = config.get("cloudflare", {}).get("cron", "0 0 * * *")
-        if old_cron != new_cron:
-            logger.info(f"CRON表达式已更新: {old_cron} -> {new_cron}")
-            
-            # 如果调度器正在运行，需要重启调度器
+        self.job_specs = build_job_specs(config)
+        self.watchdog.load_settings(self.job_specs["watchdog"])
+        self.health_checker.load_settings(self.job_specs["ip_failover"])
+
+        # 检查定时任务配置是否变更
+        if old_specs != self.job_specs:
+            logger.info("定时任务配置已更新")
             if self.is_running():
-                logger.info("由于CRON表达式变更，需要重启调度器")
-                self.stop()
-                self._create_scheduler()
-                self.start()
-            else:
-                # 调度器未运行，只需要更新任务配置
-                self._setup_jobs()
+                self._sync_jobs()
+            # 调度器未运行时，任务在下次 start 时同步
         else:
-            # CRON未变更，只需要更新配置
-            logger.info("CRON表达式未变更，无需重启调度器")
-    
-    def _setup_jobs(self):
-        """设置定时任务"""
+            logger.info("定时任务配置未变更，无需调整定时任务")
+
+    def _sync_jobs(self):
+        """
+        按当前配置同步定时任务：
+        - 触发器变化的任务使用 reschedule_job，其余属性变化使用 modify_job
+        - 未变化的任务保持不动，保留（持久化存储中的）下次执行时间
+        - 新启用的任务添加，已禁用或未知的任务删除
+        """
         if not self.scheduler:
             logger.error("调度器实例不存在，无法设置任务")
             return
-            
-        # 清除现有的所有任务
-        if self.scheduler.running:
-            logger.info("清除现有的所有定时任务")
-            self.scheduler.remove_all_jobs()
-        else:
-            logger.info("调度器未运行，不需要清除任务")
-        
-        # 添加合并后的定时任务（IP优选+更新hosts）
-        cloudflare_config = self.config.get("cloudflare", {})
-        if cloudflare_config.get("enable", True):
-            cron_expr = cloudflare_config.get("cron", "0 0 * * *")  # 默认每天0点执行
-            logger.info(f"准备添加定时任务，CRON表达式: {cron_expr}")
-            
+
+        existing = {job.id: job for job in self.scheduler.get_jobs()}
+        for job_id, spec in self.job_specs.items():
+            job = existing.pop(job_id, None)
+            if not spec.get("enable"):
+                if job is not None:
+                    self.scheduler.remove_job(job_id)
+                    logger.info(f"定时任务 {spec['name']} 已禁用，已移除")
+                else:
+                    logger.info(f"定时任务 {spec['name']} 未启用，不添加")
+                continue
             try:
-                # 创建一个组合任务函数
-                def combined_task():
-                    logger.info("开始执行组合任务：优选IP + 更新hosts源（严格串行）")
-                    # 更新任务状态
-                    self.task_status = {"status": "running", "message": "正在执行定时IP优选任务"}
-                    try:
-                        ok = self.hosts_manager.run_cfst_and_update_hosts()
-                        status = self.hosts_manager.get_task_status() if hasattr(self.hosts_manager, 'get_task_status') else {}
-                        msg = status.get('message') if isinstance(status, dict) else ("定时IP优选任务完成" if ok else "定时IP优选任务失败")
-                        self.task_status = {"status": "done", "message": msg}
-                        logger.info("组合任务完成：优选IP + 更新hosts源（严格串行）")
-                        
-                        # 发送定时任务完成通知
-                        try:
-                            from app.api.routes import _send_task_notify
-                            logger.info(f"[定时任务通知] IP优选与Hosts更新 -> {msg}")
-                            _send_task_notify("IP优选与Hosts更新", msg)
-                        except Exception as notify_e:
-                            logger.error(f"发送定时任务通知失败: {str(notify_e)}")
-                    except Exception as e:
-                        error_msg = f"定时任务失败: {str(e)}"
-                        self.task_status = {"status": "done", "message": error_msg}
-                        logger.error(f"执行定时任务失败: {str(e)}")
-                        
-                        # 发送定时任务失败通知
-                        try:
-                            from app.api.routes import _send_task_notify
-                            logger.info(f"[定时任务通知] IP优选与Hosts更新 -> {error_msg}")
-                            _send_task_notify("IP优选与Hosts更新", error_msg)
-                        except Exception as notify_e:
-                            logger.error(f"发送定时任务失败通知失败: {str(notify_e)}")
-                
-                self.scheduler.add_job(
-                    combined_task,
-                    CronTrigger.from_crontab(cron_expr),
-                    id="combined_cloudflare_and_hosts_task",
-                    name="IP优选与Hosts更新定时任务"
-                )
-                logger.info(f"已添加组合定时任务(IP优选与Hosts更新)，CRON表达式: {cron_expr}")
+                trigger = _build_trigger(job_id, spec)
+                job_options = {
+                    "func": run_scheduled_job,
+                    "args": (job_id,),
+                    "name": f"{spec['name']}定时任务",
+                    "misfire_grace_time": _misfire_grace_time(job_id, spec),
+                    "coalesce": True,
+                    "max_instances": 1,
+                }
+                if job is None:
+                    self.scheduler.add_job(id=job_id, trigger=trigger, **job_options)
+                    logger.info(f"已添加定时任务 {spec['name']}，触发器: {trigger}")
+                    continue
+                if _trigger_signature(job.trigger) != _trigger_signature(trigger):
+                    self.scheduler.reschedule_job(job_id, trigger=trigger)
+                    logger.info(f"已重新调度定时任务 {spec['name']}，触发器: {trigger}")
+                changes = {key: value for key, value in job_options.items() if getattr(job, key) != value}
+                if changes:
+                    self.scheduler.modify_job(job_id, **changes)
+                    logger.info(f"已更新定时任务 {spec['name']} 的属性: {', '.join(changes)}")
             except Exception as e:
-                logger.error(f"添加组合定时任务失败: {str(e)}")
-        else:
-            logger.info("CloudflareSpeedTest优选功能已禁用，不添加相关定时任务")
-    
+                logger.error(f"设置定时任务 {spec['name']} 失败: {str(e)}")
+
+        # 持久化存储中残留的旧任务
+        for job_id in existing:
+            self.scheduler.remove_job(job_id)
+            logger.info(f"已移除未知的定时任务 {job_id}")
+
+    def _dependents(self, job_id: str) -> List[str]:
+        """返回依赖于 job_id 的任务（job_id 成功后需要执行的任务）"""
+        return [dep_id for dep_id, spec in self.job_specs.items() if job_id in spec.get("after", [])]
+
+    def _execute(self, job_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        执行单个任务
+
+        Returns:
+            (是否成功/有变更, 结果说明)，说明为None时使用hosts_manager的任务状态
+        """
+        if job_id == "cfst":
+            return self.hosts_manager.run_cfst(), None
+        if job_id == "hosts":
+            return self.hosts_manager.update_hosts(), None
+        if job_id == "tracker_import":
+            return self._import_trackers()
+        if job_id == "watchdog":
+            return self._run_watchdog()
+        if job_id == "ip_failover":
+            return self._run_failover()
+        raise ValueError(f"未知任务: {job_id}")
+
+    def _import_trackers(self) -> Tuple[bool, str]:
+        torrent_client_manager = self.torrent_client_manager
+        if torrent_client_manager is None:
+            # 下载器管理器延迟创建，首次导入时才构建
+            from app.globals import get_torrent_client_manager
+            torrent_client_manager = get_torrent_client_manager()
+        if torrent_client_manager is None:
+            return False, "下载器管理器未初始化，跳过Tracker导入"
+        result = torrent_client_manager.import_trackers_from_clients()
+        if result.get("status") != "success" or not result.get("all_domains"):
+            return False, result.get("message") or "未从下载器获取到Tracker"
+        import_result = self.hosts_manager.import_tracker_domains(result["all_domains"])
+        added = import_result["added"]
+        if added:
+            _sync_global_config(self.hosts_manager.config)
+        return bool(added), f"从下载器导入 {len(added)} 个新的Cloudflare站点，过滤非Cloudflare站点 {len(import_result['non_cf_domains'])} 个"
+
+    def _run_watchdog(self) -> Tuple[bool, str]:
+        """采样当前优选IP的网络质量，劣化时执行完整的优选+hosts更新"""
+        if self.hosts_manager.task_running:
+            return False, "网络看门狗: 已有hosts任务在运行，跳过本次采样"
+        triggered, message = self.watchdog.check()
+        logger.info(message)
+        if not triggered:
+            return False, message
+        ok = self.hosts_manager.run_cfst_and_update_hosts()
+        return ok, f"{message}；{self.hosts_manager.get_task_status().get('message', '')}"
+
+    def _run_failover(self) -> Tuple[bool, str]:
+        """检查Tracker当前IP的连通性，失效时切换到候选池中的下一个健康IP"""
+        if self.hosts_manager.task_running:
+            return False, "IP故障切换: 已有hosts任务在运行，跳过本次检查"
+        result = self.health_checker.check()
+        if result["rotated"]:
+            return True, "IP故障切换: " + "，".join(f"{old} -> {new}" for old, new in result["rotated"].items())
+        if result["unhealthy"]:
+            return False, f"IP故障切换: {', '.join(result['unhealthy'])} 连接失败，暂未切换"
+        return False, "IP故障切换: 当前IP均健康"
+
+    def _run_chain(self, job_id: str, messages: List[str], visited: set) -> bool:
+        """执行任务及其依赖任务链"""
+        if job_id in visited:
+            return True
+        visited.add(job_id)
+        spec = self.job_specs.get(job_id, {})
+        self.task_status = {"status": "running", "message": f"正在执行定时任务: {spec.get('name', job_id)}"}
+        logger.info(f"开始执行定时任务: {spec.get('name', job_id)}")
+        ok, msg = self._execute(job_id)
+        if msg is None:
+            status = self.hosts_manager.get_task_status() if hasattr(self.hosts_manager, 'get_task_status') else {}
+            msg = status.get('message') if isinstance(status, dict) else None
+        messages.append(msg or f"{spec.get('name', job_id)}{'完成' if ok else '失败'}")
+        if ok:
+            for dep_id in self._dependents(job_id):
+                self._run_chain(dep_id, messages, visited)
+        return ok
+
+    def run_job(self, job_id: str):
+        """执行定时任务（含依赖任务链），结束后发送通知"""
+        spec = self.job_specs.get(job_id, {})
+        title = spec.get("title", spec.get("name", job_id))
+        messages: List[str] = []
+        ok = False
+        with self._pipeline_lock:
+            try:
+                ok = self._run_chain(job_id, messages, set())
+                msg = "；".join(messages)
+                logger.info(f"定时任务完成: {spec.get('name', job_id)} -> {msg}")
+            except Exception as e:
+                msg = f"定时任务失败: {str(e)}"
+                logger.error(f"执行定时任务 {job_id} 失败: {str(e)}", exc_info=True)
+            self.task_status = {"status": "done", "message": msg}
+
+        if spec.get("notify") and (ok or not spec.get("quiet")):
+            try:
+                from app.api.routes import _send_task_notify
+                logger.info(f"[定时任务通知] {title} -> {msg}")
+                _send_task_notify(title, msg)
+            except Exception as notify_e:
+                logger.error(f"发送定时任务通知失败: {str(notify_e)}")
+
     def start(self):
         """启动调度器"""
         if self.scheduler is None:
             self._create_scheduler()
         if not self.scheduler.running:
-            self.scheduler.start()
+            # 先以暂停状态启动以加载持久化任务，同步配置后再恢复，
+            # 重启期间错过的执行会在 misfire_grace_time 内合并补执行一次
+            self.scheduler.start(paused=True)
+            self._sync_jobs()
+            self.scheduler.resume()
             logger.info("调度器已启动")
-    
+
     def stop(self):
         """停止调度器"""
         if self.scheduler:
             if self.scheduler.running:
                 self.scheduler.shutdown(wait=False)
             self.scheduler = None
-            logger.info("调度器已停止并清除")
-    
+            logger.info("调度器已停止")
+
     def is_running(self) -> bool:
         """检查调度器是否运行中"""
         return self.scheduler is not None and self.scheduler.running
-    
+
     def get_jobs(self) -> list:
         """获取所有定时任务"""
         jobs = []
         if self.scheduler:
             for job in self.scheduler.get_jobs():
-                next_run = job.next_run_time.strftime("%Y-%m-%d %H:%M:%S") if job.next_run_time else "未安排"
+                # 调度器启动前任务处于待定状态，尚无 next_run_time
+                next_run_time = getattr(job, "next_run_time", None)
+                next_run = next_run_time.strftime("%Y-%m-%d %H:%M:%S") if next_run_time else "未安排"
                 jobs.append({
                     "id": job.id,
                     "name": job.name,
                     "next_run": next_run
                 })
         return jobs
-        
+
     def get_task_status(self):
         """获取当前任务状态
-        
+
         Returns:
             任务状态字典: 包含status和message
         """
-        return self.task_status
\ No newline at end of file
+        return self.task_status
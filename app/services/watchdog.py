@@ -0,0 +1,112 @@
+import logging
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.utils.job_settings import coerce_settings
+
+logger = logging.getLogger(__name__)
+
+# 看门狗默认参数，可通过 scheduler.jobs.watchdog 覆盖
+DEFAULT_WATCHDOG_SETTINGS = {
+    "port": 443,                  # 探测端口
+    "timeout": 2.0,               # 单次TCP连接超时（秒）
+    "samples": 4,                 # 每个IP的连接次数
+    "sample_trackers": 3,         # 最多抽样的已启用Tracker数量
+    "latency_threshold_ms": 300,  # 中位延迟超过该值视为劣化
+    "loss_threshold": 0.25,       # 连接失败率达到该值视为劣化
+    "consecutive": 2,             # 连续劣化次数达到该值才触发优选，避免偶发抖动
+    "cooldown_minutes": 120,      # 两次优选之间的最小间隔（包括定时优选）
+}
+
+
+class NetworkWatchdog:
+    """
+    网络质量看门狗：定期对当前优选IP做轻量TCP连接采样（延迟与丢包），
+    仅在质量劣化且超过冷却时间时才触发完整的Cloudflare优选。
+    """
+
+    def __init__(self, hosts_manager):
+        self.hosts_manager = hosts_manager
+        self.settings = dict(DEFAULT_WATCHDOG_SETTINGS)
+        self.degraded_count = 0
+        self.last_result: Dict[str, Any] = {}
+
+    def load_settings(self, spec: Dict[str, Any]):
+        """从任务配置中读取看门狗参数，无效取值回退默认值"""
+        self.settings = coerce_settings(spec, DEFAULT_WATCHDOG_SETTINGS, "watchdog")
+
+    def _target_ips(self) -> List[str]:
+        """抽样目标：已启用Tracker使用的IP（去重），没有时使用当前最优IP"""
+        ips = []
+        for tracker in self.hosts_manager.config.get("trackers", []) or []:
+            if len(ips) >= self.settings["sample_trackers"]:
+                break
+            ip = tracker.get("ip")
+            if tracker.get("enable") and ip and ip not in ips:
+                ips.append(ip)
+        best_ip = self.hosts_manager.best_cloudflare_ip
+        if not ips and best_ip:
+            ips.append(best_ip)
+        return ips
+
+    def _connect_latency(self, ip: str) -> Optional[float]:
+        """单次TCP连接耗时（毫秒），失败返回None"""
+        start = time.perf_counter()
+        try:
+            with socket.create_connection((ip, self.settings["port"]), timeout=self.settings["timeout"]):
+                return (time.perf_counter() - start) * 1000
+        except OSError:
+            return None
+
+    def sample(self) -> Dict[str, Any]:
+        """并发采样所有目标IP，返回中位延迟（毫秒）与丢包率"""
+        ips = self._target_ips()
+        probes = [ip for ip in ips for _ in range(self.settings["samples"])]
+        if not probes:
+            return {"ips": [], "latency_ms": None, "loss": None}
+        with ThreadPoolExecutor(max_workers=min(len(probes), 16)) as executor:
+            results = list(executor.map(self._connect_latency, probes))
+        latencies = [r for r in results if r is not None]
+        return {
+            "ips": ips,
+            "latency_ms": statistics.median(latencies) if latencies else None,
+            "loss": 1 - len(latencies) / len(results),
+        }
+
+    def check(self) -> Tuple[bool, str]:
+        """
+        采样并判断是否需要触发优选。
+
+        Returns:
+            (是否需要触发优选, 说明文本)
+        """
+        result = self.sample()
+        self.last_result = dict(result, time=time.time())
+        if not result["ips"]:
+            return False, "网络看门狗: 没有可采样的优选IP"
+
+        latency, loss = result["latency_ms"], result["loss"]
+        summary = f"IP {', '.join(result['ips'])} 延迟 {latency:.0f}ms，丢包 {loss:.0%}" if latency is not None else f"IP {', '.join(result['ips'])} 全部连接失败"
+        reasons = []
+        if latency is None or latency > self.settings["latency_threshold_ms"]:
+            reasons.append(f"延迟超过 {self.settings['latency_threshold_ms']}ms")
+        if loss >= self.settings["loss_threshold"]:
+            reasons.append(f"丢包率达到 {self.settings['loss_threshold']:.0%}")
+        if not reasons:
+            self.degraded_count = 0
+            return False, f"网络看门狗: {summary}，质量正常"
+
+        self.degraded_count += 1
+        if self.degraded_count < self.settings["consecutive"]:
+            return False, f"网络看门狗: {summary}，{'、'.join(reasons)}（连续 {self.degraded_count}/{self.settings['consecutive']} 次）"
+        # 冷却时间从最近一次优选（定时、手动或看门狗触发）开始计算
+        last_cfst_time = getattr(self.hosts_manager, "last_cfst_time", None)
+        if last_cfst_time is not None:
+            remaining = last_cfst_time + self.settings["cooldown_minutes"] * 60 - time.time()
+            if remaining > 0:
+                return False, f"网络看门狗: {summary}，{'、'.join(reasons)}，冷却中（剩余 {remaining / 60:.0f} 分钟）"
+        self.degraded_count = 0
+        return True, f"网络看门狗: {summary}，{'、'.join(reasons)}，触发Cloudflare优选"
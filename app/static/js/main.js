@@ -91,7 +91,8 @@ function bindEvents() {
             fetch('/api/config')
                 .then(response => response.json())
                 .then(fullConfig => {
-                    const updatedConfig = { ...fullConfig, cloudflare: config.cloudflare };
+                    // 只提交修改的顶层配置，服务端合并到最新配置中
+                    const updatedConfig = { cloudflare: { ...(fullConfig.cloudflare || {}), ...config.cloudflare } };
                     return fetch('/api/config', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
@@ -212,8 +213,8 @@ function bindEvents() {
                             showToast(res.message || '日志已清空', 'success');
                             const logsElement = document.getElementById('logs');
                             logsElement.textContent = '';
-                            // 成功清空后自动刷新一次最新日志
-                            loadLogs();
+                            // 成功清空后自动全量刷新一次最新日志
+                            loadLogs(true);
                         } else {
                             showToast((res && res.message) || '清空日志失败', 'danger');
                         }
@@ -592,12 +593,47 @@ function loadHostsSources() {
         });
 }
 
-// 加载日志
-function loadLogs() {
+// 日志增量拉取游标（内存日志缓冲的最新ID），null 表示需要全量加载
+let logsLastId = null;
+
+// 加载日志：首次全量读取日志文件末尾，之后只通过 /api/logs/query 拉取新增记录
+function loadLogs(forceFull = false) {
+    if (forceFull || logsLastId === null) {
+        loadFullLogs();
+        return;
+    }
+    fetch(`/api/logs/query?since_id=${logsLastId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.truncated || data.last_id === null || data.last_id === undefined) {
+                // 新增日志超出内存缓冲范围，回退为全量加载
+                loadFullLogs();
+                return;
+            }
+            logsLastId = data.last_id;
+            if (Array.isArray(data.records) && data.records.length > 0) {
+                const logsElement = document.getElementById('logs');
+                const newText = data.records.map(r => r.text).join('\n');
+                if (!logsElement.textContent || logsElement.textContent === '暂无日志') {
+                    logsElement.textContent = newText;
+                } else {
+                    logsElement.textContent += '\n' + newText;
+                }
+                logsElement.scrollTop = logsElement.scrollHeight;
+            }
+        })
+        .catch(error => {
+            console.error('加载日志失败:', error);
+            document.getElementById('logs').textContent = '加载日志失败';
+        });
+}
+
+function loadFullLogs() {
     fetch('/api/logs')
         .then(response => response.json())
         .then(data => {
             const logsElement = document.getElementById('logs');
+            logsLastId = (data.last_id === undefined) ? null : data.last_id;
             // 适配后端返回的带换行字符串
             if (typeof data.logs === 'string' && data.logs.length > 0) {
                 logsElement.textContent = data.logs;
@@ -662,7 +698,7 @@ function updateTracker(domain, data) {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify(config)
+                body: JSON.stringify({ trackers })
             });
         })
         .then(response => response.json())
@@ -736,7 +772,7 @@ function updateHostsSource(url, data) {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify(config)
+                body: JSON.stringify({ hosts_sources: sources })
             });
         })
         .then(response => response.json())
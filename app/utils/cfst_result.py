@@ -0,0 +1,107 @@
+import csv
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+# CloudflareST 结果文件的列名关键字 -> 字段名
+# 标准表头: IP 地址,已发送,已接收,丢包率,平均延迟,下载速度 (MB/s)[,地区码]
+_COLUMN_KEYWORDS = (
+    ("IP", "ip"),
+    ("已发送", "sent"),
+    ("已接收", "received"),
+    ("丢包", "loss"),
+    ("延迟", "latency"),
+    ("速度", "speed"),
+    ("地区", "region"),
+)
+_DEFAULT_COLUMNS = ["ip", "sent", "received", "loss", "latency", "speed", "region"]
+
+
+class CfstRecord:
+    """CloudflareST 单条测速结果"""
+    __slots__ = ("rank", "ip", "sent", "received", "loss", "latency", "speed", "region")
+
+    def __init__(self, rank: int, ip: str, sent: int = 0, received: int = 0, loss: float = 0.0,
+                 latency: Optional[float] = None, speed: float = 0.0, region: str = ""):
+        self.rank = rank
+        self.ip = ip
+        self.sent = sent
+        self.received = received
+        self.loss = loss
+        self.latency = latency
+        self.speed = speed
+        self.region = region
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def _map_columns(header: List[str]) -> List[Optional[str]]:
+    columns = []
+    for name in header:
+        field = next((f for keyword, f in _COLUMN_KEYWORDS if keyword in name), None)
+        columns.append(field)
+    if "ip" not in columns:
+        # 无法识别表头时按标准列顺序解析
+        return _DEFAULT_COLUMNS[:len(header)]
+    return columns
+
+
+def _to_float(value: str, default: Optional[float] = 0.0) -> Optional[float]:
+    try:
+        return float(value.strip().rstrip("%"))
+    except (AttributeError, ValueError):
+        return default
+
+
+def _to_int(value: str) -> int:
+    try:
+        return int(value.strip())
+    except (AttributeError, ValueError):
+        return 0
+
+
+def parse_result_file(path: str, limit: Optional[int] = None) -> List[CfstRecord]:
+    """
+    读取 CloudflareST 结果文件（result.csv / result_hosts.txt），一次性解析为按排名排序的记录。
+
+    Args:
+        limit: 最多返回的记录数，None表示全部
+
+    Returns:
+        记录列表，文件不存在或没有数据时返回空列表
+    """
+    if not os.path.exists(path):
+        return []
+    records: List[CfstRecord] = []
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return []
+        columns = _map_columns(header)
+        for row in reader:
+            if limit is not None and len(records) >= limit:
+                break
+            values = {field: value for field, value in zip(columns, row) if field}
+            ip = (values.get("ip") or "").strip()
+            if not ip:
+                continue
+            records.append(CfstRecord(
+                rank=len(records) + 1,
+                ip=ip,
+                sent=_to_int(values.get("sent")),
+                received=_to_int(values.get("received")),
+                loss=_to_float(values.get("loss")),
+                latency=_to_float(values.get("latency"), None),
+                speed=_to_float(values.get("speed")),
+                region=(values.get("region") or "").strip(),
+            ))
+    return records
+
+
+def result_file_time(path: str) -> Optional[str]:
+    """结果文件的修改时间（本地时间字符串），文件不存在时返回None"""
+    if not os.path.exists(path):
+        return None
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(path)))
@@ -0,0 +1,271 @@
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/config.yaml"
+# 优先使用 libyaml 的C实现，未安装时回退纯Python实现
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+# 写入防抖时间（秒）：短时间内的多次保存合并为一次落盘
+DEFAULT_DEBOUNCE = float(os.environ.get("CONFIG_SAVE_DEBOUNCE", "0.3"))
+# 连续保存时的最长延迟（秒），避免一直被推迟
+DEFAULT_MAX_DELAY = 2.0
+# JSON快照格式版本，旧版本快照（未校验JSON往返一致性）不再使用
+SNAPSHOT_FORMAT = 2
+
+
+def _read_umask() -> int:
+    """读取进程umask（只能通过设置后恢复的方式获取）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# 进程umask在模块导入时读取一次：运行中临时修改umask会影响其它线程同时创建的文件
+_UMASK = _read_umask()
+
+
+def _faithful_json(data: Any) -> Optional[str]:
+    """
+    返回 data 的JSON序列化结果；JSON往返后与原数据不一致时返回None。
+
+    YAML允许非字符串的键（如整数、布尔值），JSON会将其转为字符串，这类配置不能走JSON快照或JSON副本。
+    """
+    try:
+        text = json.dumps(data, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+    return text if json.loads(text) == data else None
+
+
+class ConfigStore:
+    """
+    配置持久化层：所有对 config.yaml 的读写都经过这里。
+
+    - 写入通过锁串行化，并在防抖窗口内合并为一次落盘
+    - 落盘采用 临时文件 + fsync + rename，避免写到一半被读取或断电损坏
+    - 每次变更递增 version，读取方可以按版本号缓存派生数据
+    - 文件被外部修改（mtime/大小变化）时自动重新加载
+    - 旁路保存JSON快照（按YAML文件的mtime与哈希校验），启动时无需重新解析YAML
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY):
+        self.path = path
+        self.snapshot_path = os.path.join(os.path.dirname(path) or ".", "." + os.path.basename(path) + ".snapshot.json")
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.version = 0
+        self._lock = threading.RLock()
+        self._cache: Optional[Dict[str, Any]] = None
+        # 缓存的JSON序列化结果，用于快速生成副本
+        self._cache_json: Optional[str] = None
+        self._file_stamp = None
+        self._dirty = False
+        self._first_pending: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def _stat_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read_file(self, stamp) -> Dict[str, Any]:
+        """读取配置文件：JSON快照的mtime与哈希一致时直接使用快照，否则解析YAML（UTF-8优先，回退GBK/GB18030）"""
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        snapshot = self._read_snapshot()
+        if (snapshot and snapshot.get("format") == SNAPSHOT_FORMAT
+                and snapshot.get("mtime_ns") == stamp[0] and snapshot.get("sha1") == digest):
+            return snapshot["data"]
+        for encoding in ("utf-8", "gbk", "gb18030"):
+            try:
+                text = raw.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise UnicodeDecodeError("gb18030", raw, 0, 1, f"无法识别配置文件编码: {self.path}")
+        data = yaml.load(text, Loader=YamlLoader) or {}
+        self._write_snapshot(stamp, digest, data)
+        return data
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_snapshot(self, stamp, digest: str, data: Dict[str, Any]):
+        """写入JSON快照（失败不影响主流程）；配置无法无损转为JSON时不写快照"""
+        if _faithful_json(data) is None:
+            logger.debug("配置包含无法无损转为JSON的内容，跳过写入JSON快照")
+            return
+        try:
+            payload = json.dumps(
+                {"format": SNAPSHOT_FORMAT, "mtime_ns": stamp[0], "sha1": digest, "data": data}, ensure_ascii=False
+            )
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.debug(f"写入配置JSON快照失败: {e}")
+
+    def _set_cache(self, data: Dict[str, Any]):
+        self._cache = data
+        self._cache_json = _faithful_json(data)
+
+    def _copy(self) -> Dict[str, Any]:
+        """生成缓存的副本：优先使用JSON反序列化（比deepcopy快），无法无损转为JSON时回退deepcopy"""
+        if self._cache_json is not None:
+            return json.loads(self._cache_json)
+        return copy.deepcopy(self._cache)
+
+    def _current(self) -> Dict[str, Any]:
+        """返回内部缓存（需持有锁），文件被外部修改时重新加载"""
+        if self._dirty:
+            return self._cache
+        stamp = self._stat_stamp()
+        if self._cache is None or stamp != self._file_stamp:
+            self._set_cache(self._read_file(stamp) if stamp is not None else {})
+            self._file_stamp = stamp
+            self.version += 1
+        return self._cache
+
+    def exists(self) -> bool:
+        with self._lock:
+            return self._dirty or os.path.exists(self.path)
+
+    def load(self) -> Dict[str, Any]:
+        """返回最新配置的副本（包括尚未落盘的修改），调用方可以自由修改"""
+        with self._lock:
+            self._current()
+            return self._copy()
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        """
+        返回 (版本号, 配置) 的只读快照，不复制。
+
+        调用方不得修改返回的配置，适合每个请求都要读取配置的热路径按版本号缓存派生数据。
+        """
+        with self._lock:
+            config = self._current()
+            return self.version, config
+
+    def save(self, config: Dict[str, Any], immediate: bool = False):
+        """保存完整配置；默认在防抖窗口结束后落盘，immediate=True 时立即写入"""
+        with self._lock:
+            self._set_cache(config)
+            # 与调用方持有的对象解耦，避免其后续修改绕过版本号直接影响缓存
+            self._cache = self._copy() if self._cache_json is not None else copy.deepcopy(config)
+            self.version += 1
+            self._dirty = True
+            now = time.time()
+            if self._first_pending is None:
+                self._first_pending = now
+            if immediate or now - self._first_pending >= self.max_delay:
+                self._flush_locked()
+            else:
+                self._schedule()
+
+    def merge(self, partial_update: Dict[str, Any], immediate: bool = False) -> Dict[str, Any]:
+        """以最新配置为基础仅覆盖传入的顶层键，返回合并后配置的副本"""
+        with self._lock:
+            self._current()
+            merged = self._copy()
+            merged.update(partial_update or {})
+            self.save(merged, immediate=immediate)
+            return self._copy()
+
+    def update(self, mutator: Callable[[Dict[str, Any]], Any], immediate: bool = False) -> Dict[str, Any]:
+        """
+        在锁内对最新配置的副本执行 mutator(config) 并保存，返回保存后配置的副本。
+
+        用于"读取-修改-写回"（如在列表中增删条目），并发调用不会互相覆盖；mutator 抛出异常时不保存。
+        """
+        with self._lock:
+            self._current()
+            config = self._copy()
+            mutator(config)
+            self.save(config, immediate=immediate)
+            return self._copy()
+
+    def flush(self):
+        """立即写入尚未落盘的修改"""
+        with self._lock:
+            self._flush_locked()
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _file_mode(self) -> int:
+        """落盘后配置文件应有的权限：沿用原文件权限，文件不存在时按umask计算（mkstemp创建的临时文件为0600）"""
+        try:
+            return os.stat(self.path).st_mode & 0o7777
+        except OSError:
+            return 0o666 & ~_UMASK
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._dirty:
+            return
+        data = yaml.dump(self._cache, Dumper=YamlDumper, default_flow_style=False, allow_unicode=True)
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, self._file_mode())
+            try:
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                # 单文件挂载等无法rename的场景，退回原地写入
+                logger.warning(f"原子替换配置文件失败（{e}），改为原地写入")
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.unlink(tmp_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            logger.error("写入配置文件失败", exc_info=True)
+            raise
+        self._dirty = False
+        self._first_pending = None
+        self._file_stamp = self._stat_stamp()
+        if self._file_stamp is not None:
+            self._write_snapshot(self._file_stamp, hashlib.sha1(data.encode('utf-8')).hexdigest(), self._cache)
+
+
+# 全局配置存储实例
+config_store = ConfigStore()
+atexit.register(config_store.flush)
+
+
+def get_config_store() -> ConfigStore:
+    return config_store
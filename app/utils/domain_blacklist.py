@@ -0,0 +1,124 @@
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认域名黑名单（未配置 domain_blacklist 时使用）
+DEFAULT_DOMAIN_BLACKLIST = [
+    "*.docker.com",
+    "*.docker.io",
+    "*.quay.io",
+    "*.gcr.io",
+    "*.ghcr.io",
+]
+
+# 前缀树节点中的规则标记键（不会与域名标签冲突）
+_EXACT = "\0exact"
+_SUFFIX = "\0suffix"
+
+
+def normalize_domain(domain: str) -> str:
+    """统一为小写、去除端口与末尾的点"""
+    domain = (domain or "").strip().lower()
+    if ":" in domain:
+        domain = domain.split(":", 1)[0]
+    return domain.rstrip(".")
+
+
+class DomainBlacklist:
+    """
+    域名黑名单：规则编译为按标签反转的前缀树，查询耗时只与域名的标签数有关。
+
+    规则格式：
+    - `example.com`：仅匹配该域名本身
+    - `*.example.com`：匹配 example.com 及其所有子域名
+    - `/正则/`：对完整域名做正则搜索（re.search）
+
+    每条规则的命中次数累计在 counts 中。
+    """
+
+    def __init__(self, rules: Optional[List[str]] = None):
+        self._lock = threading.Lock()
+        self.load(DEFAULT_DOMAIN_BLACKLIST if rules is None else rules)
+
+    def update_config(self, config: Dict[str, Any]):
+        rules = config.get("domain_blacklist")
+        self.load(DEFAULT_DOMAIN_BLACKLIST if rules is None else rules)
+
+    def load(self, rules: List[str]):
+        """编译规则；无效的正则只记录警告并跳过"""
+        trie: Dict[str, Any] = {}
+        regexes = []
+        valid_rules = []
+        for rule in rules or []:
+            rule = str(rule).strip()
+            if not rule:
+                continue
+            if len(rule) > 2 and rule.startswith("/") and rule.endswith("/"):
+                try:
+                    regexes.append((rule, re.compile(rule[1:-1], re.IGNORECASE)))
+                except re.error as e:
+                    logger.warning(f"域名黑名单正则无效，已忽略: {rule}，错误: {e}")
+                    continue
+            else:
+                marker = _EXACT
+                domain = rule
+                if rule.startswith("*."):
+                    marker = _SUFFIX
+                    domain = rule[2:]
+                domain = normalize_domain(domain)
+                if not domain:
+                    continue
+                node = trie
+                for label in reversed(domain.split(".")):
+                    node = node.setdefault(label, {})
+                node.setdefault(marker, rule)
+            valid_rules.append(rule)
+        with self._lock:
+            self.rules = valid_rules
+            self._trie = trie
+            self._regexes = regexes
+            # 保留仍然存在的规则的计数
+            self.counts = Counter({rule: n for rule, n in getattr(self, "counts", Counter()).items() if rule in valid_rules})
+
+    def match(self, domain: str) -> Optional[str]:
+        """返回命中的规则，未命中返回None（不计数）"""
+        domain = normalize_domain(domain)
+        if not domain:
+            return None
+        node = self._trie
+        for label in reversed(domain.split(".")):
+            if _SUFFIX in node:
+                return node[_SUFFIX]
+            node = node.get(label)
+            if node is None:
+                break
+        else:
+            if _SUFFIX in node:
+                return node[_SUFFIX]
+            if _EXACT in node:
+                return node[_EXACT]
+        for rule, pattern in self._regexes:
+            if pattern.search(domain):
+                return rule
+        return None
+
+    def is_blacklisted(self, domain: str) -> bool:
+        """判断域名是否在黑名单中，命中时累计对应规则的计数"""
+        rule = self.match(domain)
+        if rule is None:
+            return False
+        with self._lock:
+            self.counts[rule] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": list(self.rules),
+                "counts": {rule: self.counts.get(rule, 0) for rule in self.rules},
+                "total": sum(self.counts.values()),
+            }
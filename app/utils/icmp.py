@@ -0,0 +1,163 @@
+import ipaddress
+import logging
+import os
+import select
+import socket
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+# 一次批量发送的最大IP数（序号为16位）
+MAX_BATCH = 0xFFFF
+
+
+def address_family(ip: str) -> int:
+    """按IP字面量判断地址族（socket.AF_INET / socket.AF_INET6）"""
+    return socket.AF_INET6 if ":" in ip else socket.AF_INET
+
+
+def _normalize_ip(ip: str) -> str:
+    try:
+        return ipaddress.ip_address(ip.split("%", 1)[0]).compressed
+    except ValueError:
+        return ip
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _build_echo(family: int, ident: int, seq: int) -> bytes:
+    payload = b"PT-Accel"
+    if family == socket.AF_INET6:
+        # ICMPv6校验和包含伪首部，由内核计算
+        return struct.pack("!BBHHH", ICMPV6_ECHO_REQUEST, 0, 0, ident, seq) + payload
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), ident, seq) + payload
+
+
+def open_icmp_socket(family: int = socket.AF_INET) -> Tuple[Optional[socket.socket], bool]:
+    """
+    打开ICMP套接字：优先使用Linux免特权的 SOCK_DGRAM ICMP 套接字
+    （需要 net.ipv4.ping_group_range 包含当前用户组，IPv6同样使用该设置），
+    失败时回退到原始套接字（需要root/CAP_NET_RAW）。
+
+    Returns:
+        (套接字, 是否为原始套接字)，都不可用时返回 (None, False)
+    """
+    proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+    for sock_type, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            sock = socket.socket(family, sock_type, proto)
+            sock.setblocking(False)
+            return sock, raw
+        except (OSError, AttributeError):
+            continue
+    return None, False
+
+
+class _EchoSession:
+    """单个地址族的一次批量回显：一个套接字、按序号记录待回复的请求"""
+
+    def __init__(self, family: int, sock: socket.socket, raw: bool, ident: int):
+        self.family = family
+        self.sock = sock
+        self.raw = raw
+        self.ident = ident
+        self.reply_type = ICMPV6_ECHO_REPLY if family == socket.AF_INET6 else ICMP_ECHO_REPLY
+        # 序号 -> (IP, 规范化后的IP, 发送时间)
+        self.pending: Dict[int, Tuple[str, str, float]] = {}
+
+    def send(self, ips: List[str]):
+        for seq, ip in enumerate(ips):
+            try:
+                self.sock.sendto(_build_echo(self.family, self.ident, seq), (ip, 0))
+                self.pending[seq] = (ip, _normalize_ip(ip), time.perf_counter())
+            except OSError as e:
+                # 发送缓冲区已满、地址无效或没有该地址族的路由，视为不可达
+                logger.debug(f"[ICMP] 发送到 {ip} 失败: {e}")
+
+    def receive(self, results: Dict[str, Optional[float]]):
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(2048)
+            except OSError:
+                return
+            received_at = time.perf_counter()
+            if self.raw and self.family == socket.AF_INET:
+                # IPv4原始套接字收到的数据包含IP头（IPv6不包含）
+                packet = packet[(packet[0] & 0x0F) * 4:]
+            if len(packet) < 8:
+                continue
+            icmp_type, _, _, reply_ident, seq = struct.unpack("!BBHHH", packet[:8])
+            # SOCK_DGRAM 下内核会用本地端口替换标识符，因此只有原始套接字需要校验标识符
+            if icmp_type != self.reply_type or (self.raw and reply_ident != self.ident):
+                continue
+            entry = self.pending.get(seq)
+            if entry is None or entry[1] != _normalize_ip(address[0]):
+                continue
+            del self.pending[seq]
+            results[entry[0]] = (received_at - entry[2]) * 1000
+
+
+def ping_many(ips: List[str], timeout: float = 1.0) -> Optional[Dict[str, Optional[float]]]:
+    """
+    向一批IP发送ICMP回显请求：每个地址族只用一个套接字，IPv4与IPv6在同一个超时窗口内并行等待，
+    按序号（原始套接字下还校验标识符）与来源地址匹配回复。
+
+    Returns:
+        IP -> 往返时间（毫秒），无回复为None；当前环境无法创建任何需要的ICMP套接字时返回None
+    """
+    results: Dict[str, Optional[float]] = {ip: None for ip in ips}
+    if not ips:
+        return results
+    by_family: Dict[int, List[str]] = {}
+    for ip in dict.fromkeys(ips):
+        by_family.setdefault(address_family(ip), []).append(ip)
+    ident = os.getpid() & 0xFFFF
+    for start in range(0, max(len(group) for group in by_family.values()), MAX_BATCH):
+        sessions = []
+        try:
+            for family, group in by_family.items():
+                batch = group[start:start + MAX_BATCH]
+                if not batch:
+                    continue
+                sock, raw = open_icmp_socket(family)
+                if sock is None:
+                    # 该地址族无法创建ICMP套接字，其地址视为不可达
+                    continue
+                session = _EchoSession(family, sock, raw, ident)
+                sessions.append(session)
+                session.send(batch)
+            if not sessions:
+                return None
+            _wait_replies(sessions, timeout, results)
+        finally:
+            for session in sessions:
+                session.sock.close()
+    return results
+
+
+def _wait_replies(sessions: List[_EchoSession], timeout: float, results: Dict[str, Optional[float]]):
+    deadline = time.perf_counter() + timeout
+    while any(session.pending for session in sessions):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([session.sock for session in sessions if session.pending], [], [], remaining)
+        if not readable:
+            break
+        for session in sessions:
+            if session.sock in readable:
+                session.receive(results)
@@ -0,0 +1,25 @@
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def coerce_settings(spec: Dict[str, Any], defaults: Dict[str, Any], job_id: str, strict: bool = False) -> Dict[str, Any]:
+    """
+    按默认值的类型转换任务参数（如 scheduler.jobs.watchdog 中的数值参数）。
+
+    strict=True 时取值无效（null、非数字字符串等）抛出 ValueError，用于保存配置前的校验；
+    否则回退默认值并记录警告，避免已保存的无效配置导致服务无法启动。
+    """
+    settings = {}
+    for key, default in defaults.items():
+        value = spec.get(key, default)
+        try:
+            settings[key] = type(default)(value)
+        except (TypeError, ValueError):
+            message = f"任务 {job_id} 的 {key} 必须为{'整数' if isinstance(default, int) else '数字'}，当前为 {value!r}"
+            if strict:
+                raise ValueError(message)
+            logger.warning(f"{message}，使用默认值 {default}")
+            settings[key] = default
+    return settings
@@ -0,0 +1,154 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+
+class BufferedLogRecord:
+    """环形缓冲区中的精简日志记录，使用 __slots__ 控制内存占用"""
+    __slots__ = ("id", "created", "levelno", "levelname", "name", "message", "text")
+
+    def __init__(self, record_id: int, created: float, levelno: int, levelname: str, name: str, message: str, text: str):
+        self.id = record_id
+        self.created = created
+        self.levelno = levelno
+        self.levelname = levelname
+        self.name = name
+        self.message = message
+        self.text = text
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "time": datetime.fromtimestamp(self.created).strftime("%Y-%m-%d %H:%M:%S"),
+            "created": self.created,
+            "level": self.levelname,
+            "logger": self.name,
+            "message": self.message,
+            "text": self.text,
+        }
+
+
+class RingBufferHandler(logging.Handler):
+    """内存环形缓冲日志处理器：保留最近 capacity 条记录，支持按条件过滤与按ID增量拉取"""
+
+    def __init__(self, capacity: int = 5000):
+        super().__init__()
+        self.capacity = max(1, capacity)
+        self.records = deque(maxlen=self.capacity)
+        self.last_id = 0
+        self._buffer_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = record.getMessage()
+            text = self.format(record)
+            with self._buffer_lock:
+                self.last_id += 1
+                self.records.append(BufferedLogRecord(
+                    self.last_id, record.created, record.levelno,
+                    record.levelname, record.name, message, text
+                ))
+        except Exception:
+            self.handleError(record)
+
+    def clear(self):
+        """清空缓冲区，ID 继续递增，保证增量拉取的游标不会回退"""
+        with self._buffer_lock:
+            self.records.clear()
+
+    def query(
+        self,
+        level: Optional[Union[str, int]] = None,
+        logger_name: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        keyword: Optional[str] = None,
+        since_id: Optional[int] = None,
+        limit: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        按级别（最低级别）、logger名称（含子logger）、时间范围、关键字和游标过滤记录。
+
+        Returns:
+            records: 按ID升序的记录列表（最多 limit 条，取最新的）
+            last_id: 当前缓冲区最新记录ID，供下次增量拉取使用
+            truncated: 结果不完整（since_id 之后的部分记录已被环形缓冲覆盖，或匹配记录超过 limit），调用方应全量刷新
+
+        Raises:
+            ValueError: 无法识别的日志级别
+        """
+        min_level = parse_level(level)
+        with self._buffer_lock:
+            snapshot = list(self.records)
+            last_id = self.last_id
+        truncated = False
+        if since_id is not None and snapshot and snapshot[0].id > since_id + 1:
+            truncated = True
+        keyword_lower = keyword.lower() if keyword else None
+        matched = []
+        for rec in snapshot:
+            if since_id is not None and rec.id <= since_id:
+                continue
+            if min_level is not None and rec.levelno < min_level:
+                continue
+            if logger_name and rec.name != logger_name and not rec.name.startswith(logger_name + "."):
+                continue
+            if since is not None and rec.created < since:
+                continue
+            if until is not None and rec.created > until:
+                continue
+            if keyword_lower and keyword_lower not in rec.message.lower():
+                continue
+            matched.append(rec)
+        if limit and len(matched) > limit:
+            matched = matched[-limit:]
+            truncated = True
+        return {
+            "records": [rec.to_dict() for rec in matched],
+            "last_id": last_id,
+            "truncated": truncated,
+        }
+
+
+def parse_level(level: Optional[Union[str, int]]) -> Optional[int]:
+    """解析日志级别：支持级别名称（如 INFO）或数值，为空时返回None，无法识别时抛出 ValueError"""
+    if level is None or level == "":
+        return None
+    if isinstance(level, int):
+        return level
+    text = str(level).strip().upper()
+    if text.isdigit():
+        return int(text)
+    value = logging.getLevelName(text)
+    if not isinstance(value, int):
+        raise ValueError(f"无法识别的日志级别: {level}")
+    return value
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """解析时间参数：支持Unix时间戳或 'YYYY-MM-DD HH:MM:SS' / ISO 格式"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    return datetime.fromisoformat(str(value).strip().replace("T", " ")).timestamp()
+
+
+# 全局环形缓冲处理器实例
+ring_buffer_handler: Optional[RingBufferHandler] = None
+
+
+def init_ring_buffer_handler(capacity: int = 5000) -> RingBufferHandler:
+    """创建全局环形缓冲处理器（由 main.py 安装到 root logger）"""
+    global ring_buffer_handler
+    if ring_buffer_handler is None:
+        ring_buffer_handler = RingBufferHandler(capacity)
+    return ring_buffer_handler
+
+
+def get_ring_buffer_handler() -> Optional[RingBufferHandler]:
+    return ring_buffer_handler
@@ -0,0 +1,32 @@
+import os
+from typing import List
+
+# 反向读取的块大小（字节）
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+def tail_lines(path: str, lines: int, block_size: int = DEFAULT_BLOCK_SIZE, encoding: str = "utf-8") -> List[str]:
+    """
+    从文件末尾按固定大小的块向前读取，只解码返回最后 lines 行。
+
+    按字节中的换行符切分后再逐行解码：UTF-8 多字节字符内部不会出现 0x0A，
+    因此块边界不会把中文字符截断，无需整文件扫描。
+    """
+    if lines <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunks = []
+        newline_count = 0
+        # 多读一个换行，保证最靠前的一行是完整的
+        while pos > 0 and newline_count <= lines:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size)
+            chunks.append(chunk)
+            newline_count += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    raw_lines = data.splitlines()
+    return [line.decode(encoding, errors="replace") for line in raw_lines[-lines:]]
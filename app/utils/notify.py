@@ -1,4 +1,5 @@
 import base64
+import functools
 import hashlib
 import hmac
 import json
@@ -8,6 +9,7 @@ import threading
 import time
 import urllib.parse
 import smtplib
+from collections.abc import Mapping
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
@@ -20,13 +22,24 @@ logger = logging.getLogger("notify")
 _notify_local = threading.local()
 
 
+class NotifyError(Exception):
+    """渠道推送失败，由 send 收集到失败渠道列表"""
+
+
+def _request_timeout(config: "NotifyConfig") -> float:
+    """渠道请求超时（秒）"""
+    return float(config.get("REQUEST_TIMEOUT") or 15)
+
+
 def channel(name: str):
     def decorator(func):
-        def wrapper(*args, **kwargs):
+        @functools.wraps(func)
+        def wrapper(title: str, content: str, config: "NotifyConfig" = None):
             prev = getattr(_notify_local, "channel", None)
             _notify_local.channel = name
             try:
-                return func(*args, **kwargs)
+                # 未显式传入配置时使用默认配置（环境变量 + push_config）
+                return func(title, content, config if config is not None else default_config())
             finally:
                 _notify_local.channel = prev
         return wrapper
@@ -67,6 +80,8 @@ def print(text, *args, **kw):
 # fmt: off
 push_config = {
     'HITOKOTO': True,                  # 启用一言（随机句子）
+    'HITOKOTO_TIMEOUT': 3,              # 获取一言的超时时间（秒），超时则跳过一言
+    'REQUEST_TIMEOUT': 15,              # 各渠道请求的超时时间（秒）
 
     'BARK_PUSH': '',                    # bark IP 或设备码，例：https://api.day.app/DxHcxxxxxRxxxxxxcm/
     'BARK_ARCHIVE': '',                 # bark 推送是否存档
@@ -172,19 +187,70 @@ for k in push_config:
         push_config[k] = v
 
 
+class NotifyConfig(Mapping):
+    """
+    单次推送使用的不可变配置。
+
+    每次 send 基于 push_config 默认值与本次渠道参数构建独立实例，不再改写模块级
+    push_config，多个渠道可在不同线程中并发推送。version 为配置内容的摘要，
+    用于缓存渠道选择结果，首次访问时才计算。
+    """
+    __slots__ = ("_data", "_version")
+
+    def __init__(self, data: Mapping = None):
+        self._data = dict(data or {})
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            digest = hashlib.sha1(
+                json.dumps(self._data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+            )
+            self._version = digest.hexdigest()
+        return self._version
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def merge(self, **overrides) -> "NotifyConfig":
+        """返回合并了 overrides 的新配置，自身保持不变"""
+        data = dict(self._data)
+        data.update(overrides)
+        return NotifyConfig(data)
+
+
+def default_config() -> NotifyConfig:
+    """基于 push_config（含环境变量覆盖）的默认配置"""
+    return NotifyConfig(push_config)
+
+
+def build_config(ignore_default_config: bool = False, **kwargs) -> NotifyConfig:
+    """构建单次推送配置：ignore_default_config 为 True 时仅使用 kwargs"""
+    if ignore_default_config:
+        return NotifyConfig(kwargs)
+    return default_config().merge(**kwargs)
+
+
 @channel("bark")
-def bark(title: str, content: str) -> None:
+def bark(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 bark 推送消息。
     """
-    if not push_config.get("BARK_PUSH"):
+    if not config.get("BARK_PUSH"):
         return
     print("bark 服务启动")
 
-    if push_config.get("BARK_PUSH").startswith("http"):
-        url = f'{push_config.get("BARK_PUSH")}'
+    if config.get("BARK_PUSH").startswith("http"):
+        url = f'{config.get("BARK_PUSH")}'
     else:
-        url = f'https://api.day.app/{push_config.get("BARK_PUSH")}'
+        url = f'https://api.day.app/{config.get("BARK_PUSH")}'
 
     bark_params = {
         "BARK_ARCHIVE": "isArchive",
@@ -203,22 +269,22 @@ def bark(title: str, content: str) -> None:
         and pairs[0] != "BARK_PUSH"
         and pairs[1]
         and bark_params.get(pairs[0]),
-        push_config.items(),
+        config.items(),
     ):
         data[bark_params.get(pair[0])] = pair[1]
     headers = {"Content-Type": "application/json;charset=utf-8"}
     response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
+        url=url, data=json.dumps(data), headers=headers, timeout=_request_timeout(config)
     ).json()
 
     if response["code"] == 200:
         print("bark 推送成功！")
     else:
-        print("bark 推送失败！")
+        raise NotifyError("bark 推送失败！")
 
 
 @channel("console")
-def console(title: str, content: str) -> None:
+def console(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 控制台 推送消息。
     """
@@ -226,209 +292,209 @@ def console(title: str, content: str) -> None:
 
 
 @channel("dingding")
-def dingding_bot(title: str, content: str) -> None:
+def dingding_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 钉钉机器人 推送消息。
     """
-    if not push_config.get("DD_BOT_SECRET") or not push_config.get("DD_BOT_TOKEN"):
+    if not config.get("DD_BOT_SECRET") or not config.get("DD_BOT_TOKEN"):
         return
     print("钉钉机器人 服务启动")
 
     timestamp = str(round(time.time() * 1000))
-    secret_enc = push_config.get("DD_BOT_SECRET").encode("utf-8")
-    string_to_sign = "{}\n{}".format(timestamp, push_config.get("DD_BOT_SECRET"))
+    secret_enc = config.get("DD_BOT_SECRET").encode("utf-8")
+    string_to_sign = "{}\n{}".format(timestamp, config.get("DD_BOT_SECRET"))
     string_to_sign_enc = string_to_sign.encode("utf-8")
     hmac_code = hmac.new(
         secret_enc, string_to_sign_enc, digestmod=hashlib.sha256
     ).digest()
     sign = urllib.parse.quote_plus(base64.b64encode(hmac_code))
-    url = f'https://oapi.dingtalk.com/robot/send?access_token={push_config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
+    url = f'https://oapi.dingtalk.com/robot/send?access_token={config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
     response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
+        url=url, data=json.dumps(data), headers=headers, timeout=_request_timeout(config)
     ).json()
 
     if not response["errcode"]:
         print("钉钉机器人 推送成功！")
     else:
-        print("钉钉机器人 推送失败！")
+        raise NotifyError("钉钉机器人 推送失败！")
 
 
 @channel("feishu")
-def feishu_bot(title: str, content: str) -> None:
+def feishu_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 飞书机器人 推送消息。
     """
-    if not push_config.get("FSKEY"):
+    if not config.get("FSKEY"):
         return
     print("飞书 服务启动")
 
-    url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{push_config.get("FSKEY")}'
+    url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{config.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data)).json()
+    response = requests.post(url, data=json.dumps(data), timeout=_request_timeout(config)).json()
 
     if response.get("StatusCode") == 0 or response.get("code") == 0:
         print("飞书 推送成功！")
     else:
-        print("飞书 推送失败！错误信息如下：\n", response)
+        raise NotifyError(f"飞书 推送失败！错误信息如下：\n{response}")
 
 
 @channel("go_cqhttp")
-def go_cqhttp(title: str, content: str) -> None:
+def go_cqhttp(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 go_cqhttp 推送消息。
     """
-    if not push_config.get("GOBOT_URL") or not push_config.get("GOBOT_QQ"):
+    if not config.get("GOBOT_URL") or not config.get("GOBOT_QQ"):
         return
     print("go-cqhttp 服务启动")
 
-    url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url).json()
+    url = f'{config.get("GOBOT_URL")}?access_token={config.get("GOBOT_TOKEN")}&{config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
+    response = requests.get(url, timeout=_request_timeout(config)).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
     else:
-        print("go-cqhttp 推送失败！")
+        raise NotifyError("go-cqhttp 推送失败！")
 
 
 @channel("gotify")
-def gotify(title: str, content: str) -> None:
+def gotify(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 gotify 推送消息。
     """
-    if not push_config.get("GOTIFY_URL") or not push_config.get("GOTIFY_TOKEN"):
+    if not config.get("GOTIFY_URL") or not config.get("GOTIFY_TOKEN"):
         return
     print("gotify 服务启动")
 
-    url = f'{push_config.get("GOTIFY_URL")}/message?token={push_config.get("GOTIFY_TOKEN")}'
+    url = f'{config.get("GOTIFY_URL")}/message?token={config.get("GOTIFY_TOKEN")}'
     data = {
         "title": title,
         "message": content,
-        "priority": push_config.get("GOTIFY_PRIORITY"),
+        "priority": config.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data).json()
+    response = requests.post(url, data=data, timeout=_request_timeout(config)).json()
 
     if response.get("id"):
         print("gotify 推送成功！")
     else:
-        print("gotify 推送失败！")
+        raise NotifyError("gotify 推送失败！")
 
 
 @channel("igot")
-def iGot(title: str, content: str) -> None:
+def iGot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 iGot 推送消息。
     """
-    if not push_config.get("IGOT_PUSH_KEY"):
+    if not config.get("IGOT_PUSH_KEY"):
         return
     print("iGot 服务启动")
 
-    url = f'https://push.hellyw.com/{push_config.get("IGOT_PUSH_KEY")}'
+    url = f'https://push.hellyw.com/{config.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers).json()
+    response = requests.post(url, data=data, headers=headers, timeout=_request_timeout(config)).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
     else:
-        print(f'iGot 推送失败！{response["errMsg"]}')
+        raise NotifyError(f'iGot 推送失败！{response["errMsg"]}')
 
 
 @channel("serverj")
-def serverJ(title: str, content: str) -> None:
+def serverJ(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 serverJ 推送消息。
     """
-    if not push_config.get("PUSH_KEY"):
+    if not config.get("PUSH_KEY"):
         return
     print("serverJ 服务启动")
 
     data = {"text": title, "desp": content.replace("\n", "\n\n")}
 
-    match = re.match(r"sctp(\d+)t", push_config.get("PUSH_KEY"))
+    match = re.match(r"sctp(\d+)t", config.get("PUSH_KEY"))
     if match:
         num = match.group(1)
-        url = f'https://{num}.push.ft07.com/send/{push_config.get("PUSH_KEY")}.send'
+        url = f'https://{num}.push.ft07.com/send/{config.get("PUSH_KEY")}.send'
     else:
-        url = f'https://sctapi.ftqq.com/{push_config.get("PUSH_KEY")}.send'
+        url = f'https://sctapi.ftqq.com/{config.get("PUSH_KEY")}.send'
 
-    response = requests.post(url, data=data).json()
+    response = requests.post(url, data=data, timeout=_request_timeout(config)).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
     else:
-        print(f'serverJ 推送失败！错误码：{response["message"]}')
+        raise NotifyError(f'serverJ 推送失败！错误码：{response["message"]}')
 
 
 @channel("pushdeer")
-def pushdeer(title: str, content: str) -> None:
+def pushdeer(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过PushDeer 推送消息
     """
-    if not push_config.get("DEER_KEY"):
+    if not config.get("DEER_KEY"):
         return
     print("PushDeer 服务启动")
     data = {
         "text": title,
         "desp": content,
         "type": "markdown",
-        "pushkey": push_config.get("DEER_KEY"),
+        "pushkey": config.get("DEER_KEY"),
     }
     url = "https://api2.pushdeer.com/message/push"
-    if push_config.get("DEER_URL"):
-        url = push_config.get("DEER_URL")
+    if config.get("DEER_URL"):
+        url = config.get("DEER_URL")
 
-    response = requests.post(url, data=data).json()
+    response = requests.post(url, data=data, timeout=_request_timeout(config)).json()
 
     if len(response.get("content").get("result")) > 0:
         print("PushDeer 推送成功！")
     else:
-        print("PushDeer 推送失败！错误信息：", response)
+        raise NotifyError(f"PushDeer 推送失败！错误信息：{response}")
 
 
 @channel("chat")
-def chat(title: str, content: str) -> None:
+def chat(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过Chat 推送消息
     """
-    if not push_config.get("CHAT_URL") or not push_config.get("CHAT_TOKEN"):
+    if not config.get("CHAT_URL") or not config.get("CHAT_TOKEN"):
         return
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
-    url = push_config.get("CHAT_URL") + push_config.get("CHAT_TOKEN")
-    response = requests.post(url, data=data)
+    url = config.get("CHAT_URL") + config.get("CHAT_TOKEN")
+    response = requests.post(url, data=data, timeout=_request_timeout(config))
 
     if response.status_code == 200:
         print("Chat 推送成功！")
     else:
-        print("Chat 推送失败！错误信息：", response)
+        raise NotifyError(f"Chat 推送失败！错误信息：{response}")
 
 
 @channel("pushplus")
-def pushplus_bot(title: str, content: str) -> None:
+def pushplus_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 pushplus 推送消息。
     """
-    if not push_config.get("PUSH_PLUS_TOKEN"):
+    if not config.get("PUSH_PLUS_TOKEN"):
         return
     print("PUSHPLUS 服务启动")
 
     url = "https://www.pushplus.plus/send"
     data = {
-        "token": push_config.get("PUSH_PLUS_TOKEN"),
+        "token": config.get("PUSH_PLUS_TOKEN"),
         "title": title,
         "content": content,
-        "topic": push_config.get("PUSH_PLUS_USER"),
-        "template": push_config.get("PUSH_PLUS_TEMPLATE"),
-        "channel": push_config.get("PUSH_PLUS_CHANNEL"),
-        "webhook": push_config.get("PUSH_PLUS_WEBHOOK"),
-        "callbackUrl": push_config.get("PUSH_PLUS_CALLBACKURL"),
-        "to": push_config.get("PUSH_PLUS_TO"),
+        "topic": config.get("PUSH_PLUS_USER"),
+        "template": config.get("PUSH_PLUS_TEMPLATE"),
+        "channel": config.get("PUSH_PLUS_CHANNEL"),
+        "webhook": config.get("PUSH_PLUS_WEBHOOK"),
+        "callbackUrl": config.get("PUSH_PLUS_CALLBACKURL"),
+        "to": config.get("PUSH_PLUS_TO"),
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = requests.post(url=url, data=body, headers=headers, timeout=_request_timeout(config)).json()
 
     code = response["code"]
     if code == 200:
@@ -437,26 +503,26 @@ def pushplus_bot(title: str, content: str) -> None:
             "注意：请求成功并不代表推送成功，如未收到消息，请到pushplus官网使用流水号查询推送最终结果"
         )
     elif code == 900 or code == 903 or code == 905 or code == 999:
-        print(response["msg"])
+        raise NotifyError(f"PUSHPLUS 推送失败！{response['msg']}")
 
     else:
         url_old = "http://pushplus.hxtrip.com/send"
         headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers).json()
+        response = requests.post(url=url_old, data=body, headers=headers, timeout=_request_timeout(config)).json()
 
         if response["code"] == 200:
             print("PUSHPLUS(hxtrip) 推送成功！")
 
         else:
-            print("PUSHPLUS 推送失败！")
+            raise NotifyError("PUSHPLUS 推送失败！")
 
 
 @channel("weplus")
-def weplus_bot(title: str, content: str) -> None:
+def weplus_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 微加机器人 推送消息。
     """
-    if not push_config.get("WE_PLUS_BOT_TOKEN"):
+    if not config.get("WE_PLUS_BOT_TOKEN"):
         return
     print("微加机器人 服务启动")
 
@@ -466,53 +532,52 @@ def weplus_bot(title: str, content: str) -> None:
 
     url = "https://www.weplusbot.com/send"
     data = {
-        "token": push_config.get("WE_PLUS_BOT_TOKEN"),
+        "token": config.get("WE_PLUS_BOT_TOKEN"),
         "title": title,
         "content": content,
         "template": template,
-        "receiver": push_config.get("WE_PLUS_BOT_RECEIVER"),
-        "version": push_config.get("WE_PLUS_BOT_VERSION"),
+        "receiver": config.get("WE_PLUS_BOT_RECEIVER"),
+        "version": config.get("WE_PLUS_BOT_VERSION"),
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = requests.post(url=url, data=body, headers=headers, timeout=_request_timeout(config)).json()
 
     if response["code"] == 200:
         print("微加机器人 推送成功！")
     else:
-        print("微加机器人 推送失败！")
+        raise NotifyError("微加机器人 推送失败！")
 
 
 @channel("qmsg")
-def qmsg_bot(title: str, content: str) -> None:
+def qmsg_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 qmsg 推送消息。
     """
-    if not push_config.get("QMSG_KEY") or not push_config.get("QMSG_TYPE"):
+    if not config.get("QMSG_KEY") or not config.get("QMSG_TYPE"):
         return
     print("qmsg 服务启动")
 
-    url = f'https://qmsg.zendee.cn/{push_config.get("QMSG_TYPE")}/{push_config.get("QMSG_KEY")}'
+    url = f'https://qmsg.zendee.cn/{config.get("QMSG_TYPE")}/{config.get("QMSG_KEY")}'
     payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload).json()
+    response = requests.post(url=url, params=payload, timeout=_request_timeout(config)).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
     else:
-        print(f'qmsg 推送失败！{response["reason"]}')
+        raise NotifyError(f'qmsg 推送失败！{response["reason"]}')
 
 
 @channel("wecom_app")
-def wecom_app(title: str, content: str) -> None:
+def wecom_app(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 企业微信 APP 推送消息。
     """
-    if not push_config.get("QYWX_AM"):
+    if not config.get("QYWX_AM"):
         return
-    QYWX_AM_AY = re.split(",", push_config.get("QYWX_AM"))
+    QYWX_AM_AY = re.split(",", config.get("QYWX_AM"))
     if 4 < len(QYWX_AM_AY) > 5:
-        print("QYWX_AM 设置错误!!")
-        return
+        raise NotifyError("QYWX_AM 设置错误!!")
     print("企业微信 APP 服务启动")
 
     corpid = QYWX_AM_AY[0]
@@ -523,7 +588,7 @@ def wecom_app(title: str, content: str) -> None:
         media_id = QYWX_AM_AY[4]
     except IndexError:
         media_id = ""
-    wx = WeCom(corpid, corpsecret, agentid)
+    wx = WeCom(corpid, corpsecret, agentid, config.get("QYWX_ORIGIN"), _request_timeout(config))
     # 如果没有配置 media_id 默认就以 text 方式发送
     if not media_id:
         message = title + "\n\n" + content
@@ -534,17 +599,16 @@ def wecom_app(title: str, content: str) -> None:
     if response == "ok":
         print("企业微信推送成功！")
     else:
-        print("企业微信推送失败！错误信息如下：\n", response)
+        raise NotifyError(f"企业微信推送失败！错误信息如下：\n{response}")
 
 
 class WeCom:
-    def __init__(self, corpid, corpsecret, agentid):
+    def __init__(self, corpid, corpsecret, agentid, origin=None, timeout=15):
         self.CORPID = corpid
         self.CORPSECRET = corpsecret
         self.AGENTID = agentid
-        self.ORIGIN = "https://qyapi.weixin.qq.com"
-        if push_config.get("QYWX_ORIGIN"):
-            self.ORIGIN = push_config.get("QYWX_ORIGIN")
+        self.ORIGIN = origin or "https://qyapi.weixin.qq.com"
+        self.TIMEOUT = timeout
 
     def get_access_token(self):
         url = f"{self.ORIGIN}/cgi-bin/gettoken"
@@ -552,7 +616,7 @@ class WeCom:
             "corpid": self.CORPID,
             "corpsecret": self.CORPSECRET,
         }
-        req = requests.post(url, params=values)
+        req = requests.post(url, params=values, timeout=self.TIMEOUT)
         data = json.loads(req.text)
         return data["access_token"]
 
@@ -568,7 +632,7 @@ class WeCom:
             "safe": "0",
         }
         send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
+        respone = requests.post(send_url, send_msges, timeout=self.TIMEOUT)
         respone = respone.json()
         return respone["errmsg"]
 
@@ -594,130 +658,126 @@ class WeCom:
             },
         }
         send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
+        respone = requests.post(send_url, send_msges, timeout=self.TIMEOUT)
         respone = respone.json()
         return respone["errmsg"]
 
 
 @channel("wecom_bot")
-def wecom_bot(title: str, content: str) -> None:
+def wecom_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 企业微信机器人 推送消息。
     """
-    if not push_config.get("QYWX_KEY"):
+    if not config.get("QYWX_KEY"):
         return
     print("企业微信机器人服务启动")
 
     origin = "https://qyapi.weixin.qq.com"
-    if push_config.get("QYWX_ORIGIN"):
-        origin = push_config.get("QYWX_ORIGIN")
+    if config.get("QYWX_ORIGIN"):
+        origin = config.get("QYWX_ORIGIN")
 
-    url = f"{origin}/cgi-bin/webhook/send?key={push_config.get('QYWX_KEY')}"
+    url = f"{origin}/cgi-bin/webhook/send?key={config.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
     response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
+        url=url, data=json.dumps(data), headers=headers, timeout=_request_timeout(config)
     ).json()
 
     if response["errcode"] == 0:
         print("企业微信机器人推送成功！")
     else:
-        print("企业微信机器人推送失败！")
+        raise NotifyError("企业微信机器人推送失败！")
 
 
 @channel("telegram")
-def telegram_bot(title: str, content: str) -> None:
+def telegram_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 telegram 机器人 推送消息。
     """
-    if not push_config.get("TG_BOT_TOKEN") or not push_config.get("TG_USER_ID"):
+    if not config.get("TG_BOT_TOKEN") or not config.get("TG_USER_ID"):
         return
     print("tg 服务启动")
 
-    if push_config.get("TG_API_HOST"):
-        url = f"{push_config.get('TG_API_HOST')}/bot{push_config.get('TG_BOT_TOKEN')}/sendMessage"
+    if config.get("TG_API_HOST"):
+        url = f"{config.get('TG_API_HOST')}/bot{config.get('TG_BOT_TOKEN')}/sendMessage"
     else:
         url = (
-            f"https://api.telegram.org/bot{push_config.get('TG_BOT_TOKEN')}/sendMessage"
+            f"https://api.telegram.org/bot{config.get('TG_BOT_TOKEN')}/sendMessage"
         )
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
     payload = {
-        "chat_id": str(push_config.get("TG_USER_ID")),
+        "chat_id": str(config.get("TG_USER_ID")),
         "text": f"{title}\n\n{content}",
         "disable_web_page_preview": "true",
     }
     proxies = None
-    if push_config.get("TG_PROXY_HOST") and push_config.get("TG_PROXY_PORT"):
-        if push_config.get("TG_PROXY_AUTH") is not None and "@" not in push_config.get(
-            "TG_PROXY_HOST"
-        ):
-            push_config["TG_PROXY_HOST"] = (
-                push_config.get("TG_PROXY_AUTH")
-                + "@"
-                + push_config.get("TG_PROXY_HOST")
-            )
+    if config.get("TG_PROXY_HOST") and config.get("TG_PROXY_PORT"):
+        proxy_host = config.get("TG_PROXY_HOST")
+        if config.get("TG_PROXY_AUTH") is not None and "@" not in proxy_host:
+            proxy_host = config.get("TG_PROXY_AUTH") + "@" + proxy_host
         proxyStr = "http://{}:{}".format(
-            push_config.get("TG_PROXY_HOST"), push_config.get("TG_PROXY_PORT")
+            proxy_host, config.get("TG_PROXY_PORT")
         )
         proxies = {"http": proxyStr, "https": proxyStr}
     response = requests.post(
-        url=url, headers=headers, params=payload, proxies=proxies
+        url=url, headers=headers, params=payload, proxies=proxies,
+        timeout=_request_timeout(config),
     ).json()
 
     if response["ok"]:
         print("tg 推送成功！")
     else:
-        print("tg 推送失败！")
+        raise NotifyError("tg 推送失败！")
 
 
 @channel("aibotk")
-def aibotk(title: str, content: str) -> None:
+def aibotk(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 智能微秘书 推送消息。
     """
     if (
-        not push_config.get("AIBOTK_KEY")
-        or not push_config.get("AIBOTK_TYPE")
-        or not push_config.get("AIBOTK_NAME")
+        not config.get("AIBOTK_KEY")
+        or not config.get("AIBOTK_TYPE")
+        or not config.get("AIBOTK_NAME")
     ):
         return
     print("智能微秘书 服务启动")
 
-    if push_config.get("AIBOTK_TYPE") == "room":
+    if config.get("AIBOTK_TYPE") == "room":
         url = "https://api-bot.aibotk.com/openapi/v1/chat/room"
         data = {
-            "apiKey": push_config.get("AIBOTK_KEY"),
-            "roomName": push_config.get("AIBOTK_NAME"),
+            "apiKey": config.get("AIBOTK_KEY"),
+            "roomName": config.get("AIBOTK_NAME"),
             "message": {"type": 1, "content": f"【青龙快讯】\n\n{title}\n{content}"},
         }
     else:
         url = "https://api-bot.aibotk.com/openapi/v1/chat/contact"
         data = {
-            "apiKey": push_config.get("AIBOTK_KEY"),
-            "name": push_config.get("AIBOTK_NAME"),
+            "apiKey": config.get("AIBOTK_KEY"),
+            "name": config.get("AIBOTK_NAME"),
             "message": {"type": 1, "content": f"【青龙快讯】\n\n{title}\n{content}"},
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = requests.post(url=url, data=body, headers=headers, timeout=_request_timeout(config)).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
     else:
-        print(f'智能微秘书 推送失败！{response["error"]}')
+        raise NotifyError(f'智能微秘书 推送失败！{response["error"]}')
 
 
 @channel("smtp")
-def smtp(title: str, content: str) -> None:
+def smtp(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 SMTP 邮件 推送消息。
     """
     if (
-        not push_config.get("SMTP_SERVER")
-        or not push_config.get("SMTP_SSL")
-        or not push_config.get("SMTP_EMAIL")
-        or not push_config.get("SMTP_PASSWORD")
-        or not push_config.get("SMTP_NAME")
+        not config.get("SMTP_SERVER")
+        or not config.get("SMTP_SSL")
+        or not config.get("SMTP_EMAIL")
+        or not config.get("SMTP_PASSWORD")
+        or not config.get("SMTP_NAME")
     ):
         return
     print("SMTP 邮件 服务启动")
@@ -725,90 +785,91 @@ def smtp(title: str, content: str) -> None:
     message = MIMEText(content, "plain", "utf-8")
     message["From"] = formataddr(
         (
-            Header(push_config.get("SMTP_NAME"), "utf-8").encode(),
-            push_config.get("SMTP_EMAIL"),
+            Header(config.get("SMTP_NAME"), "utf-8").encode(),
+            config.get("SMTP_EMAIL"),
         )
     )
     message["To"] = formataddr(
         (
-            Header(push_config.get("SMTP_NAME"), "utf-8").encode(),
-            push_config.get("SMTP_EMAIL"),
+            Header(config.get("SMTP_NAME"), "utf-8").encode(),
+            config.get("SMTP_EMAIL"),
         )
     )
     message["Subject"] = Header(title, "utf-8")
 
     try:
         smtp_server = (
-            smtplib.SMTP_SSL(push_config.get("SMTP_SERVER"))
-            if push_config.get("SMTP_SSL") == "true"
-            else smtplib.SMTP(push_config.get("SMTP_SERVER"))
+            smtplib.SMTP_SSL(config.get("SMTP_SERVER"), timeout=_request_timeout(config))
+            if config.get("SMTP_SSL") == "true"
+            else smtplib.SMTP(config.get("SMTP_SERVER"), timeout=_request_timeout(config))
         )
         smtp_server.login(
-            push_config.get("SMTP_EMAIL"), push_config.get("SMTP_PASSWORD")
+            config.get("SMTP_EMAIL"), config.get("SMTP_PASSWORD")
         )
         smtp_server.sendmail(
-            push_config.get("SMTP_EMAIL"),
-            push_config.get("SMTP_EMAIL"),
+            config.get("SMTP_EMAIL"),
+            config.get("SMTP_EMAIL"),
             message.as_bytes(),
         )
         smtp_server.close()
         print("SMTP 邮件 推送成功！")
     except Exception as e:
-        print(f"SMTP 邮件 推送失败！{e}")
+        raise NotifyError(f"SMTP 邮件 推送失败！{e}") from e
 
 
 @channel("pushme")
-def pushme(title: str, content: str) -> None:
+def pushme(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 PushMe 推送消息。
     """
-    if not push_config.get("PUSHME_KEY"):
+    if not config.get("PUSHME_KEY"):
         return
     print("PushMe 服务启动")
 
     url = (
-        push_config.get("PUSHME_URL")
-        if push_config.get("PUSHME_URL")
+        config.get("PUSHME_URL")
+        if config.get("PUSHME_URL")
         else "https://push.i-i.me/"
     )
     data = {
-        "push_key": push_config.get("PUSHME_KEY"),
+        "push_key": config.get("PUSHME_KEY"),
         "title": title,
         "content": content,
-        "date": push_config.get("date") if push_config.get("date") else "",
-        "type": push_config.get("type") if push_config.get("type") else "",
+        "date": config.get("date") if config.get("date") else "",
+        "type": config.get("type") if config.get("type") else "",
     }
-    response = requests.post(url, data=data)
+    response = requests.post(url, data=data, timeout=_request_timeout(config))
 
     if response.status_code == 200 and response.text == "success":
         print("PushMe 推送成功！")
     else:
-        print(f"PushMe 推送失败！{response.status_code} {response.text}")
+        raise NotifyError(f"PushMe 推送失败！{response.status_code} {response.text}")
 
 
 @channel("chronocat")
-def chronocat(title: str, content: str) -> None:
+def chronocat(title: str, content: str, config: "NotifyConfig") -> None:
     """
     使用 CHRONOCAT 推送消息。
     """
     if (
-        not push_config.get("CHRONOCAT_URL")
-        or not push_config.get("CHRONOCAT_QQ")
-        or not push_config.get("CHRONOCAT_TOKEN")
+        not config.get("CHRONOCAT_URL")
+        or not config.get("CHRONOCAT_QQ")
+        or not config.get("CHRONOCAT_TOKEN")
     ):
         return
 
     print("CHRONOCAT 服务启动")
 
-    user_ids = re.findall(r"user_id=(\d+)", push_config.get("CHRONOCAT_QQ"))
-    group_ids = re.findall(r"group_id=(\d+)", push_config.get("CHRONOCAT_QQ"))
+    user_ids = re.findall(r"user_id=(\d+)", config.get("CHRONOCAT_QQ"))
+    group_ids = re.findall(r"group_id=(\d+)", config.get("CHRONOCAT_QQ"))
 
-    url = f'{push_config.get("CHRONOCAT_URL")}/api/message/send'
+    url = f'{config.get("CHRONOCAT_URL")}/api/message/send'
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f'Bearer {push_config.get("CHRONOCAT_TOKEN")}',
+        "Authorization": f'Bearer {config.get("CHRONOCAT_TOKEN")}',
     }
 
+    failed_ids = []
     for chat_type, ids in [(1, user_ids), (2, group_ids)]:
         if not ids:
             continue
@@ -822,21 +883,20 @@ def chronocat(title: str, content: str) -> None:
                     }
                 ],
             }
-            response = requests.post(url, headers=headers, data=json.dumps(data))
+            response = requests.post(url, headers=headers, data=json.dumps(data), timeout=_request_timeout(config))
             if response.status_code == 200:
                 if chat_type == 1:
                     print(f"QQ个人消息:{ids}推送成功！")
                 else:
                     print(f"QQ群消息:{ids}推送成功！")
             else:
-                if chat_type == 1:
-                    print(f"QQ个人消息:{ids}推送失败！")
-                else:
-                    print(f"QQ群消息:{ids}推送失败！")
+                failed_ids.append(chat_id)
+    if failed_ids:
+        raise NotifyError(f"QQ消息:{failed_ids}推送失败！")
 
 
 @channel("ntfy")
-def ntfy(title: str, content: str) -> None:
+def ntfy(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 Ntfy 推送消息
     """
@@ -847,14 +907,14 @@ def ntfy(title: str, content: str) -> None:
         encoded_str = encoded_bytes.decode("utf-8")
         return f"=?utf-8?B?{encoded_str}?="
 
-    if not push_config.get("NTFY_TOPIC"):
+    if not config.get("NTFY_TOPIC"):
         return
     print("ntfy 服务启动")
     priority = "3"
-    if not push_config.get("NTFY_PRIORITY"):
+    if not config.get("NTFY_PRIORITY"):
         print("ntfy 服务的NTFY_PRIORITY 未设置!!默认设置为3")
     else:
-        priority = push_config.get("NTFY_PRIORITY")
+        priority = config.get("NTFY_PRIORITY")
 
     # 使用 RFC 2047 编码 title
     encoded_title = encode_rfc2047(title)
@@ -862,16 +922,16 @@ def ntfy(title: str, content: str) -> None:
     data = content.encode(encoding="utf-8")
     headers = {"Title": encoded_title, "Priority": priority}  # 使用编码后的 title
 
-    url = push_config.get("NTFY_URL") + "/" + push_config.get("NTFY_TOPIC")
-    response = requests.post(url, data=data, headers=headers)
+    url = config.get("NTFY_URL") + "/" + config.get("NTFY_TOPIC")
+    response = requests.post(url, data=data, headers=headers, timeout=_request_timeout(config))
     if response.status_code == 200:  # 使用 response.status_code 进行检查
         print("Ntfy 推送成功！")
     else:
-        print("Ntfy 推送失败！错误信息：", response.text)
+        raise NotifyError(f"Ntfy 推送失败！错误信息：{response.text}")
 
 
 @channel("wxpusher")
-def wxpusher_bot(title: str, content: str) -> None:
+def wxpusher_bot(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 wxpusher 推送消息。
     支持的环境变量:
@@ -879,25 +939,25 @@ def wxpusher_bot(title: str, content: str) -> None:
     - WXPUSHER_TOPIC_IDS: 主题ID, 多个用英文分号;分隔
     - WXPUSHER_UIDS: 用户ID, 多个用英文分号;分隔
     """
-    if not push_config.get("WXPUSHER_APP_TOKEN"):
+    if not config.get("WXPUSHER_APP_TOKEN"):
         return
 
     url = "https://wxpusher.zjiecode.com/api/send/message"
 
     # 处理topic_ids和uids，将分号分隔的字符串转为数组
     topic_ids = []
-    if push_config.get("WXPUSHER_TOPIC_IDS"):
+    if config.get("WXPUSHER_TOPIC_IDS"):
         topic_ids = [
             int(id.strip())
-            for id in push_config.get("WXPUSHER_TOPIC_IDS").split(";")
+            for id in config.get("WXPUSHER_TOPIC_IDS").split(";")
             if id.strip()
         ]
 
     uids = []
-    if push_config.get("WXPUSHER_UIDS"):
+    if config.get("WXPUSHER_UIDS"):
         uids = [
             uid.strip()
-            for uid in push_config.get("WXPUSHER_UIDS").split(";")
+            for uid in config.get("WXPUSHER_UIDS").split(";")
             if uid.strip()
         ]
 
@@ -909,7 +969,7 @@ def wxpusher_bot(title: str, content: str) -> None:
     print("wxpusher 服务启动")
 
     data = {
-        "appToken": push_config.get("WXPUSHER_APP_TOKEN"),
+        "appToken": config.get("WXPUSHER_APP_TOKEN"),
         "content": f"<h1>{title}</h1><br/><div style='white-space: pre-wrap;'>{content}</div>",
         "summary": title,
         "contentType": 2,
@@ -919,12 +979,12 @@ def wxpusher_bot(title: str, content: str) -> None:
     }
 
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, json=data, headers=headers).json()
+    response = requests.post(url=url, json=data, headers=headers, timeout=_request_timeout(config)).json()
 
     if response.get("code") == 1000:
         print("wxpusher 推送成功！")
     else:
-        print(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
+        raise NotifyError(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
 
 
 def parse_headers(headers):
@@ -1001,24 +1061,23 @@ def parse_body(body, content_type, value_format_fn=None):
 
 
 @channel("webhook")
-def custom_notify(title: str, content: str) -> None:
+def custom_notify(title: str, content: str, config: "NotifyConfig") -> None:
     """
     通过 自定义通知 推送消息。
     """
-    if not push_config.get("WEBHOOK_URL") or not push_config.get("WEBHOOK_METHOD"):
+    if not config.get("WEBHOOK_URL") or not config.get("WEBHOOK_METHOD"):
         return
 
     print("自定义通知服务启动")
 
-    WEBHOOK_URL = push_config.get("WEBHOOK_URL")
-    WEBHOOK_METHOD = push_config.get("WEBHOOK_METHOD")
-    WEBHOOK_CONTENT_TYPE = push_config.get("WEBHOOK_CONTENT_TYPE")
-    WEBHOOK_BODY = push_config.get("WEBHOOK_BODY")
-    WEBHOOK_HEADERS = push_config.get("WEBHOOK_HEADERS")
+    WEBHOOK_URL = config.get("WEBHOOK_URL")
+    WEBHOOK_METHOD = config.get("WEBHOOK_METHOD")
+    WEBHOOK_CONTENT_TYPE = config.get("WEBHOOK_CONTENT_TYPE")
+    WEBHOOK_BODY = config.get("WEBHOOK_BODY")
+    WEBHOOK_HEADERS = config.get("WEBHOOK_HEADERS")
 
     if "$title" not in WEBHOOK_URL and "$title" not in WEBHOOK_BODY:
-        print("请求头或者请求体中必须包含 $title 和 $content")
-        return
+        raise NotifyError("请求头或者请求体中必须包含 $title 和 $content")
 
     headers = parse_headers(WEBHOOK_HEADERS)
     # 如未显式提供 Content-Type，则使用配置中的类型
@@ -1036,123 +1095,150 @@ def custom_notify(title: str, content: str) -> None:
         "$title", urllib.parse.quote_plus(title)
     ).replace("$content", urllib.parse.quote_plus(content))
     response = requests.request(
-        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, data=body
+        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=_request_timeout(config), data=body
     )
 
     if response.status_code == 200:
         print("自定义通知推送成功！")
     else:
-        print(f"自定义通知推送失败！{response.status_code} {response.text}")
+        raise NotifyError(f"自定义通知推送失败！{response.status_code} {response.text}")
 
 
-def one() -> str:
+def one(timeout: float = 3) -> str:
     """
-    获取一条一言。
+    获取一条一言，超时或失败时返回空字符串（跳过一言，不阻塞推送）。
     :return:
     """
     url = "https://v1.hitokoto.cn/"
-    res = requests.get(url).json()
-    return res["hitokoto"] + "    ----" + res["from"]
-
-
-def add_notify_function():
-    notify_function = []
-    if push_config.get("BARK_PUSH"):
-        notify_function.append(bark)
-    if push_config.get("CONSOLE"):
-        notify_function.append(console)
-    if push_config.get("DD_BOT_TOKEN") and push_config.get("DD_BOT_SECRET"):
-        notify_function.append(dingding_bot)
-    if push_config.get("FSKEY"):
-        notify_function.append(feishu_bot)
-    if push_config.get("GOBOT_URL") and push_config.get("GOBOT_QQ"):
-        notify_function.append(go_cqhttp)
-    if push_config.get("GOTIFY_URL") and push_config.get("GOTIFY_TOKEN"):
-        notify_function.append(gotify)
-    if push_config.get("IGOT_PUSH_KEY"):
-        notify_function.append(iGot)
-    if push_config.get("PUSH_KEY"):
-        notify_function.append(serverJ)
-    if push_config.get("DEER_KEY"):
-        notify_function.append(pushdeer)
-    if push_config.get("CHAT_URL") and push_config.get("CHAT_TOKEN"):
-        notify_function.append(chat)
-    if push_config.get("PUSH_PLUS_TOKEN"):
-        notify_function.append(pushplus_bot)
-    if push_config.get("WE_PLUS_BOT_TOKEN"):
-        notify_function.append(weplus_bot)
-    if push_config.get("QMSG_KEY") and push_config.get("QMSG_TYPE"):
-        notify_function.append(qmsg_bot)
-    if push_config.get("QYWX_AM"):
-        notify_function.append(wecom_app)
-    if push_config.get("QYWX_KEY"):
-        notify_function.append(wecom_bot)
-    if push_config.get("TG_BOT_TOKEN") and push_config.get("TG_USER_ID"):
-        notify_function.append(telegram_bot)
-    if (
-        push_config.get("AIBOTK_KEY")
-        and push_config.get("AIBOTK_TYPE")
-        and push_config.get("AIBOTK_NAME")
-    ):
-        notify_function.append(aibotk)
-    if (
-        push_config.get("SMTP_SERVER")
-        and push_config.get("SMTP_SSL")
-        and push_config.get("SMTP_EMAIL")
-        and push_config.get("SMTP_PASSWORD")
-        and push_config.get("SMTP_NAME")
-    ):
-        notify_function.append(smtp)
-    if push_config.get("PUSHME_KEY"):
-        notify_function.append(pushme)
-    if (
-        push_config.get("CHRONOCAT_URL")
-        and push_config.get("CHRONOCAT_QQ")
-        and push_config.get("CHRONOCAT_TOKEN")
-    ):
-        notify_function.append(chronocat)
-    if push_config.get("WEBHOOK_URL") and push_config.get("WEBHOOK_METHOD"):
-        notify_function.append(custom_notify)
-    if push_config.get("NTFY_TOPIC"):
-        notify_function.append(ntfy)
-    if push_config.get("WXPUSHER_APP_TOKEN") and (
-        push_config.get("WXPUSHER_TOPIC_IDS") or push_config.get("WXPUSHER_UIDS")
-    ):
-        notify_function.append(wxpusher_bot)
+    try:
+        res = requests.get(url, timeout=timeout).json()
+        return res["hitokoto"] + "    ----" + res["from"]
+    except Exception as e:
+        logger.warning(f"获取一言失败，已跳过: {e}")
+        return ""
+
+
+# 渠道启用规则：(推送函数, 必需配置项)；必需项为元组时表示其中任一项存在即可
+_CHANNEL_RULES = (
+    (bark, ("BARK_PUSH",)),
+    (console, ("CONSOLE",)),
+    (dingding_bot, ("DD_BOT_TOKEN", "DD_BOT_SECRET")),
+    (feishu_bot, ("FSKEY",)),
+    (go_cqhttp, ("GOBOT_URL", "GOBOT_QQ")),
+    (gotify, ("GOTIFY_URL", "GOTIFY_TOKEN")),
+    (iGot, ("IGOT_PUSH_KEY",)),
+    (serverJ, ("PUSH_KEY",)),
+    (pushdeer, ("DEER_KEY",)),
+    (chat, ("CHAT_URL", "CHAT_TOKEN")),
+    (pushplus_bot, ("PUSH_PLUS_TOKEN",)),
+    (weplus_bot, ("WE_PLUS_BOT_TOKEN",)),
+    (qmsg_bot, ("QMSG_KEY", "QMSG_TYPE")),
+    (wecom_app, ("QYWX_AM",)),
+    (wecom_bot, ("QYWX_KEY",)),
+    (telegram_bot, ("TG_BOT_TOKEN", "TG_USER_ID")),
+    (aibotk, ("AIBOTK_KEY", "AIBOTK_TYPE", "AIBOTK_NAME")),
+    (smtp, ("SMTP_SERVER", "SMTP_SSL", "SMTP_EMAIL", "SMTP_PASSWORD", "SMTP_NAME")),
+    (pushme, ("PUSHME_KEY",)),
+    (chronocat, ("CHRONOCAT_URL", "CHRONOCAT_QQ", "CHRONOCAT_TOKEN")),
+    (custom_notify, ("WEBHOOK_URL", "WEBHOOK_METHOD")),
+    (ntfy, ("NTFY_TOPIC",)),
+    (wxpusher_bot, ("WXPUSHER_APP_TOKEN", ("WXPUSHER_TOPIC_IDS", "WXPUSHER_UIDS"))),
+)
+
+# 渠道选择结果缓存：配置版本 -> 推送函数元组
+_channel_cache = {}
+_channel_cache_lock = threading.Lock()
+_CHANNEL_CACHE_SIZE = 64
+
+
+def _rule_matched(config: Mapping, keys) -> bool:
+    for key in keys:
+        if isinstance(key, tuple):
+            if not any(config.get(k) for k in key):
+                return False
+        elif not config.get(key):
+            return False
+    return True
+
+
+def add_notify_function(config: NotifyConfig = None):
+    """按配置选择启用的推送渠道，结果按配置版本缓存"""
+    if config is None:
+        config = default_config()
+    with _channel_cache_lock:
+        cached = _channel_cache.get(config.version)
+    if cached is not None:
+        return list(cached)
+
+    notify_function = [func for func, keys in _CHANNEL_RULES if _rule_matched(config, keys)]
+    with _channel_cache_lock:
+        if len(_channel_cache) >= _CHANNEL_CACHE_SIZE:
+            _channel_cache.clear()
+        _channel_cache[config.version] = tuple(notify_function)
     if not notify_function:
         print(f"无推送渠道，请检查通知变量是否正确")
     return notify_function
 
 
-def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
-    if kwargs:
-        global push_config
-        if ignore_default_config:
-            push_config = kwargs  # 清空从环境变量获取的配置
-        else:
-            push_config.update(kwargs)
+def send(title: str, content: str, ignore_default_config: bool = False, timeout: float = None,
+         config: NotifyConfig = None, **kwargs):
+    """
+    并发推送到所有已配置渠道。
+
+    :param config: 本次推送使用的不可变配置；未提供时由 push_config 与 kwargs 构建，
+                   ignore_default_config 为 True 时仅使用 kwargs
+    :param timeout: 每个渠道的最长等待时间（秒），同时作为渠道请求超时；None 表示一直等待
+    :return: 推送失败（渠道抛出异常）或超时的渠道名称列表
+    """
+    if config is None:
+        config = build_config(ignore_default_config, **kwargs)
+    # 渠道选择使用合并超时参数前的配置，复用该配置已缓存的渠道选择结果
+    channel_config = config
+    if timeout:
+        config = config.merge(REQUEST_TIMEOUT=timeout)
 
     if not content:
         print(f"{title} 推送内容为空！")
-        return
+        return []
 
     # 根据标题跳过一些消息推送，环境变量：SKIP_PUSH_TITLE 用回车分隔
     skipTitle = os.getenv("SKIP_PUSH_TITLE")
     if skipTitle:
         if title in re.split("\n", skipTitle):
             print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
-            return
+            return []
+
+    hitokoto = config.get("HITOKOTO")
+    if hitokoto != "false":
+        quote = one(timeout=float(config.get("HITOKOTO_TIMEOUT") or 3))
+        if quote:
+            content += "\n\n" + quote
 
-    hitokoto = push_config.get("HITOKOTO")
-    content += "\n\n" + one() if hitokoto != "false" else ""
+    notify_function = add_notify_function(channel_config)
+    failed = []
+
+    def run(mode):
+        try:
+            mode(title, content, config)
+        except NotifyError as e:
+            failed.append(mode.__name__)
+            logger.error(str(e))
+        except Exception as e:
+            failed.append(mode.__name__)
+            logger.error(f"{mode.__name__} 推送异常: {e}")
 
-    notify_function = add_notify_function()
     ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
+        threading.Thread(target=run, args=(mode,), name=mode.__name__, daemon=True)
         for mode in notify_function
     ]
     [t.start() for t in ts]
-    [t.join() for t in ts]
+    deadline = time.time() + timeout if timeout else None
+    for t in ts:
+        t.join(max(0, deadline - time.time()) if deadline else None)
+        if t.is_alive():
+            failed.append(t.name)
+            logger.warning(f"{t.name} 推送超时（{timeout}秒），已放弃等待")
+    return failed
 
 
 def main():
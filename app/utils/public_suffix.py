@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 随程序分发的公共后缀列表（https://publicsuffix.org/list/public_suffix_list.dat）
+DEFAULT_PSL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "public_suffix_list.dat")
+
+# 前缀树节点中的规则标记键（不会与域名标签冲突）
+_RULE = "\0rule"
+_EXCEPTION = "\0exception"
+
+
+class PublicSuffixList:
+    """
+    公共后缀列表匹配器：规则编译为按标签反转的前缀树，首次使用时才加载数据文件。
+
+    支持普通规则（co.jp）、通配规则（*.kawasaki.jp）与例外规则（!city.kawasaki.jp），
+    没有任何规则匹配时按默认规则 "*" 处理（最后一个标签为公共后缀）。
+    """
+
+    def __init__(self, path: str = DEFAULT_PSL_PATH):
+        self.path = path
+        self._trie: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        if self._trie is not None:
+            return self._trie
+        with self._lock:
+            if self._trie is not None:
+                return self._trie
+            trie: Dict[str, Any] = {}
+            count = 0
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line or line.startswith("//"):
+                            continue
+                        rule = line.split()[0].lower()
+                        self._add_rule(trie, rule)
+                        # 数据文件中的国际化域名为Unicode形式，同时登记Punycode形式
+                        try:
+                            ascii_rule = rule.encode("idna").decode("ascii")
+                        except UnicodeError:
+                            ascii_rule = rule
+                        if ascii_rule != rule:
+                            self._add_rule(trie, ascii_rule)
+                        count += 1
+                logger.info(f"已加载公共后缀列表，共 {count} 条规则")
+            except OSError as e:
+                logger.warning(f"读取公共后缀列表失败（{e}），按默认规则处理")
+            self._trie = trie
+            return trie
+
+    @staticmethod
+    def _add_rule(trie: Dict[str, Any], rule: str):
+        marker = _RULE
+        if rule.startswith("!"):
+            marker = _EXCEPTION
+            rule = rule[1:]
+        node = trie
+        for label in reversed(rule.split(".")):
+            node = node.setdefault(label, {})
+        node[marker] = True
+
+    def public_suffix_length(self, labels) -> int:
+        """返回公共后缀包含的标签数（labels 为按顺序排列的域名标签）"""
+        node = self._load()
+        suffix_length = 1
+        depth = 0
+        for label in reversed(labels):
+            if "*" in node:
+                # 通配规则：当前层级任意标签都属于公共后缀
+                suffix_length = max(suffix_length, depth + 1)
+            child = node.get(label)
+            if child is None:
+                break
+            node = child
+            depth += 1
+            if _EXCEPTION in node:
+                # 例外规则优先：公共后缀为该规则去掉最左侧标签
+                return depth - 1
+            if _RULE in node:
+                suffix_length = max(suffix_length, depth)
+        return suffix_length
+
+    def public_suffix(self, domain: str) -> str:
+        labels = _normalize(domain).split(".")
+        return ".".join(labels[-self.public_suffix_length(labels):])
+
+    def registrable_domain(self, domain: str) -> Optional[str]:
+        """
+        返回可注册域名（公共后缀 + 一级标签），例如 tracker.pt.example.co.jp -> example.co.jp。
+
+        域名本身就是公共后缀（或为空）时返回None。
+        """
+        domain = _normalize(domain)
+        if not domain:
+            return None
+        labels = domain.split(".")
+        suffix_length = self.public_suffix_length(labels)
+        if len(labels) <= suffix_length:
+            return None
+        return ".".join(labels[-(suffix_length + 1):])
+
+
+def _normalize(domain: str) -> str:
+    domain = (domain or "").strip().lower()
+    if ":" in domain:
+        domain = domain.split(":", 1)[0]
+    return domain.rstrip(".")
+
+
+# 全局公共后缀列表实例（延迟加载）
+public_suffix_list = PublicSuffixList()
+
+
+def registrable_domain(domain: str) -> Optional[str]:
+    return public_suffix_list.registrable_domain(domain)
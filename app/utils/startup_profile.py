@@ -0,0 +1,36 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """启动耗时记录：按阶段（模块导入、服务初始化）累计耗时，启动完成后输出一次报告"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def report(self, deferred: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """输出启动报告并返回各阶段耗时（毫秒）；deferred 为启动期间已被首次使用而创建的延迟服务"""
+        total = time.perf_counter() - self.started
+        stages = self.stages + [(f"延迟创建 {name}", seconds) for name, seconds in (deferred or {}).items()]
+        logger.info(f"[启动] 启动完成，总耗时 {total * 1000:.1f}ms")
+        for name, seconds in sorted(stages, key=lambda stage: stage[1], reverse=True):
+            logger.info(f"[启动]   {name}: {seconds * 1000:.1f}ms")
+        result = {name: round(seconds * 1000, 1) for name, seconds in stages}
+        result["total"] = round(total * 1000, 1)
+        return result
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture
+def make_hosts_manager(tmp_path, monkeypatch):
+    """在临时目录中创建演练模式的 HostsManager，所有域名均视为Cloudflare站点"""
+    monkeypatch.chdir(tmp_path)
+    from app.services.hosts_manager import HostsManager
+
+    def make(config=None):
+        manager = HostsManager(config or {})
+        manager.dry_run = True
+        manager.is_cloudflare_domain = lambda domain: True
+        return manager
+
+    return make
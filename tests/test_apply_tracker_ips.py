@@ -0,0 +1,44 @@
+import pytest
+
+
+@pytest.fixture
+def manager(make_hosts_manager, monkeypatch):
+    manager = make_hosts_manager({"trackers": [
+        {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+        {"domain": "b.example", "enable": True, "ip": "2.2.2.2"},
+        {"domain": "c.example", "enable": False, "ip": "1.1.1.1"},
+    ]})
+    manager.calls = {"write": 0, "update_hosts": 0}
+    merge_write_config = manager._merge_write_config
+
+    def counting_write(partial_update):
+        manager.calls["write"] += 1
+        merge_write_config(partial_update)
+
+    def counting_update_hosts():
+        manager.calls["update_hosts"] += 1
+        return True
+
+    monkeypatch.setattr(manager, "_merge_write_config", counting_write)
+    monkeypatch.setattr(manager, "update_hosts", counting_update_hosts)
+    return manager
+
+
+def test_apply_tracker_ips_writes_config_and_rebuilds_hosts_once(manager):
+    ips = {"a.example": "3.3.3.3", "b.example": "2.2.2.2", "c.example": "3.3.3.3", "d.example": "3.3.3.3"}
+    assert manager.apply_tracker_ips(ips, best_ip="3.3.3.3") == 2
+    assert manager.calls == {"write": 1, "update_hosts": 1}
+    assert [t["ip"] for t in manager.config["trackers"]] == ["3.3.3.3", "2.2.2.2", "3.3.3.3"]
+    assert manager.best_cloudflare_ip == "3.3.3.3"
+
+
+def test_apply_tracker_ips_can_add_missing_trackers(manager):
+    assert manager.apply_tracker_ips({"d.example": "4.4.4.4"}, add_missing=True, refresh_hosts=False) == 1
+    assert manager.config["trackers"][-1] == {"name": "d.example", "domain": "d.example", "ip": "4.4.4.4", "enable": True}
+    assert manager.calls == {"write": 1, "update_hosts": 0}
+
+
+def test_update_all_trackers_ip_only_touches_enabled_trackers(manager):
+    manager._update_all_trackers_ip("5.5.5.5")
+    assert [t["ip"] for t in manager.config["trackers"]] == ["5.5.5.5", "5.5.5.5", "1.1.1.1"]
+    assert manager.calls == {"write": 1, "update_hosts": 0}
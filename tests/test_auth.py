@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from itsdangerous import BadTimeSignature
+
+from app import auth
+from app.utils.config_store import ConfigStore
+
+
+class _Request:
+    def __init__(self, session):
+        self.session = session
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    path.write_text("auth:\n  enable: true\n  secret_key: test-secret\n", encoding="utf-8")
+    store = ConfigStore(str(path))
+    monkeypatch.setattr(auth, "config_store", store)
+    monkeypatch.setattr(auth, "_auth_settings_cache", (-1, {}))
+    auth.init_session_serializer("test-secret")
+    yield store
+    auth.clear_token_cache()
+
+
+def test_verified_tokens_are_cached(store, monkeypatch):
+    token = auth.create_user_session("admin")["token"]
+    assert auth.verify_session_token(token) == "admin"
+    monkeypatch.setattr(auth.session_serializer, "loads", lambda *args, **kwargs: pytest.fail("应命中token缓存"))
+    assert auth.verify_session_token(token) == "admin"
+
+
+def test_secret_change_invalidates_cached_tokens(store):
+    token = auth.create_user_session("admin")["token"]
+    auth.verify_session_token(token)
+    auth.init_session_serializer("another-secret")
+    with pytest.raises(BadTimeSignature):
+        auth.verify_session_token(token)
+
+
+def test_auth_settings_follow_config_version(store):
+    assert auth.get_auth_settings()["enable"] is True
+    assert auth.get_auth_settings() is auth.get_auth_settings()
+    store.merge({"auth": {"enable": False}})
+    assert auth.get_auth_settings() == {"enable": False}
+
+
+def test_get_current_user(store):
+    session = {"user": auth.create_user_session("admin")}
+    user = asyncio.run(auth.get_current_user(_Request(session)))
+    assert (user.username, user.is_authenticated) == ("admin", True)
+
+    forged = auth.URLSafeTimedSerializer("another-secret").dumps("admin")
+    session = {"user": {"username": "admin", "token": forged}}
+    assert asyncio.run(auth.get_current_user(_Request(session))) is None
+    assert "user" not in session
+
+    store.merge({"auth": {"enable": False}})
+    assert asyncio.run(auth.get_current_user(_Request({}))).username == "guest"
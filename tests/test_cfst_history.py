@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from app.services.cfst_history import CfstHistory
+from app.utils.cfst_result import CfstRecord
+
+
+@pytest.fixture
+def history(tmp_path):
+    return CfstHistory(str(tmp_path / "cfst_history.db"), keep_top=2)
+
+
+def _records(*items):
+    return [CfstRecord(rank=i + 1, ip=ip, latency=latency, speed=speed) for i, (ip, latency, speed) in enumerate(items)]
+
+
+def test_append_keeps_top_results(history):
+    assert history.append([], "result.csv") is None
+    history.append(_records(("1.1.1.1", 100.0, 10.0), ("2.2.2.2", 120.0, 8.0), ("3.3.3.3", 90.0, 5.0)), "result.csv")
+    run = history.runs()[0]
+    assert run["source"] == "result.csv"
+    assert run["total"] == 3
+    assert [r["ip"] for r in run["results"]] == ["1.1.1.1", "2.2.2.2"]
+
+
+def test_aggregate_orders_ips_by_median_latency(history):
+    history.append(_records(("1.1.1.1", 100.0, 10.0), ("2.2.2.2", 50.0, 8.0)), "run1")
+    history.append(_records(("1.1.1.1", 300.0, 12.0), ("2.2.2.2", 70.0, 6.0)), "run2")
+    history.append(_records(("1.1.1.1", 110.0, 14.0), ("3.3.3.3", None, 1.0)), "run3")
+    summary = history.aggregate()
+    assert [s["ip"] for s in summary] == ["2.2.2.2", "1.1.1.1", "3.3.3.3"]
+    first = summary[1]
+    assert (first["samples"], first["median_latency"], first["median_speed"], first["best_rank"]) == (3, 110.0, 12.0, 1)
+    assert summary[2]["median_latency"] is None
+    assert len(history.aggregate(limit=1)) == 1
+
+
+def test_aggregate_ignores_runs_outside_window(history, monkeypatch):
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() - 10 * 86400)
+    history.append(_records(("9.9.9.9", 10.0, 1.0)), "old")
+    monkeypatch.setattr(time, "time", real_time)
+    history.append(_records(("1.1.1.1", 100.0, 1.0)), "new")
+    assert [s["ip"] for s in history.aggregate(days=7)] == ["1.1.1.1"]
+    assert [run["source"] for run in history.runs(days=7)] == ["new"]
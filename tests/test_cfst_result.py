@@ -0,0 +1,43 @@
+from app.utils.cfst_result import parse_result_file
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "result.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_parse_standard_result_file(tmp_path):
+    path = _write(tmp_path, (
+        "IP 地址,已发送,已接收,丢包率,平均延迟,下载速度 (MB/s),地区码\n"
+        "104.16.1.1,4,4,0.00,120.50,15.20,SJC\n"
+        "104.16.2.2,4,3,0.25,150.00,9.80,LAX\n"
+    ))
+    records = parse_result_file(path)
+    assert [r.to_dict() for r in records] == [
+        {"rank": 1, "ip": "104.16.1.1", "sent": 4, "received": 4, "loss": 0.0, "latency": 120.5, "speed": 15.2, "region": "SJC"},
+        {"rank": 2, "ip": "104.16.2.2", "sent": 4, "received": 3, "loss": 0.25, "latency": 150.0, "speed": 9.8, "region": "LAX"},
+    ]
+
+
+def test_parse_maps_columns_by_header_keywords(tmp_path):
+    path = _write(tmp_path, "平均延迟,IP 地址,丢包率\n88.0,104.16.3.3,5%\n")
+    record = parse_result_file(path)[0]
+    assert (record.ip, record.latency, record.loss, record.speed) == ("104.16.3.3", 88.0, 5.0, 0.0)
+
+
+def test_parse_unknown_header_uses_standard_column_order(tmp_path):
+    path = _write(tmp_path, "a,b,c,d,e,f\n104.16.4.4,4,4,0,99,1.5\n")
+    record = parse_result_file(path)[0]
+    assert (record.ip, record.latency, record.speed) == ("104.16.4.4", 99.0, 1.5)
+
+
+def test_parse_skips_blank_rows_and_respects_limit(tmp_path):
+    path = _write(tmp_path, "IP 地址,平均延迟\n,1\n1.1.1.1,abc\n2.2.2.2,20\n3.3.3.3,30\n")
+    records = parse_result_file(path, limit=2)
+    assert [(r.rank, r.ip, r.latency) for r in records] == [(1, "1.1.1.1", None), (2, "2.2.2.2", 20.0)]
+
+
+def test_parse_missing_or_empty_file(tmp_path):
+    assert parse_result_file(str(tmp_path / "missing.csv")) == []
+    assert parse_result_file(_write(tmp_path, "")) == []
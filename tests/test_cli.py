@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from app import cli
+from app.services.hosts_manager import HostsManager
+from app.utils import config_store as config_store_module
+from app.utils.config_store import ConfigStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "config" / "config.yaml"
+    path.parent.mkdir()
+    path.write_text("trackers:\n- domain: tracker.example.com:2710\n  enable: true\n  ip: 1.1.1.1\n", encoding="utf-8")
+    store = ConfigStore(str(path))
+    monkeypatch.setattr(config_store_module, "config_store", store)
+    return store
+
+
+def _run(capsys, *argv):
+    code = cli.main(list(argv))
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_missing_config_is_usage_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(config_store_module, "config_store", ConfigStore(str(tmp_path / "missing.yaml")))
+    code, output = _run(capsys, "update-hosts")
+    assert code == cli.EXIT_USAGE
+    assert output["ok"] is False and "配置文件不存在" in output["message"]
+
+
+def test_classify_without_domains_is_usage_error(store, capsys):
+    code, output = _run(capsys, "classify")
+    assert code == cli.EXIT_USAGE
+
+
+def test_classify_outputs_json(store, monkeypatch, capsys):
+    monkeypatch.setattr(HostsManager, "is_cloudflare_domain", lambda self, domain: domain.endswith("example.com"))
+    code, output = _run(capsys, "classify", "a.example.org", "--trackers")
+    assert code == cli.EXIT_OK
+    assert output["command"] == "classify"
+    assert output["results"] == [
+        {"domain": "a.example.org", "zone": "example.org", "cloudflare": False},
+        {"domain": "tracker.example.com:2710", "zone": "example.com", "cloudflare": True},
+    ]
+
+
+def test_failed_task_exits_with_failure(store, monkeypatch, capsys):
+    monkeypatch.setattr(HostsManager, "update_hosts", lambda self: False)
+    code, output = _run(capsys, "update-hosts", "--dry-run")
+    assert code == cli.EXIT_FAILED
+    assert output["dry_run"] is True
+    assert output["ok"] is False
+
+
+def test_update_hosts_dry_run_outputs_entries(store, monkeypatch, capsys):
+    monkeypatch.setattr(HostsManager, "is_cloudflare_domain", lambda self, domain: True)
+    with open(store.path, encoding="utf-8") as f:
+        original = f.read()
+    code, output = _run(capsys, "update-hosts", "--dry-run")
+    assert code == cli.EXIT_OK
+    assert output["entries"]["pt_sites"] == ["1.1.1.1\ttracker.example.com:2710"]
+    with open(store.path, encoding="utf-8") as f:
+        assert f.read() == original
+
+
+def test_unexpected_error_exits_with_failure(store, monkeypatch, capsys):
+    def boom(self):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(HostsManager, "update_hosts", boom)
+    code, output = _run(capsys, "update-hosts")
+    assert code == cli.EXIT_FAILED
+    assert output["message"] == "执行失败: boom"
+
+
+def test_interrupt_exit_code(store, monkeypatch, capsys):
+    def interrupt(self):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(HostsManager, "update_hosts", interrupt)
+    code, _ = _run(capsys, "update-hosts")
+    assert code == cli.EXIT_INTERRUPTED
+
+
+def test_invalid_arguments_exit_with_usage_code(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(["unknown-command"])
+    assert exc_info.value.code == cli.EXIT_USAGE
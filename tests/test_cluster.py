@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.services.cluster import ClusterAgent, ClusterService, SnapshotPublisher, load_cluster_settings
+
+
+class _Pool:
+    def __init__(self, ips):
+        self._ips = ips
+
+    def ips(self):
+        return list(self._ips)
+
+
+class _HostsManager:
+    def __init__(self):
+        self.ip_pool = _Pool(["1.1.1.1", "2.2.2.2"])
+        self.listeners = []
+        self.applied = []
+        self.latencies = {}
+
+    def add_section_listener(self, listener):
+        self.listeners.append(listener)
+
+    def published_sections(self):
+        return ["1.1.1.1\ttracker.example"], []
+
+    def apply_snapshot(self, pt_entries, merged_entries):
+        self.applied.append((pt_entries, merged_entries))
+
+    def probe_ips(self, ips, timeout=1):
+        return {ip: self.latencies.get(ip) for ip in ips}
+
+
+@pytest.fixture
+def manager():
+    return _HostsManager()
+
+
+def test_load_cluster_settings_normalizes_values():
+    settings = load_cluster_settings({"cluster": {"role": "HUB", "hub_url": "http://hub:23333/", "poll_timeout": 0}})
+    assert (settings["role"], settings["hub_url"], settings["poll_timeout"]) == ("hub", "http://hub:23333", 1)
+    assert load_cluster_settings({"cluster": {"role": "unknown"}})["role"] == "standalone"
+
+
+def test_publisher_only_bumps_version_on_changes(manager):
+    publisher = SnapshotPublisher(manager)
+    assert manager.listeners == [publisher.publish]
+    publisher.publish(["1.1.1.1\ta.example"], ["5.5.5.5\tb.example"])
+    publisher.publish(["1.1.1.1\ta.example"], ["5.5.5.5\tb.example"])
+    assert publisher.version == 1
+    assert publisher.snapshot["candidates"] == ["1.1.1.1", "2.2.2.2"]
+    publisher.publish(["2.2.2.2\ta.example"], ["5.5.5.5\tb.example"])
+    assert publisher.version == 2
+
+
+def test_publisher_wait_returns_newer_or_restarted_snapshot(manager):
+    publisher = SnapshotPublisher(manager)
+    snapshot = asyncio.run(publisher.wait(0, "", timeout=1))
+    assert snapshot["version"] == 1
+    assert snapshot["pt_entries"] == ["1.1.1.1\ttracker.example"]
+    assert asyncio.run(publisher.wait(1, publisher.instance, timeout=0.01)) is None
+    # hub重启后instance变化，即使版本号更小也返回快照
+    assert asyncio.run(publisher.wait(5, "old-instance", timeout=0.01))["version"] == 1
+
+
+def test_publisher_wait_wakes_up_on_publish(manager):
+    publisher = SnapshotPublisher(manager)
+    publisher.publish(*manager.published_sections())
+
+    async def wait_and_publish():
+        timer = threading.Timer(0.05, publisher.publish, args=(["2.2.2.2\ttracker.example"], []))
+        timer.start()
+        return await publisher.wait(1, publisher.instance, timeout=5)
+
+    snapshot = asyncio.run(wait_and_publish())
+    assert snapshot["version"] == 2
+
+
+def test_agent_applies_snapshot_and_records_version(manager):
+    agent = ClusterAgent(manager)
+    agent.settings = load_cluster_settings({"cluster": {"role": "agent"}})
+    agent._apply({"instance": "hub-1", "version": 3, "pt_entries": ["1.1.1.1\ta.example"], "merged_entries": ["5.5.5.5\tb.example"]})
+    assert manager.applied == [(["1.1.1.1\ta.example"], ["5.5.5.5\tb.example"])]
+    assert (agent.instance, agent.version) == ("hub-1", 3)
+
+
+def test_agent_rechecks_pt_entries_with_local_latency(manager):
+    agent = ClusterAgent(manager)
+    agent.settings = load_cluster_settings({"cluster": {"role": "agent", "recheck_top_k": 2}})
+    manager.latencies = {"1.1.1.1": 120.0, "2.2.2.2": 30.0, "3.3.3.3": 1.0}
+    agent._apply({
+        "instance": "hub-1", "version": 1,
+        "pt_entries": ["1.1.1.1\ta.example", "9.9.9.9\tb.example"],
+        "merged_entries": [],
+        "candidates": ["1.1.1.1", "2.2.2.2", "3.3.3.3"],
+    })
+    # 只替换使用hub候选IP的条目，且只在前 recheck_top_k 个候选中选择
+    assert manager.applied[0][0] == ["2.2.2.2\ta.example", "9.9.9.9\tb.example"]
+
+
+def test_cluster_service_token_check(manager):
+    service = ClusterService({"cluster": {"role": "hub", "token": "secret"}}, manager)
+    assert service.check_token("secret")
+    assert not service.check_token("wrong")
+    assert not service.check_token(None)
+    assert ClusterService({"cluster": {"role": "hub"}}, _HostsManager()).check_token(None)
+
+
+def test_agent_node_skips_local_pipelines(make_hosts_manager):
+    manager = make_hosts_manager({"cluster": {"role": "agent"}})
+    assert manager.is_cluster_agent
+    assert manager.update_hosts() is False
+    assert manager.run_cfst() is False
+    assert manager.run_cfst_and_update_hosts() is False
+    assert "集群agent" in manager.task_status["message"]
+
+
+@pytest.mark.parametrize("path", ["/api/update-hosts", "/api/run-cfst-script", "/api/run-cloudflare-test"])
+def test_manual_pipeline_routes_are_rejected_on_agent(manager, monkeypatch, path):
+    monkeypatch.setattr(routes, "get_cluster_service", lambda: ClusterService({"cluster": {"role": "agent"}}, manager))
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    response = TestClient(app).post(path)
+    assert response.status_code == 409
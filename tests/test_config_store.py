@@ -0,0 +1,130 @@
+import os
+import stat
+import threading
+
+import pytest
+import yaml
+
+from app.utils import config_store as config_store_module
+from app.utils.config_store import ConfigStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("cloudflare:\n  enable: true\ntrackers: []\n", encoding="utf-8")
+    return ConfigStore(str(path), debounce=0.05, max_delay=1)
+
+
+def _read(store):
+    with open(store.path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def test_load_returns_independent_copy(store):
+    config = store.load()
+    config["trackers"].append({"domain": "a.example"})
+    assert store.load()["trackers"] == []
+
+
+def test_save_is_debounced_until_flush(store):
+    version = store.version
+    store.save({"trackers": [{"domain": "a.example"}]})
+    assert store.version > version
+    assert store.load()["trackers"] == [{"domain": "a.example"}]
+    assert _read(store)["trackers"] == []
+    store.flush()
+    assert _read(store) == {"trackers": [{"domain": "a.example"}]}
+
+
+def test_merge_only_replaces_given_keys(store):
+    merged = store.merge({"trackers": [{"domain": "a.example"}]}, immediate=True)
+    assert merged == {"cloudflare": {"enable": True}, "trackers": [{"domain": "a.example"}]}
+    assert _read(store) == merged
+
+
+def test_update_does_not_lose_concurrent_changes(store):
+    def add(i):
+        store.update(lambda config: config["trackers"].append({"domain": f"{i}.example"}))
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.flush()
+    assert len(_read(store)["trackers"]) == 20
+
+
+def test_update_does_not_save_when_mutator_fails(store):
+    store.load()
+    version = store.version
+
+    def mutator(config):
+        config["trackers"].append({"domain": "a.example"})
+        raise ValueError("invalid")
+
+    with pytest.raises(ValueError):
+        store.update(mutator)
+    assert store.version == version
+    assert store.load()["trackers"] == []
+
+
+def test_flush_keeps_existing_file_mode(store):
+    os.chmod(store.path, 0o640)
+    store.save({"trackers": []}, immediate=True)
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o640
+
+
+def test_flush_creates_new_file_with_umask_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_store_module, "_UMASK", 0o022)
+
+    def fail_umask(mask):
+        raise AssertionError("保存配置时不应修改进程umask")
+
+    # umask在导入时读取，保存时修改umask会影响其它线程同时创建的文件
+    monkeypatch.setattr(config_store_module.os, "umask", fail_umask)
+    store = ConfigStore(str(tmp_path / "new" / "config.yaml"))
+    store.save({"trackers": []}, immediate=True)
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o644
+
+
+def test_reloads_after_external_modification(store):
+    store.load()
+    with open(store.path, "w", encoding="utf-8") as f:
+        f.write("trackers:\n- domain: external.example\n")
+    os.utime(store.path, ns=(1, 1))
+    assert store.load() == {"trackers": [{"domain": "external.example"}]}
+
+
+def test_snapshot_is_used_when_yaml_is_unchanged(store, monkeypatch):
+    expected = store.load()
+    assert os.path.exists(store.snapshot_path)
+
+    reloaded = ConfigStore(store.path)
+    monkeypatch.setattr(yaml, "load", lambda *args, **kwargs: pytest.fail("应直接使用JSON快照"))
+    assert reloaded.load() == expected
+
+
+def test_snapshot_is_ignored_when_yaml_changes(store):
+    store.load()
+    with open(store.path, "w", encoding="utf-8") as f:
+        f.write("trackers:\n- domain: changed.example\n")
+    assert ConfigStore(store.path).load() == {"trackers": [{"domain": "changed.example"}]}
+
+
+def test_non_string_keys_survive_copies_and_reloads(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("ports:\n  443: https\n  80: http\nflags:\n  true: enabled\n", encoding="utf-8")
+    store = ConfigStore(str(path))
+    expected = {"ports": {443: "https", 80: "http"}, "flags": {True: "enabled"}}
+    assert store.load() == expected
+    assert not os.path.exists(store.snapshot_path)
+    store.save(store.load(), immediate=True)
+    assert ConfigStore(str(path)).load() == expected
+
+
+def test_gbk_encoded_config_is_readable(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_bytes("name: 站点\n".encode("gbk"))
+    assert ConfigStore(str(path)).load() == {"name": "站点"}
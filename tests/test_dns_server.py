@@ -0,0 +1,94 @@
+import asyncio
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import pytest
+
+from app.services.dns_server import LocalDNSServer, _parse_question, build_table
+
+PT_ENTRIES = ["104.16.1.1\ttracker.example.com:2710", "2606:4700::1\ttracker.example.com"]
+MERGED_ENTRIES = ["1.2.3.4\ttracker.example.com", "5.6.7.8\tapi.example.org.", "invalid"]
+
+
+class _HostsManager:
+    def __init__(self):
+        self.listeners = []
+
+    def add_section_listener(self, listener):
+        self.listeners.append(listener)
+
+    def published_sections(self):
+        return PT_ENTRIES, MERGED_ENTRIES
+
+
+@pytest.fixture
+def server():
+    server = LocalDNSServer({"dns_server": {"pt_ttl": 60, "ttl": 300, "upstream": []}}, _HostsManager())
+    server.update_records(PT_ENTRIES, MERGED_ENTRIES)
+    return server
+
+
+def _resolve(server, name, rdtype):
+    query = dns.message.make_query(name, rdtype)
+    return query, dns.message.from_wire(asyncio.run(server.resolve(query.to_wire())))
+
+
+def test_build_table_prefers_pt_section():
+    table = build_table(PT_ENTRIES, MERGED_ENTRIES, pt_ttl=60, ttl=300)
+    assert table == {
+        "tracker.example.com": (60, ["104.16.1.1"], ["2606:4700::1"]),
+        "api.example.org": (300, ["5.6.7.8"], []),
+    }
+
+
+def test_parse_question():
+    query = dns.message.make_query("Tracker.Example.COM", "AAAA")
+    name, qtype, qclass, end = _parse_question(query.to_wire())
+    assert (name, qtype, qclass) == ("tracker.example.com", 28, 1)
+    assert _parse_question(b"\0" * 11) is None
+
+
+def test_answers_a_and_aaaa_from_table(server):
+    query, response = _resolve(server, "tracker.example.com", "A")
+    assert response.id == query.id
+    assert response.flags & dns.flags.AA
+    assert [(rrset.ttl, [r.address for r in rrset]) for rrset in response.answer] == [(60, ["104.16.1.1"])]
+
+    _, response = _resolve(server, "TRACKER.example.com", "AAAA")
+    assert [r.address for r in response.answer[0]] == ["2606:4700::1"]
+
+
+def test_known_name_without_family_gets_empty_answer(server):
+    _, response = _resolve(server, "api.example.org", "AAAA")
+    assert response.rcode() == dns.rcode.NOERROR
+    assert response.answer == []
+
+
+def test_unknown_name_without_upstream_is_servfail(server):
+    _, response = _resolve(server, "unknown.example.net", "A")
+    assert response.rcode() == dns.rcode.SERVFAIL
+    assert server.stats == {"queries": 1, "answered": 0, "forwarded": 0, "failed": 1}
+
+
+def test_malformed_query_is_notimp(server):
+    query = dns.message.make_query("a.example", "A").to_wire()
+    response = dns.message.from_wire(asyncio.run(server.resolve(query[:14])), question_only=True)
+    assert response.rcode() == dns.rcode.NOTIMP
+
+
+@pytest.mark.parametrize("upstream, expected", [
+    ("1.1.1.1", ("1.1.1.1", 53)),
+    ("1.1.1.1:5353", ("1.1.1.1", 5353)),
+    ("[2606:4700::1111]:53", ("2606:4700::1111", 53)),
+    ("2606:4700::1111", ("2606:4700::1111", 53)),
+])
+def test_parse_upstream(upstream, expected):
+    assert LocalDNSServer._parse_upstream(upstream) == expected
+
+
+def test_registers_as_section_listener(server):
+    listener = server.hosts_manager.listeners[0]
+    listener(["9.9.9.9\tnew.example"], [])
+    assert server._table == {"new.example": (60, ["9.9.9.9"], [])}
@@ -0,0 +1,50 @@
+import pytest
+
+from app.utils.domain_blacklist import DEFAULT_DOMAIN_BLACKLIST, DomainBlacklist, normalize_domain
+
+
+@pytest.fixture
+def blacklist():
+    return DomainBlacklist(["*.docker.io", "ads.example.com", r"/^track\d+\./", "/[invalid/"])
+
+
+@pytest.mark.parametrize("domain, rule", [
+    ("docker.io", "*.docker.io"),
+    ("registry-1.docker.io", "*.docker.io"),
+    ("A.B.Docker.IO.", "*.docker.io"),
+    ("ads.example.com", "ads.example.com"),
+    ("ads.example.com:443", "ads.example.com"),
+    ("track01.example.org", r"/^track\d+\./"),
+])
+def test_match(blacklist, domain, rule):
+    assert blacklist.match(domain) == rule
+
+
+@pytest.mark.parametrize("domain", ["notdocker.io", "docker.io.example.com", "x.ads.example.com", "example.com", "", "tracker.example.org"])
+def test_no_match(blacklist, domain):
+    assert blacklist.match(domain) is None
+
+
+def test_invalid_regex_is_skipped(blacklist):
+    assert blacklist.rules == ["*.docker.io", "ads.example.com", r"/^track\d+\./"]
+
+
+def test_hit_counts_are_kept_across_reloads(blacklist):
+    assert blacklist.is_blacklisted("a.docker.io")
+    assert blacklist.is_blacklisted("b.docker.io")
+    assert not blacklist.is_blacklisted("example.com")
+    blacklist.load(["*.docker.io", "*.quay.io"])
+    assert blacklist.stats() == {"rules": ["*.docker.io", "*.quay.io"], "counts": {"*.docker.io": 2, "*.quay.io": 0}, "total": 2}
+
+
+def test_update_config_falls_back_to_defaults():
+    blacklist = DomainBlacklist([])
+    assert not blacklist.is_blacklisted("hub.docker.com")
+    blacklist.update_config({})
+    assert blacklist.rules == DEFAULT_DOMAIN_BLACKLIST
+    assert blacklist.is_blacklisted("hub.docker.com")
+
+
+def test_normalize_domain():
+    assert normalize_domain(" WWW.Example.COM.:8080 ") == "www.example.com"
+    assert normalize_domain(None) == ""
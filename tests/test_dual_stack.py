@@ -0,0 +1,48 @@
+import pytest
+
+CACHE = {
+    "1.1.1.1": 80.0,
+    "2.2.2.2": 20.0,
+    "3.3.3.3": None,
+    "2606:4700::1": 10.0,
+    "2606:4700::2": 30.0,
+    "2606:4700::3": None,
+}
+
+
+@pytest.mark.parametrize("ipv6, expected", [
+    (False, [("2606:4700::1", 10.0)]),
+    (True, [("2.2.2.2", 20.0), ("2606:4700::1", 10.0)]),
+])
+def test_select_domain_ips(make_hosts_manager, ipv6, expected):
+    manager = make_hosts_manager({"cloudflare": {"ipv6": ipv6}})
+    ips = ["1.1.1.1", "2.2.2.2", "2606:4700::1", "2606:4700::2"]
+    assert manager._select_domain_ips("a.example", ips, dict(CACHE)) == expected
+
+
+def test_select_domain_ips_falls_back_per_family(make_hosts_manager):
+    manager = make_hosts_manager({"cloudflare": {"ipv6": True}})
+    selected = manager._select_domain_ips("a.example", ["3.3.3.3", "2606:4700::3", "2606:4700::2"], dict(CACHE))
+    assert selected == [("3.3.3.3", None), ("2606:4700::2", 30.0)]
+    assert manager.domain_ip_history["a.example"] == "2606:4700::2"
+
+
+def test_pt_entries_add_pool_ip_of_other_family(make_hosts_manager):
+    manager = make_hosts_manager({
+        "cloudflare": {"ipv6": True},
+        "trackers": [
+            {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+            {"domain": "b.example", "enable": True, "ip": "2606:4700::9"},
+        ],
+    })
+    manager.ip_pool.update([{"ip": "2606:4700::1"}, {"ip": "2.2.2.2"}, {"ip": "2606:4700::2"}])
+    assert manager._collect_pt_entries() == [
+        "1.1.1.1\ta.example", "2606:4700::1\ta.example",
+        "2606:4700::9\tb.example", "2.2.2.2\tb.example",
+    ]
+
+
+def test_pt_entries_single_stack(make_hosts_manager):
+    manager = make_hosts_manager({"trackers": [{"domain": "a.example", "enable": True, "ip": "1.1.1.1"}]})
+    manager.ip_pool.update([{"ip": "2606:4700::1"}])
+    assert manager._collect_pt_entries() == ["1.1.1.1\ta.example"]
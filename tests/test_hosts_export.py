@@ -0,0 +1,110 @@
+import gzip
+import json
+
+import pytest
+import yaml
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.hosts_export import HostsExporter, parse_records
+
+PT_ENTRIES = ["104.16.1.1\ttracker.example.com:2710", "2606:4700::1\ttracker.example.com"]
+MERGED_ENTRIES = ["1.2.3.4\ttracker.example.com", "5.6.7.8\tapi.example.org.", "5.6.7.8\tapi.example.org", "bad"]
+
+
+@pytest.fixture
+def exporter():
+    return HostsExporter(lambda: (PT_ENTRIES, MERGED_ENTRIES))
+
+
+def _text(exporter, fmt):
+    return exporter.get(fmt).content.decode("utf-8")
+
+
+def test_parse_records_prefers_pt_section_and_deduplicates():
+    assert parse_records(PT_ENTRIES, MERGED_ENTRIES) == [
+        ("tracker.example.com", ["104.16.1.1", "2606:4700::1"], "pt_sites"),
+        ("api.example.org", ["5.6.7.8"], "hosts"),
+    ]
+
+
+def test_render_text_formats(exporter):
+    assert _text(exporter, "hosts").splitlines()[1:] == [
+        "104.16.1.1\ttracker.example.com", "2606:4700::1\ttracker.example.com", "5.6.7.8\tapi.example.org",
+    ]
+    assert _text(exporter, "dnsmasq").splitlines()[1:] == [
+        "address=/tracker.example.com/104.16.1.1",
+        "address=/tracker.example.com/2606:4700::1",
+        "address=/api.example.org/5.6.7.8",
+    ]
+    assert _text(exporter, "adguard").splitlines()[1:] == [
+        "|tracker.example.com^$dnsrewrite=NOERROR;A;104.16.1.1",
+        "|tracker.example.com^$dnsrewrite=NOERROR;AAAA;2606:4700::1",
+        "|api.example.org^$dnsrewrite=NOERROR;A;5.6.7.8",
+    ]
+
+
+def test_render_structured_formats(exporter):
+    assert yaml.safe_load(_text(exporter, "clash")) == {"hosts": {
+        "tracker.example.com": ["104.16.1.1", "2606:4700::1"], "api.example.org": "5.6.7.8",
+    }}
+    assert json.loads(_text(exporter, "json")) == {
+        "pt_sites": {"tracker.example.com": ["104.16.1.1", "2606:4700::1"]},
+        "hosts": {"api.example.org": ["5.6.7.8"]},
+    }
+
+
+def test_artifacts_are_cached_until_update(exporter):
+    artifact = exporter.get("hosts")
+    assert exporter.get("hosts") is artifact
+    assert exporter.get("unknown") is None
+    assert gzip.decompress(artifact.gzipped) == artifact.content
+    assert artifact.etag != artifact.gzip_etag
+
+    exporter.update(PT_ENTRIES, MERGED_ENTRIES)
+    assert exporter.get("hosts").etag == artifact.etag
+    exporter.update(PT_ENTRIES, [])
+    assert exporter.get("hosts").etag != artifact.etag
+
+
+@pytest.fixture
+def client(exporter):
+    from app.api.routes import router
+    from app.globals import get_hosts_manager
+
+    class _HostsManager:
+        pass
+
+    manager = _HostsManager()
+    manager.exporter = exporter
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_hosts_manager] = lambda: manager
+    return TestClient(app)
+
+
+def test_export_route_uses_distinct_etags_per_encoding(client, exporter):
+    artifact = exporter.get("dnsmasq")
+    plain = client.get("/api/export/dnsmasq", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert plain.headers["etag"] == artifact.etag
+    assert "content-encoding" not in plain.headers
+    assert plain.content == artifact.content
+
+    gzipped = client.get("/api/export/dnsmasq", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["etag"] == artifact.gzip_etag
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("if_none_match", ["etag", "gzip_etag", "*", "W/etag"])
+def test_export_route_not_modified(client, exporter, if_none_match):
+    artifact = exporter.get("json")
+    tag = {"etag": artifact.etag, "gzip_etag": artifact.gzip_etag, "*": "*", "W/etag": "W/" + artifact.etag}[if_none_match]
+    response = client.get("/api/export/json", headers={"If-None-Match": tag, "Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert response.headers["etag"] == artifact.gzip_etag
+
+
+def test_export_route_unknown_format(client):
+    assert client.get("/api/export/unknown").status_code == 404
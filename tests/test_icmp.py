@@ -0,0 +1,125 @@
+import socket
+import struct
+
+import pytest
+
+from app.utils import icmp
+
+
+class _FakeSocket:
+    """记录发送的回显请求，recvfrom 依次返回预置的回复"""
+
+    def __init__(self, replies=None, auto_reply=None):
+        self.sent = []
+        self.replies = list(replies or [])
+        self.auto_reply = auto_reply
+        self.closed = False
+
+    def sendto(self, packet, address):
+        self.sent.append((packet, address))
+        if self.auto_reply:
+            self.replies.append(self.auto_reply(packet, address))
+
+    def recvfrom(self, size):
+        if not self.replies:
+            raise BlockingIOError
+        return self.replies.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def _reply(reply_type, ident, seq):
+    return struct.pack("!BBHHH", reply_type, 0, 0, ident, seq) + b"PT-Accel"
+
+
+def _ipv4_header():
+    return bytes([0x45]) + bytes(19)
+
+
+def test_echo_request_checksum_is_valid():
+    packet = icmp._build_echo(socket.AF_INET, 0x1234, 7)
+    assert packet[0] == icmp.ICMP_ECHO_REQUEST
+    assert struct.unpack("!HH", packet[4:8]) == (0x1234, 7)
+    assert icmp._checksum(packet) == 0
+
+
+def test_echo_request_ipv6_leaves_checksum_to_kernel():
+    packet = icmp._build_echo(socket.AF_INET6, 1, 2)
+    assert packet[0] == icmp.ICMPV6_ECHO_REQUEST
+    assert packet[2:4] == b"\0\0"
+
+
+def test_replies_are_matched_by_sequence_and_source():
+    sock = _FakeSocket()
+    session = icmp._EchoSession(socket.AF_INET, sock, False, ident=1)
+    session.send(["1.1.1.1", "2.2.2.2", "3.3.3.3"])
+    sock.replies = [
+        # 来源地址与序号不一致的回复被忽略
+        (_reply(icmp.ICMP_ECHO_REPLY, 999, 0), ("2.2.2.2", 0)),
+        (_reply(icmp.ICMP_ECHO_REQUEST, 999, 1), ("2.2.2.2", 0)),
+        (b"\0\0", ("1.1.1.1", 0)),
+        # SOCK_DGRAM 下标识符被内核替换，不校验
+        (_reply(icmp.ICMP_ECHO_REPLY, 999, 1), ("2.2.2.2", 0)),
+    ]
+    results = {"1.1.1.1": None, "2.2.2.2": None, "3.3.3.3": None}
+    session.receive(results)
+    assert results["1.1.1.1"] is None and results["3.3.3.3"] is None
+    assert results["2.2.2.2"] >= 0
+    assert set(session.pending) == {0, 2}
+
+
+def test_raw_ipv4_replies_strip_ip_header_and_check_ident():
+    sock = _FakeSocket()
+    session = icmp._EchoSession(socket.AF_INET, sock, True, ident=42)
+    session.send(["1.1.1.1", "2.2.2.2"])
+    sock.replies = [
+        (_ipv4_header() + _reply(icmp.ICMP_ECHO_REPLY, 41, 0), ("1.1.1.1", 0)),
+        (_ipv4_header() + _reply(icmp.ICMP_ECHO_REPLY, 42, 1), ("2.2.2.2", 0)),
+    ]
+    results = {"1.1.1.1": None, "2.2.2.2": None}
+    session.receive(results)
+    assert results["1.1.1.1"] is None
+    assert results["2.2.2.2"] is not None
+
+
+def test_ipv6_source_address_is_normalized():
+    sock = _FakeSocket()
+    session = icmp._EchoSession(socket.AF_INET6, sock, False, ident=1)
+    session.send(["2001:0db8:0000::1"])
+    sock.replies = [(_reply(icmp.ICMPV6_ECHO_REPLY, 1, 0), ("2001:db8::1%eth0", 0, 0, 0))]
+    results = {"2001:0db8:0000::1": None}
+    session.receive(results)
+    assert results["2001:0db8:0000::1"] is not None
+
+
+def test_ping_many_probes_each_family_with_one_socket(monkeypatch):
+    def echo(packet, address):
+        reply_type = icmp.ICMPV6_ECHO_REPLY if ":" in address[0] else icmp.ICMP_ECHO_REPLY
+        return _reply(reply_type, 0, struct.unpack("!H", packet[6:8])[0]), address
+
+    sockets = {}
+
+    def fake_open(family=socket.AF_INET):
+        sockets[family] = _FakeSocket(auto_reply=echo if family == socket.AF_INET else None)
+        return sockets[family], False
+
+    monkeypatch.setattr(icmp, "open_icmp_socket", fake_open)
+    monkeypatch.setattr(icmp.select, "select", lambda readable, *args: (readable, [], []))
+    results = icmp.ping_many(["1.1.1.1", "2.2.2.2", "1.1.1.1", "2001:db8::1"], timeout=0.05)
+    assert set(results) == {"1.1.1.1", "2.2.2.2", "2001:db8::1"}
+    assert results["1.1.1.1"] is not None and results["2.2.2.2"] is not None
+    assert results["2001:db8::1"] is None
+    assert len(sockets[socket.AF_INET].sent) == 2
+    assert all(sock.closed for sock in sockets.values())
+
+
+def test_ping_many_without_icmp_sockets(monkeypatch):
+    monkeypatch.setattr(icmp, "open_icmp_socket", lambda family=socket.AF_INET: (None, False))
+    assert icmp.ping_many(["1.1.1.1"]) is None
+    assert icmp.ping_many([]) == {}
+
+
+@pytest.mark.parametrize("ip, family", [("1.1.1.1", socket.AF_INET), ("2606:4700::1", socket.AF_INET6)])
+def test_address_family(ip, family):
+    assert icmp.address_family(ip) == family
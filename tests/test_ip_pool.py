@@ -0,0 +1,68 @@
+import pytest
+
+from app.services.ip_pool import IPPool, PoolHealthChecker
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = IPPool(str(tmp_path / "ip_pool.json"))
+    pool.update([{"ip": "1.1.1.1"}, {"ip": "2.2.2.2"}, {"ip": "1.1.1.1"}, {"ip": "3.3.3.3"}])
+    return pool
+
+
+class _HostsManager:
+    def __init__(self):
+        self.config = {"trackers": [
+            {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+            {"domain": "b.example", "enable": True, "ip": "1.1.1.1"},
+        ]}
+        self.replaced = []
+
+    def replace_tracker_ips(self, mapping):
+        self.replaced.append(mapping)
+        return True
+
+
+def test_update_deduplicates_and_persists(pool):
+    assert pool.ips() == ["1.1.1.1", "2.2.2.2", "3.3.3.3"]
+    assert IPPool(pool.path).ips() == pool.ips()
+
+
+def test_candidates_put_failed_ips_last(pool):
+    pool.mark_failed("2.2.2.2")
+    assert pool.candidates(exclude=["1.1.1.1"]) == ["3.3.3.3", "2.2.2.2"]
+
+
+def test_health_checker_rotates_after_consecutive_failures(pool, monkeypatch):
+    manager = _HostsManager()
+    checker = PoolHealthChecker(manager, pool)
+    checker.load_settings({"consecutive": 2, "attempts": 1})
+    healthy = {"1.1.1.1": False, "2.2.2.2": False, "3.3.3.3": True}
+    monkeypatch.setattr(checker, "is_healthy", lambda ip: healthy[ip])
+
+    assert checker.check() == {"rotated": {}, "unhealthy": ["1.1.1.1"]}
+    assert manager.replaced == []
+    assert checker.check() == {"rotated": {"1.1.1.1": "3.3.3.3"}, "unhealthy": []}
+    assert manager.replaced == [{"1.1.1.1": "3.3.3.3"}]
+    assert "1.1.1.1" in pool.failed
+
+
+def test_health_checker_keeps_ip_without_healthy_replacement(pool, monkeypatch):
+    manager = _HostsManager()
+    checker = PoolHealthChecker(manager, pool)
+    checker.load_settings({"consecutive": 1})
+    monkeypatch.setattr(checker, "is_healthy", lambda ip: False)
+    assert checker.check() == {"rotated": {}, "unhealthy": ["1.1.1.1"]}
+    assert manager.replaced == []
+
+
+def test_replace_tracker_ips_rewrites_only_matching_trackers(make_hosts_manager):
+    manager = make_hosts_manager({"trackers": [
+        {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+        {"domain": "b.example", "enable": True, "ip": "2.2.2.2"},
+    ]})
+    manager.best_cloudflare_ip = "1.1.1.1"
+    assert manager.replace_tracker_ips({"1.1.1.1": "3.3.3.3"}) is True
+    assert [t["ip"] for t in manager.config["trackers"]] == ["3.3.3.3", "2.2.2.2"]
+    assert manager.best_cloudflare_ip == "3.3.3.3"
+    assert manager.published_sections()[0] == ["3.3.3.3\ta.example", "2.2.2.2\tb.example"]
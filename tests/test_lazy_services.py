@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app import globals as app_globals
+from app.utils.startup_profile import StartupProfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(app_globals, "_factories", {})
+    monkeypatch.setattr(app_globals, "init_times", {})
+    monkeypatch.setattr(app_globals, "dns_server", None)
+    return app_globals
+
+
+def test_factory_runs_once_on_first_use(registry):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    registry.register_factory("dns_server", factory)
+    assert registry.peek_service("dns_server") is None
+    assert calls == []
+    service = registry.get_dns_server()
+    assert registry.get_dns_server() is service
+    assert registry.peek_service("dns_server") is service
+    assert calls == [1]
+    assert "dns_server" in registry.init_times
+
+
+def test_concurrent_first_use_builds_one_instance(registry):
+    started = threading.Event()
+
+    def factory():
+        started.wait(1)
+        return object()
+
+    registry.register_factory("dns_server", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_dns_server())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.set()
+    for t in threads:
+        t.join()
+    assert len({id(service) for service in results}) == 1
+
+
+def test_failed_construction_is_retried(registry):
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("缺少测速程序")
+        return object()
+
+    registry.register_factory("dns_server", factory)
+    with pytest.raises(RuntimeError):
+        registry.get_dns_server()
+    service = registry.get_dns_server()
+    assert service is not None
+    assert registry.get_dns_server() is service
+    assert len(attempts) == 2
+    assert "dns_server" not in registry._factories
+
+
+def test_unregistered_service_returns_none(registry):
+    assert registry.get_dns_server() is None
+
+
+def test_startup_profile_report():
+    profile = StartupProfile()
+    with profile.measure("导入模块"):
+        pass
+    report = profile.report({"dns_server": 0.0123})
+    assert set(report) == {"导入模块", "延迟创建 dns_server", "total"}
+    assert report["延迟创建 dns_server"] == 12.3
+
+
+def test_cli_import_does_not_load_web_stack():
+    code = "import sys, app.cli; print(any(m in sys.modules for m in ('fastapi', 'app.main', 'apscheduler')))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+
+
+def test_main_import_defers_optional_services(tmp_path):
+    # 在临时目录中导入，避免启动时创建的配置与日志文件写入仓库
+    code = ("import sys, app.main; print([m for m in ('app.services.cloudflare_speed_test', 'app.services.torrent_clients')"
+            " if m in sys.modules])")
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "[]"
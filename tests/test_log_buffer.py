@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from app.utils.log_buffer import RingBufferHandler, parse_level
+
+
+def _emit(handler, name, level, message, created=None):
+    record = logging.LogRecord(name, level, __file__, 0, message, None, None)
+    if created is not None:
+        record.created = created
+    handler.emit(record)
+
+
+@pytest.fixture
+def handler():
+    handler = RingBufferHandler(capacity=5)
+    _emit(handler, "app.services.hosts_manager", logging.INFO, "开始更新hosts文件", created=100)
+    _emit(handler, "app.services.scheduler", logging.WARNING, "任务错过执行时间", created=200)
+    _emit(handler, "app.services.hosts_manager", logging.ERROR, "更新hosts文件失败", created=300)
+    return handler
+
+
+def _messages(result):
+    return [rec["message"] for rec in result["records"]]
+
+
+def test_query_filters_by_minimum_level(handler):
+    assert _messages(handler.query(level="WARNING")) == ["任务错过执行时间", "更新hosts文件失败"]
+    assert _messages(handler.query(level=logging.ERROR)) == ["更新hosts文件失败"]
+
+
+def test_query_filters_by_logger_prefix_time_and_keyword(handler):
+    assert _messages(handler.query(logger_name="app.services.hosts_manager")) == ["开始更新hosts文件", "更新hosts文件失败"]
+    assert _messages(handler.query(logger_name="app.services.hosts")) == []
+    assert _messages(handler.query(since=150, until=250)) == ["任务错过执行时间"]
+    assert _messages(handler.query(keyword="HOSTS")) == ["开始更新hosts文件", "更新hosts文件失败"]
+
+
+def test_query_since_id_returns_only_new_records(handler):
+    first = handler.query()
+    _emit(handler, "app", logging.INFO, "新记录")
+    result = handler.query(since_id=first["last_id"])
+    assert _messages(result) == ["新记录"]
+    assert result["last_id"] == first["last_id"] + 1
+    assert result["truncated"] is False
+
+
+def test_query_flags_records_overwritten_by_ring_buffer(handler):
+    for i in range(5):
+        _emit(handler, "app", logging.INFO, f"覆盖 {i}")
+    result = handler.query(since_id=1)
+    assert result["truncated"] is True
+    assert len(result["records"]) == 5
+
+
+def test_query_flags_limit_truncation_and_keeps_newest(handler):
+    result = handler.query(limit=2)
+    assert _messages(result) == ["任务错过执行时间", "更新hosts文件失败"]
+    assert result["truncated"] is True
+    assert handler.query(limit=3)["truncated"] is False
+
+
+def test_clear_keeps_id_increasing(handler):
+    last_id = handler.last_id
+    handler.clear()
+    _emit(handler, "app", logging.INFO, "清空后")
+    assert [rec["id"] for rec in handler.query()["records"]] == [last_id + 1]
+
+
+def test_parse_level():
+    assert parse_level(None) is None
+    assert parse_level("") is None
+    assert parse_level("warning") == logging.WARNING
+    assert parse_level("30") == 30
+    assert parse_level(logging.DEBUG) == logging.DEBUG
+    with pytest.raises(ValueError):
+        parse_level("VERBOSE")
+
+
+def test_query_rejects_unknown_level(handler):
+    with pytest.raises(ValueError):
+        handler.query(level="VERBOSE")
@@ -0,0 +1,38 @@
+from app.utils.log_reader import tail_lines
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "app.log"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_tail_lines_returns_last_lines(tmp_path):
+    path = _write(tmp_path, "".join(f"line {i}\n" for i in range(100)))
+    assert tail_lines(path, 3) == ["line 97", "line 98", "line 99"]
+
+
+def test_tail_lines_spans_several_blocks(tmp_path):
+    path = _write(tmp_path, "".join(f"line {i}\n" for i in range(100)))
+    # 块大小小于单行长度，需要跨多个块拼出完整的行
+    assert tail_lines(path, 5, block_size=4) == [f"line {i}" for i in range(95, 100)]
+
+
+def test_tail_lines_keeps_multibyte_characters_across_blocks(tmp_path):
+    path = _write(tmp_path, "开始更新hosts文件\n更新系统hosts文件完成\n")
+    assert tail_lines(path, 2, block_size=3) == ["开始更新hosts文件", "更新系统hosts文件完成"]
+
+
+def test_tail_lines_without_trailing_newline(tmp_path):
+    path = _write(tmp_path, "a\nb\nc")
+    assert tail_lines(path, 2) == ["b", "c"]
+
+
+def test_tail_lines_more_than_available(tmp_path):
+    path = _write(tmp_path, "a\nb\n")
+    assert tail_lines(path, 10) == ["a", "b"]
+
+
+def test_tail_lines_empty_file_and_non_positive_count(tmp_path):
+    assert tail_lines(_write(tmp_path, ""), 5) == []
+    assert tail_lines(_write(tmp_path, "a\n"), 0) == []
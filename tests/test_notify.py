@@ -0,0 +1,86 @@
+import pytest
+
+from app.utils import notify
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def bark_post(monkeypatch):
+    calls = []
+    replies = {"payload": {"code": 200}}
+
+    def fake_post(url=None, **kwargs):
+        calls.append(kwargs)
+        return _Response(replies["payload"])
+
+    monkeypatch.setattr(notify.requests, "post", fake_post)
+    return calls, replies
+
+
+def _send(**kwargs):
+    return notify.send("标题", "内容", ignore_default_config=True, HITOKOTO="false", BARK_PUSH="device-key", **kwargs)
+
+
+def test_send_passes_timeout_to_channel_request(bark_post):
+    calls, _ = bark_post
+    assert _send(timeout=5) == []
+    assert calls[0]["timeout"] == 5
+
+
+def test_send_uses_default_request_timeout(bark_post):
+    calls, _ = bark_post
+    assert _send() == []
+    assert calls[0]["timeout"] == 15
+
+
+def test_send_reports_channel_failure(bark_post):
+    _, replies = bark_post
+    replies["payload"] = {"code": 400}
+    assert _send(timeout=5) == ["bark"]
+
+
+def test_send_reports_request_exception(monkeypatch):
+    def fake_post(url=None, **kwargs):
+        raise notify.requests.exceptions.ConnectTimeout("timed out")
+
+    monkeypatch.setattr(notify.requests, "post", fake_post)
+    assert _send(timeout=5) == ["bark"]
+
+
+def test_build_config_does_not_mutate_push_config():
+    before = dict(notify.push_config)
+    config = notify.build_config(BARK_PUSH="device-key")
+    assert config["BARK_PUSH"] == "device-key"
+    assert notify.push_config == before
+
+
+def test_notify_config_merge_returns_new_instance():
+    config = notify.build_config(True, BARK_PUSH="a")
+    merged = config.merge(BARK_PUSH="b")
+    assert config["BARK_PUSH"] == "a"
+    assert merged["BARK_PUSH"] == "b"
+    assert merged.version != config.version
+    assert notify.build_config(True, BARK_PUSH="a").version == config.version
+
+
+def test_channel_selection_follows_config():
+    assert notify.add_notify_function(notify.build_config(True, BARK_PUSH="a")) == [notify.bark]
+    assert notify.add_notify_function(notify.build_config(True, DD_BOT_TOKEN="t")) == []
+
+
+def test_prebuilt_config_is_hashed_once(bark_post, monkeypatch):
+    config = notify.build_config(True, HITOKOTO="false", BARK_PUSH="device-key")
+    digests = []
+    sha1 = notify.hashlib.sha1
+    monkeypatch.setattr(notify.hashlib, "sha1", lambda data: digests.append(data) or sha1(data))
+    for _ in range(3):
+        assert notify.send("标题", "内容", timeout=5, config=config) == []
+    # 摘要只在首次选择渠道时计算一次，合并超时参数后的配置不再计算摘要
+    assert len(digests) == 1
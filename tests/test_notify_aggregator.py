@@ -0,0 +1,111 @@
+import pytest
+
+from app.services.notify_dispatcher import NotifyAggregator
+
+PAYLOADS = [{"BARK_PUSH": "device-key"}]
+
+
+class _Dispatcher:
+    def __init__(self, aggregate_config):
+        self.config = {"notify": {"aggregate": aggregate_config}}
+        self.submitted = []
+
+    def submit(self, title, content, payloads, ignore_default_config=False):
+        self.submitted.append((title, content))
+        return True
+
+
+@pytest.fixture
+def make_aggregator():
+    created = []
+
+    def make(**aggregate_config):
+        dispatcher = _Dispatcher(aggregate_config)
+        aggregator = NotifyAggregator(dispatcher)
+        created.append(aggregator)
+        return aggregator, dispatcher
+
+    yield make
+    for aggregator in created:
+        aggregator.cancel()
+
+
+def test_repeated_status_is_suppressed(make_aggregator):
+    aggregator, dispatcher = make_aggregator()
+    aggregator.notify("hosts更新", "完成 10:00", PAYLOADS, status_key="完成")
+    aggregator.notify("hosts更新", "完成 11:00", PAYLOADS, status_key="完成")
+    assert dispatcher.submitted == [("hosts更新", "完成 10:00")]
+
+
+def test_failures_are_never_suppressed(make_aggregator):
+    aggregator, dispatcher = make_aggregator(rate_limits={"bark": 600})
+    aggregator.notify("hosts更新", "失败", PAYLOADS, failed=True)
+    aggregator.notify("hosts更新", "失败", PAYLOADS, failed=True)
+    assert len(dispatcher.submitted) == 2
+
+
+def test_rate_limited_notification_is_sent_as_digest(make_aggregator):
+    aggregator, dispatcher = make_aggregator(rate_limits={"bark": 600})
+    aggregator.notify("优选", "IP: 1.1.1.1", PAYLOADS)
+    aggregator.notify("hosts更新", "完成", PAYLOADS)
+    aggregator.notify("Tracker导入", "新增 2 个", PAYLOADS)
+    assert dispatcher.submitted == [("优选", "IP: 1.1.1.1")]
+    assert aggregator._timer is not None
+
+    # 模拟限速间隔已过
+    aggregator.last_sent["bark"] -= 600
+    aggregator._flush_due()
+    title, content = dispatcher.submitted[-1]
+    assert title == "📋 任务通知汇总（2条）"
+    assert "hosts更新\n完成" in content and "Tracker导入\n新增 2 个" in content
+    assert aggregator.pending == {}
+
+
+def test_digest_window_delays_non_failure_notifications(make_aggregator):
+    aggregator, dispatcher = make_aggregator(digest_window=60)
+    aggregator.notify("hosts更新", "完成", PAYLOADS)
+    assert dispatcher.submitted == []
+    entry = next(iter(aggregator.pending.values()))
+    entry["first_time"] -= 60
+    aggregator._flush_due()
+    assert dispatcher.submitted == [("hosts更新", "完成")]
+
+
+def test_disabled_aggregation_submits_directly(make_aggregator):
+    aggregator, dispatcher = make_aggregator(enable=False)
+    aggregator.notify("hosts更新", "完成", PAYLOADS)
+    aggregator.notify("hosts更新", "完成", PAYLOADS)
+    assert len(dispatcher.submitted) == 2
+
+
+def test_task_notify_configs_are_reused_until_config_changes(tmp_path, monkeypatch):
+    from app.api import routes
+    from app.utils.config_store import ConfigStore
+    from app.utils.notify import NotifyConfig
+
+    store = ConfigStore(str(tmp_path / "config.yaml"))
+    store.save({"notify": {"channels": {
+        "bark": {"enable": True, "BARK_PUSH": "device-key"},
+        "off": {"enable": False, "BARK_PUSH": "other"},
+    }}}, immediate=True)
+    monkeypatch.setattr(routes, "config_store", store)
+    monkeypatch.setattr(routes, "_task_notify_cache", (None, []))
+
+    configs = routes._task_notify_configs()
+    assert len(configs) == 1 and isinstance(configs[0], NotifyConfig)
+    assert configs[0]["BARK_PUSH"] == "device-key"
+    assert routes._task_notify_configs()[0] is configs[0]
+
+    store.merge({"notify": {"channels": {"bark": {"enable": True, "BARK_PUSH": "new-key"}}}})
+    assert routes._task_notify_configs()[0]["BARK_PUSH"] == "new-key"
+
+
+def test_prebuilt_configs_share_pending_digest(make_aggregator):
+    from app.utils import notify
+
+    aggregator, dispatcher = make_aggregator(digest_window=60)
+    config = notify.build_config(BARK_PUSH="device-key")
+    aggregator.notify("任务A", "完成", [config])
+    aggregator.notify("任务B", "完成", [config])
+    assert dispatcher.submitted == []
+    assert [len(entry["entries"]) for entry in aggregator.pending.values()] == [2]
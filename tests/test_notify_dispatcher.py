@@ -0,0 +1,74 @@
+import threading
+
+from app.services.notify_dispatcher import NotifyDispatcher
+from app.utils import notify
+
+
+def _dispatcher(**dispatcher_config):
+    return NotifyDispatcher({"notify": {"dispatcher": dispatcher_config}})
+
+
+def test_deliver_retries_failed_channels(monkeypatch):
+    results = [["bark"], ["bark"], []]
+    calls = []
+
+    def fake_send(title, content, timeout=None, config=None):
+        calls.append(timeout)
+        return results.pop(0)
+
+    monkeypatch.setattr(notify, "send", fake_send)
+    dispatcher = _dispatcher(retries=2, backoff=0, timeout=7)
+    dispatcher._deliver("标题", "内容", notify.build_config(True, BARK_PUSH="key"))
+    assert calls == [7, 7, 7]
+
+
+def test_deliver_stops_after_max_retries(monkeypatch):
+    calls = []
+
+    def fake_send(title, content, timeout=None, config=None):
+        calls.append(title)
+        return ["bark"]
+
+    monkeypatch.setattr(notify, "send", fake_send)
+    dispatcher = _dispatcher(retries=1, backoff=0)
+    dispatcher._deliver("标题", "内容", notify.build_config(True, BARK_PUSH="key"))
+    assert len(calls) == 2
+
+
+def test_submit_returns_immediately_and_delivers_in_worker(monkeypatch):
+    delivered = threading.Event()
+    release = threading.Event()
+
+    def fake_send(title, content, timeout=None, config=None):
+        release.wait(5)
+        delivered.set()
+        return []
+
+    monkeypatch.setattr(notify, "send", fake_send)
+    dispatcher = _dispatcher(workers=1)
+    try:
+        assert dispatcher.submit("标题", "内容", [{"BARK_PUSH": "key"}]) is True
+        assert not delivered.is_set()
+        release.set()
+        assert delivered.wait(5)
+    finally:
+        dispatcher.stop()
+
+
+def test_submit_drops_when_queue_is_full(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(notify, "send", lambda *args, **kwargs: release.wait(5) and [])
+    dispatcher = _dispatcher(workers=1, queue_size=1)
+    try:
+        payloads = [{"BARK_PUSH": "key"}]
+        assert dispatcher.submit("1", "内容", payloads) is True
+        # 工作线程被阻塞，最多再容纳一条（队列容量为1）
+        results = [dispatcher.submit(str(i), "内容", payloads) for i in range(3)]
+        assert False in results
+    finally:
+        release.set()
+        dispatcher.stop()
+
+
+def test_submit_without_payloads():
+    assert _dispatcher().submit("标题", "内容", []) is False
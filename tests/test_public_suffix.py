@@ -0,0 +1,63 @@
+import pytest
+
+from app.utils.public_suffix import PublicSuffixList, registrable_domain
+
+
+@pytest.fixture
+def psl(tmp_path):
+    path = tmp_path / "public_suffix_list.dat"
+    path.write_text(
+        "// 测试用规则\n"
+        "com\n"
+        "jp\n"
+        "co.jp\n"
+        "*.kawasaki.jp\n"
+        "!city.kawasaki.jp\n"
+        "公司.cn\n",
+        encoding="utf-8",
+    )
+    return PublicSuffixList(str(path))
+
+
+@pytest.mark.parametrize("domain, expected", [
+    ("tracker.example.com", "example.com"),
+    ("Tracker.PT.Example.co.jp.", "example.co.jp"),
+    ("a.b.kawasaki.jp", "a.b.kawasaki.jp"),
+    ("www.city.kawasaki.jp", "city.kawasaki.jp"),
+    ("pt.example.公司.cn", "example.公司.cn"),
+    ("pt.example.xn--55qx5d.cn", "example.xn--55qx5d.cn"),
+    ("example.unknown", "example.unknown"),
+    ("tracker.example.com:443", "example.com"),
+])
+def test_registrable_domain(psl, domain, expected):
+    assert psl.registrable_domain(domain) == expected
+
+
+@pytest.mark.parametrize("domain", ["com", "co.jp", "b.kawasaki.jp", ""])
+def test_public_suffix_has_no_registrable_domain(psl, domain):
+    assert psl.registrable_domain(domain) is None
+
+
+def test_public_suffix(psl):
+    assert psl.public_suffix("a.b.kawasaki.jp") == "b.kawasaki.jp"
+    assert psl.public_suffix("example.unknown") == "unknown"
+
+
+def test_missing_list_uses_default_rule(tmp_path):
+    psl = PublicSuffixList(str(tmp_path / "missing.dat"))
+    assert psl.registrable_domain("tracker.example.co.uk") == "co.uk"
+
+
+def test_bundled_list():
+    assert registrable_domain("tracker.example.co.uk") == "example.co.uk"
+    assert registrable_domain("user.github.io") == "user.github.io"
+
+
+def test_zone_cache_shares_only_positive_results(make_hosts_manager):
+    manager = make_hosts_manager()
+    del manager.is_cloudflare_domain
+    manager._cache_cloudflare_result("tracker.example.co.uk", True)
+    manager._cache_cloudflare_result("static.other.co.uk", False)
+    assert set(manager.cloudflare_zone_cache) == {"example.co.uk"}
+    # 同站点的其它子域名直接使用站点缓存，无需再次检测
+    assert manager.is_cloudflare_domain("https://api.example.co.uk:8443/announce") is True
@@ -0,0 +1,178 @@
+import pytest
+
+from app.services.scheduler import SchedulerService, _build_trigger, _misfire_grace_time, build_job_specs, validate_job_specs
+
+
+class _HostsManager:
+    def __init__(self):
+        self.ip_pool = None
+        self.calls = []
+        self.task_running = False
+        self.cfst_result = True
+
+    def run_cfst(self):
+        self.calls.append("cfst")
+        return self.cfst_result
+
+    def update_hosts(self):
+        self.calls.append("hosts")
+        return True
+
+    def get_task_status(self):
+        return {"status": "done", "message": f"{self.calls[-1]} 完成"}
+
+
+@pytest.fixture
+def service():
+    config = {"scheduler": {"job_store": "", "jobs": {"hosts": {"enable": True}}}}
+    service = SchedulerService(config, None, _HostsManager())
+    yield service
+    service.stop()
+
+
+def test_build_job_specs_keeps_legacy_cloudflare_settings():
+    specs = build_job_specs({"cloudflare": {"enable": False, "cron": "0 3 * * *"}})
+    assert specs["cfst"]["enable"] is False
+    assert specs["cfst"]["cron"] == "0 3 * * *"
+    assert set(specs) == {"cfst", "hosts", "tracker_import", "watchdog", "ip_failover"}
+
+
+def test_build_job_specs_interval_override_replaces_default_cron():
+    specs = build_job_specs({"scheduler": {"jobs": {"tracker_import": {"interval_minutes": 15, "after": "cfst"}}}})
+    assert "cron" not in specs["tracker_import"]
+    assert specs["tracker_import"]["interval_minutes"] == 15
+    assert specs["tracker_import"]["after"] == ["cfst"]
+
+
+def test_build_job_specs_disables_jobs_on_cluster_agent():
+    specs = build_job_specs({"cluster": {"role": "agent"}, "cloudflare": {"enable": True}})
+    assert not any(spec["enable"] for spec in specs.values())
+
+
+def test_run_chain_runs_dependents_after_success(service):
+    messages = []
+    assert service._run_chain("cfst", messages, set()) is True
+    assert service.hosts_manager.calls == ["cfst", "hosts"]
+    assert messages == ["cfst 完成", "hosts 完成"]
+
+
+def test_run_chain_skips_dependents_after_failure(service):
+    service.hosts_manager.cfst_result = False
+    assert service._run_chain("cfst", [], set()) is False
+    assert service.hosts_manager.calls == ["cfst"]
+
+
+def test_start_adds_only_enabled_jobs(service):
+    service.start()
+    assert sorted(job["id"] for job in service.get_jobs()) == ["cfst", "hosts"]
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (1, 1), (3600, 3600)])
+def test_misfire_grace_time_accepts_positive_int_or_none(value, expected):
+    assert _misfire_grace_time("cfst", {"misfire_grace_time": value}) == expected
+
+
+@pytest.mark.parametrize("value", [0, -5, True, 1.5, "600"])
+def test_misfire_grace_time_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        _misfire_grace_time("cfst", {"misfire_grace_time": value})
+
+
+def test_update_config_modifies_jobs_without_recreating_scheduler(service):
+    service.start()
+    scheduler = service.scheduler
+    cfst_next_run = scheduler.get_job("cfst").next_run_time
+
+    config = {"scheduler": {"job_store": "", "jobs": {
+        "hosts": {"enable": True, "interval_minutes": 5},
+        "tracker_import": {"enable": True},
+    }}}
+    service.update_config(config)
+
+    assert service.scheduler is scheduler
+    assert scheduler.get_job("cfst").next_run_time == cfst_next_run
+    assert str(scheduler.get_job("hosts").trigger) == str(_build_trigger("hosts", service.job_specs["hosts"]))
+    assert scheduler.get_job("tracker_import") is not None
+
+    service.update_config({"scheduler": {"job_store": ""}})
+    assert sorted(job.id for job in scheduler.get_jobs()) == ["cfst"]
+
+
+def test_sqlite_jobstore_persists_jobs_and_tolerates_reads_after_shutdown(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    config = {"scheduler": {"job_store": path}}
+    first = SchedulerService(config, None, _HostsManager())
+    first.start()
+    next_run = first.scheduler.get_job("cfst").next_run_time
+    store = first.scheduler._lookup_jobstore("default")
+    first.stop()
+    assert store.lookup_job("cfst") is None
+    assert store.get_next_run_time() is None
+    assert store.get_all_jobs() == []
+
+    second = SchedulerService(config, None, _HostsManager())
+    try:
+        second.start()
+        assert second.scheduler.get_job("cfst").next_run_time == next_run
+    finally:
+        second.stop()
+
+
+def test_ip_failover_is_opt_in():
+    assert build_job_specs({})["ip_failover"]["enable"] is False
+
+
+@pytest.mark.parametrize("job", [
+    {"interval_minutes": "abc"},
+    {"interval_minutes": -5},
+    {"jitter": "soon"},
+    {"jitter": -1},
+    {"cron": "not a cron"},
+])
+def test_validate_job_specs_rejects_invalid_triggers(job):
+    with pytest.raises(ValueError, match="hosts"):
+        validate_job_specs({"scheduler": {"jobs": {"hosts": dict(job, enable=False)}}})
+
+
+def test_validate_job_specs_accepts_defaults_and_numeric_strings():
+    validate_job_specs({})
+    validate_job_specs({"scheduler": {"jobs": {"hosts": {"interval_minutes": "15", "jitter": "30"}}}})
+
+
+def test_update_config_route_rejects_invalid_job_before_saving(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import routes
+    from app.globals import get_hosts_manager, get_scheduler_service
+    from app.utils.config_store import ConfigStore
+
+    store = ConfigStore(str(tmp_path / "config.yaml"))
+    monkeypatch.setattr(routes, "config_store", store)
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    app.dependency_overrides[get_hosts_manager] = lambda: None
+    app.dependency_overrides[get_scheduler_service] = lambda: None
+
+    response = TestClient(app).post("/api/config", json={"scheduler": {"jobs": {"hosts": {"interval_minutes": "abc"}}}})
+    assert response.status_code == 400
+    assert "interval_minutes" in response.json()["detail"]
+    assert not store.exists()
+
+
+@pytest.mark.parametrize("job_id, job", [
+    ("watchdog", {"samples": None}),
+    ("watchdog", {"latency_threshold_ms": "slow"}),
+    ("ip_failover", {"timeout": "abc"}),
+])
+def test_validate_job_specs_rejects_invalid_job_settings(job_id, job):
+    with pytest.raises(ValueError, match=job_id):
+        validate_job_specs({"scheduler": {"jobs": {job_id: job}}})
+
+
+def test_invalid_saved_job_settings_do_not_break_startup():
+    config = {"scheduler": {"job_store": "", "jobs": {"watchdog": {"samples": None}, "ip_failover": {"attempts": "x"}}}}
+    hosts_manager = _HostsManager()
+    service = SchedulerService(config, None, hosts_manager)
+    assert service.watchdog.settings["samples"] == 4
+    assert service.health_checker.attempts == 3
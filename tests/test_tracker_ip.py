@@ -0,0 +1,50 @@
+from app.services.hosts_manager import DEFAULT_CLOUDFLARE_IP
+from app.services.ip_selector import TrackerIPSelector
+
+
+def test_selector_picks_fastest_ip_per_domain(monkeypatch):
+    selector = TrackerIPSelector({"cloudflare": {"per_tracker_ip": True, "top_k": 2}})
+    latencies = {
+        ("a.example", "1.1.1.1"): 80.0, ("a.example", "2.2.2.2"): 40.0, ("a.example", "3.3.3.3"): 1.0,
+        ("b.example", "1.1.1.1"): 30.0, ("b.example", "2.2.2.2"): None,
+        ("c.example", "1.1.1.1"): None, ("c.example", "2.2.2.2"): None,
+    }
+    monkeypatch.setattr(selector, "probe", lambda domain, ip: latencies.get((domain, ip)))
+    best = selector.select(["a.example", "b.example", "c.example"], ["1.1.1.1", "2.2.2.2", "3.3.3.3"])
+    # 只探测前 top_k 个候选IP，全部失败的域名不在结果中
+    assert best == {"a.example": ("2.2.2.2", 40.0), "b.example": ("1.1.1.1", 30.0)}
+
+
+def test_apply_best_ip_assigns_per_tracker_ips(make_hosts_manager, monkeypatch):
+    manager = make_hosts_manager({
+        "cloudflare": {"per_tracker_ip": True},
+        "trackers": [
+            {"domain": "a.example", "enable": True, "ip": "9.9.9.9"},
+            {"domain": "b.example", "enable": True, "ip": "9.9.9.9"},
+        ],
+    })
+    manager.cfst_candidates = ["1.1.1.1", "2.2.2.2"]
+    monkeypatch.setattr(manager.ip_selector, "select", lambda domains, candidates: {"a.example": ("2.2.2.2", 10.0)})
+    manager._apply_best_ip("1.1.1.1")
+    assert [t["ip"] for t in manager.config["trackers"]] == ["2.2.2.2", "1.1.1.1"]
+
+
+def test_default_tracker_ip_fallbacks(make_hosts_manager):
+    manager = make_hosts_manager({"trackers": [
+        {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+        {"domain": "b.example", "enable": True, "ip": "2.2.2.2"},
+        {"domain": "c.example", "enable": True, "ip": "2.2.2.2"},
+    ]})
+    assert manager.default_tracker_ip() == "2.2.2.2"
+    manager.best_cloudflare_ip = "3.3.3.3"
+    assert manager.default_tracker_ip() == "3.3.3.3"
+    assert make_hosts_manager({}).default_tracker_ip() == DEFAULT_CLOUDFLARE_IP
+
+
+def test_pt_entries_use_default_ip_for_trackers_without_ip(make_hosts_manager):
+    manager = make_hosts_manager({"trackers": [
+        {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+        {"domain": "b.example", "enable": True},
+        {"domain": "c.example", "enable": False, "ip": "4.4.4.4"},
+    ]})
+    assert manager._collect_pt_entries() == ["1.1.1.1\ta.example", "1.1.1.1\tb.example"]
@@ -0,0 +1,88 @@
+import pytest
+
+from app.services.hosts_manager import SECTION_MERGED, SECTION_PT
+
+SOURCE_ENTRIES = [("2.2.2.2", "b.example"), ("3.3.3.3", "a.example"), ("4.4.4.4", "a.example"), ("9.9.9.9", "tracker.example")]
+LATENCIES = {"2.2.2.2": 20.0, "3.3.3.3": 50.0, "4.4.4.4": 10.0}
+
+
+@pytest.fixture
+def manager(make_hosts_manager, tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    hosts_path = tmp_path / "hosts"
+    hosts_path.write_text("127.0.0.1\tlocalhost\n", encoding="utf-8")
+    manager = make_hosts_manager({
+        "hosts_path": str(hosts_path),
+        "trackers": [{"domain": "tracker.example", "enable": True, "ip": "1.1.1.1"}],
+        "hosts_sources": [{"name": "源", "url": "http://hosts.example/hosts", "enable": True}],
+    })
+    # 写入临时hosts文件，但不写配置文件
+    manager.dry_run = False
+    monkeypatch.setattr(manager, "_merge_write_config", lambda partial: manager.config.update(partial))
+    monkeypatch.setattr(manager, "_dns_check", lambda domain, ip: False)
+    monkeypatch.setattr(manager, "_prefetch_latencies", lambda ips, cache: cache.update({ip: LATENCIES.get(ip) for ip in ips}))
+    manager.fetched_with_pt = []
+
+    def fetch(url):
+        # 记录拉取hosts源时PT站点分区的状态
+        manager.fetched_with_pt.append(list(manager.published_sections()[0]))
+        return SOURCE_ENTRIES
+
+    monkeypatch.setattr(manager, "_fetch_hosts_source", fetch)
+    monkeypatch.setattr(manager, "_run_cfst_script", lambda script_path=None: "5.5.5.5")
+    return manager
+
+
+def _hosts(manager):
+    with open(manager.config["hosts_path"], encoding="utf-8") as f:
+        return f.read()
+
+
+def test_pt_section_is_published_before_sources_are_fetched(manager):
+    assert manager.run_cfst_and_update_hosts() is True
+    assert manager.fetched_with_pt == [["5.5.5.5\ttracker.example"]]
+    assert manager.published_sections() == (["5.5.5.5\ttracker.example"], ["4.4.4.4\ta.example", "2.2.2.2\tb.example"])
+
+
+def test_both_pipelines_produce_the_same_hosts_file(manager):
+    manager.run_cfst_and_update_hosts()
+    two_phase = _hosts(manager)
+    manager.update_hosts()
+    assert _hosts(manager) == two_phase
+    assert two_phase.startswith("127.0.0.1\tlocalhost\n")
+    assert "5.5.5.5\ttracker.example\n" in two_phase
+    assert "4.4.4.4\ta.example\n2.2.2.2\tb.example\n" in two_phase
+    assert "9.9.9.9" not in two_phase
+
+
+def test_replacing_one_section_keeps_the_other(manager):
+    manager.update_hosts()
+    manager._replace_pt_section(["6.6.6.6\ttracker.example"])
+    content = _hosts(manager)
+    assert "6.6.6.6\ttracker.example\n" in content and "1.1.1.1" not in content
+    assert "4.4.4.4\ta.example\n2.2.2.2\tb.example\n" in content
+
+    manager._replace_merged_section(["7.7.7.7\tc.example"])
+    content = _hosts(manager)
+    assert "6.6.6.6\ttracker.example\n" in content
+    assert "7.7.7.7\tc.example\n" in content and "a.example" not in content
+    assert content.count(manager.start_mark) == 1
+
+
+def test_section_versions_only_change_with_entries(manager):
+    manager.update_hosts()
+    versions = dict(manager.section_versions)
+    manager._replace_pt_section(manager.published_sections()[0])
+    assert manager.section_versions == versions
+    manager._replace_pt_section(["6.6.6.6\ttracker.example"])
+    assert manager.section_versions[SECTION_PT] == versions[SECTION_PT] + 1
+    assert manager.section_versions[SECTION_MERGED] == versions[SECTION_MERGED]
+
+
+def test_failed_speed_test_leaves_hosts_untouched(manager, monkeypatch):
+    monkeypatch.setattr(manager, "_run_cfst_script", lambda script_path=None: None)
+    before = _hosts(manager)
+    assert manager.run_cfst_and_update_hosts() is False
+    assert manager.fetched_with_pt == []
+    assert _hosts(manager) == before
+    assert manager.task_running is False
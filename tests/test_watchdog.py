@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.services.watchdog import DEFAULT_WATCHDOG_SETTINGS, NetworkWatchdog
+
+
+class _HostsManager:
+    def __init__(self):
+        self.config = {"trackers": [
+            {"domain": "a.example", "enable": True, "ip": "1.1.1.1"},
+            {"domain": "b.example", "enable": True, "ip": "1.1.1.1"},
+            {"domain": "c.example", "enable": False, "ip": "2.2.2.2"},
+        ]}
+        self.best_cloudflare_ip = "3.3.3.3"
+        self.last_cfst_time = None
+
+
+@pytest.fixture
+def watchdog(monkeypatch):
+    watchdog = NetworkWatchdog(_HostsManager())
+    watchdog.load_settings({"consecutive": 2, "samples": 2})
+    latencies = {"value": 50.0}
+    monkeypatch.setattr(watchdog, "_connect_latency", lambda ip: latencies["value"])
+    return watchdog, latencies
+
+
+def test_target_ips_use_enabled_trackers_then_best_ip():
+    watchdog = NetworkWatchdog(_HostsManager())
+    assert watchdog._target_ips() == ["1.1.1.1"]
+    watchdog.hosts_manager.config = {"trackers": []}
+    assert watchdog._target_ips() == ["3.3.3.3"]
+
+
+def test_healthy_sample_does_not_trigger(watchdog):
+    watchdog, _ = watchdog
+    triggered, message = watchdog.check()
+    assert triggered is False
+    assert "质量正常" in message
+
+
+def test_triggers_after_consecutive_degraded_samples(watchdog):
+    watchdog, latencies = watchdog
+    latencies["value"] = 900.0
+    assert watchdog.check()[0] is False
+    assert watchdog.check()[0] is True
+    assert watchdog.degraded_count == 0
+
+
+def test_recovery_resets_degraded_count(watchdog):
+    watchdog, latencies = watchdog
+    latencies["value"] = None
+    assert watchdog.check()[0] is False
+    latencies["value"] = 50.0
+    watchdog.check()
+    latencies["value"] = None
+    assert watchdog.check()[0] is False
+
+
+def test_cooldown_blocks_trigger_after_recent_speed_test(watchdog):
+    watchdog, latencies = watchdog
+    watchdog.hosts_manager.last_cfst_time = time.time()
+    latencies["value"] = None
+    watchdog.check()
+    triggered, message = watchdog.check()
+    assert triggered is False
+    assert "冷却中" in message
+
+
+def test_invalid_settings_fall_back_to_defaults():
+    watchdog = NetworkWatchdog(_HostsManager())
+    watchdog.load_settings({"samples": None, "timeout": "fast", "consecutive": "3"})
+    assert watchdog.settings["samples"] == DEFAULT_WATCHDOG_SETTINGS["samples"]
+    assert watchdog.settings["timeout"] == DEFAULT_WATCHDOG_SETTINGS["timeout"]
+    assert watchdog.settings["consecutive"] == 3